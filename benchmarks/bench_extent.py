@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the geographic extent derived from the coordinates of a
+large swath file, read in chunks (py_mmd_tools.extent) or all at once,
+and of the footprint polygon derived from the edges of the swath.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    python benchmarks/bench_extent.py [-n REPEAT] [--rows ROWS] [--columns COLUMNS]
+        [--chunk-size CHUNK_SIZE] [--keep FILE]
+
+The default swath (20000 x 6000) has 1 GB of coordinates. Use --keep
+to reuse a (larger) swath file between runs.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from netCDF4 import Dataset
+
+from py_mmd_tools import extent
+
+
+def write_swath(path, rows, columns):
+    """Write a swath file with rows x columns latitudes and
+    longitudes, crossing the antimeridian, one row block at a time.
+    """
+    with Dataset(path, "w") as ds:
+        ds.createDimension("y", rows)
+        ds.createDimension("x", columns)
+        lat = ds.createVariable("latitude", "f4", ("y", "x"), fill_value=-999.)
+        lat.standard_name = "latitude"
+        lon = ds.createVariable("longitude", "f4", ("y", "x"), fill_value=-999.)
+        lon.standard_name = "longitude"
+        xx = np.linspace(0., 1., columns, dtype="f4")
+        step = max(1, 2**22 // columns)
+        for start in range(0, rows, step):
+            yy = np.arange(start, min(start + step, rows), dtype="f4")[:, None] / rows
+            lat[start:start + step] = 50. + 30.*yy + 2.*xx
+            lon[start:start + step] = (160. + 40.*xx + 5.*yy + 180.) % 360. - 180.
+
+
+def full_read(ncin):
+    """Derive the extent with the coordinates read all at once."""
+    south, north = extent.min_max([extent._as_float(ncin.variables["latitude"][:])])
+    west, east = extent.longitude_extent([extent._as_float(ncin.variables["longitude"][:])])
+    return extent._rectangle(north, south, east, west)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--repeat", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=6000)
+    parser.add_argument("--chunk-size", type=int, default=extent.CHUNK_SIZE)
+    parser.add_argument("--keep", default=None, help="Swath file to create or reuse.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.keep or os.path.join(tmpdir, "swath.nc")
+        if not os.path.isfile(path):
+            write_swath(path, args.rows, args.columns)
+        print("%s: %.2f GB" % (path, os.path.getsize(path) / 1e9))
+        print("%-10s %10s %14s  %s" % ("method", "seconds", "peak MB", "extent"))
+        with Dataset(path) as ncin:
+            for name, func, func_args in [
+                ("chunked", extent.geographic_extent, (ncin, args.chunk_size)),
+                ("full", full_read, (ncin,)),
+                ("footprint", extent.footprint, (ncin,)),
+            ]:
+                runs = [measure(func, *func_args) for i in range(args.repeat)]
+                result = runs[0][0]
+                seconds = min(run[1] for run in runs)
+                peak = max(run[2] for run in runs)
+                if name == "footprint":
+                    result = "%d vertices" % (len(result["pos"]) - 1)
+                print("%-10s %10.3f %14.1f  %s" % (name, seconds, peak / 1e6, result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark of normalize_iso8601 for lists of datetimes (e.g., the
+comma separated coverage periods of a file), compared with parsing
+every datetime with dateutil.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    python benchmarks/bench_iso8601.py [-n REPEAT] [SIZE ...]
+"""
+
+import argparse
+import datetime
+import timeit
+
+from py_mmd_tools import nc_to_mmd
+
+
+def datetimes(size, fmt):
+    """Return size hourly datetimes formatted with fmt."""
+    start = datetime.datetime(2023, 1, 1)
+    return [(start + datetime.timedelta(hours=i)).strftime(fmt) for i in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sizes", type=int, nargs="*", default=[10, 100, 1000, 10000])
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("normalized", "%Y-%m-%dT%H:%M:%SZ"),
+        ("other", "%Y-%m-%d %H:%M:%S"),
+    ]
+    print("%-12s %8s %14s %14s %14s" % ("input", "size", "isoparse ms", "cold ms", "warm ms"))
+    for name, fmt in cases:
+        for size in args.sizes:
+            values = datetimes(size, fmt)
+
+            def reference():
+                return [nc_to_mmd._normalize_iso8601(s) for s in values]
+
+            def cold():
+                nc_to_mmd._normalize_iso8601_cached.cache_clear()
+                return nc_to_mmd.normalize_iso8601_list(values)
+
+            def warm():
+                return nc_to_mmd.normalize_iso8601_list(values)
+
+            assert reference() == cold()
+            times = [1000*min(timeit.repeat(func, number=1, repeat=args.repeat))
+                     for func in [reference, cold, warm]]
+            print("%-12s %8d %14.2f %14.2f %14.2f" % ((name, size) + tuple(times)))
+
+
+if __name__ == "__main__":
+    main()
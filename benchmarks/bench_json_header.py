@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark of reading large json headers (as written by ncheader2json)
+incrementally with py_mmd_tools.json_header, compared with loading the
+whole header with json.load. Reports the time and the peak memory.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    python benchmarks/bench_json_header.py [-n REPEAT] [--ijson] [VARIABLES ...]
+"""
+
+import argparse
+import io
+import json
+import timeit
+import tracemalloc
+
+from py_mmd_tools import json_header
+
+
+def make_header(variables):
+    """Return a json header with the given number of variables."""
+    header = {
+        "global_variables": {"title": "Benchmark", "summary": "s"*1000},
+        "variables": {},
+        "archive_location": "/archive/benchmark.nc",
+        "file_size": 1.0,
+        "file_checksum": None,
+        "file_checksum_type": None,
+    }
+    for i in range(variables):
+        header["variables"]["var_%d" % i] = {
+            "attrs": {
+                "_FillValue": -999.0,
+                "standard_name": "air_temperature",
+                "long_name": "Air temperature at level %d" % i,
+                "units": "K",
+                "valid_range": [0.0, 400.0],
+                "comment": "c"*200,
+                "flag_values": list(range(20)),
+            },
+            "dtype": "float32",
+            "shape": [100, 200],
+        }
+    return json.dumps(header).encode()
+
+
+def peak_memory(func):
+    """Return the peak memory (MB) allocated by func()."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("variables", type=int, nargs="*", default=[1000, 10000, 50000])
+    parser.add_argument("-n", "--repeat", type=int, default=3)
+    parser.add_argument("--ijson", action="store_true", help="Also time the ijson parser.")
+    args = parser.parse_args()
+
+    print("%-12s %9s %8s %10s %10s" % ("parser", "variables", "MB", "time s", "peak MB"))
+    for variables in args.variables:
+        raw = make_header(variables)
+        cases = [
+            ("json.load", lambda: json.load(io.BytesIO(raw))),
+            ("json_header", lambda: json_header.load_header(io.BytesIO(raw))),
+        ]
+        if args.ijson:
+            cases.append(
+                ("ijson", lambda: json_header.load_header(io.BytesIO(raw), use_ijson=True))
+            )
+        for name, func in cases:
+            seconds = min(timeit.repeat(func, number=1, repeat=args.repeat))
+            print("%-12s %9d %8.1f %10.3f %10.1f" % (
+                name, variables, len(raw) / 2**20, seconds, peak_memory(func)
+            ))
+
+
+if __name__ == "__main__":
+    main()
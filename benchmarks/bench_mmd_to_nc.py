@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the translation from MMD to ACDD in Mmd_to_nc, for MMD
+documents with many keywords and personnel elements.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    python benchmarks/bench_mmd_to_nc.py [-n REPEAT] [SIZE ...]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import timeit
+
+import lxml.etree as ET
+
+from py_mmd_tools.mmd_to_nc import MMD_NS
+from py_mmd_tools.mmd_to_nc import Mmd_to_nc
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.path.pardir, "tests", "data")
+
+
+def large_mmd(size):
+    """Return reference_nc.xml with size extra keywords and personnel
+    elements.
+    """
+    tree = ET.parse(os.path.join(DATA_DIR, "reference_nc.xml"))
+    root = tree.getroot()
+    for i in range(size):
+        keywords = ET.SubElement(root, "{%s}keywords" % MMD_NS, vocabulary="GCMDSK")
+        ET.SubElement(keywords, "{%s}keyword" % MMD_NS).text = "Earth Science > Keyword %d" % i
+        ET.SubElement(keywords, "{%s}resource" % MMD_NS).text = "https://gcmd.nasa.gov/%d" % i
+        personnel = ET.SubElement(root, "{%s}personnel" % MMD_NS)
+        ET.SubElement(personnel, "{%s}role" % MMD_NS).text = "Technical contact"
+        ET.SubElement(personnel, "{%s}name" % MMD_NS).text = "Person %d" % i
+        ET.SubElement(personnel, "{%s}email" % MMD_NS).text = "person%d@met.no" % i
+    return tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sizes", type=int, nargs="*", default=[10, 100, 1000, 5000])
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    nc_file = os.path.join(DATA_DIR, "nc_to_update.nc")
+    print("%8s %12s %14s" % ("size", "elements", "ms/document"))
+    for size in args.sizes:
+        with tempfile.NamedTemporaryFile(suffix=".xml") as fh:
+            tree = large_mmd(size)
+            tree.write(fh.name)
+            md = Mmd_to_nc(fh.name, nc_file)
+
+        def run():
+            md.acdd_metadata = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                md.to_acdd()
+
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print("%8d %12d %14.2f" % (size, len(tree.getroot()), 1000*seconds))
+
+
+if __name__ == "__main__":
+    main()
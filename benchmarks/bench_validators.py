@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the url and UUID validators, for lists of references
+with many repeated values (as in the related information, keyword
+vocabularies and licenses of a batch of files), compared with
+compiling the url pattern and constructing a UUID for each value.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    python benchmarks/bench_validators.py [-n REPEAT] [SIZE ...]
+"""
+
+import argparse
+import re
+import timeit
+import uuid
+
+from py_mmd_tools import validators
+
+
+def reference_valid_url(url):
+    """url validation with the pattern compiled in each call."""
+    if url is None:
+        return False
+    regex = re.compile(validators.URL_PATTERN.pattern, re.IGNORECASE)
+    return re.match(regex, url) is not None
+
+
+def reference_is_valid_uuid(uuid_to_test, version=4):
+    """UUID validation with a UUID object for each value."""
+    try:
+        uuid_obj = uuid.UUID(uuid_to_test, version=version)
+    except ValueError:
+        return False
+    return str(uuid_obj) == uuid_to_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sizes", type=int, nargs="*", default=[100, 1000, 10000])
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("%-6s %8s %14s %14s" % ("kind", "size", "reference ms", "validators ms"))
+    for size in args.sizes:
+        # A few distinct urls, repeated in every file
+        urls = ["https://met.no/references/%d" % (i % 50) for i in range(size)]
+        uuids = [str(uuid.uuid4()) for i in range(size)]
+        cases = [
+            ("url", lambda: [reference_valid_url(url) for url in urls],
+             lambda: validators.valid_urls(urls)),
+            ("uuid", lambda: [reference_is_valid_uuid(value) for value in uuids],
+             lambda: validators.valid_uuids(uuids)),
+        ]
+        for kind, reference, batch in cases:
+            assert reference() == batch()
+            times = [1000*min(timeit.repeat(func, number=1, repeat=args.repeat))
+                     for func in [reference, batch]]
+            print("%-6s %8d %14.2f %14.2f" % ((kind, size) + tuple(times)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Tool for recording the progress of batch runs, so that an interrupted
+run can be resumed without processing the same files again.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import json
+
+
+class Checkpoint(object):
+    """Progress of a batch run, stored as a journal with one json
+    record per completed input file.
+
+    Completed files are buffered in memory, and appended to the
+    journal (and synced to disk) every `interval` files, or when
+    save() is called. Each flush is a single append of complete
+    lines, so a crash can at most leave a truncated last line, which
+    is removed when the checkpoint is loaded.
+
+    Parameters
+    ----------
+    path : str
+        Path to the checkpoint file.
+    interval : int or None, default 100
+        Number of completed files between each flush to disk. If None,
+        the records are only written by save().
+    sync : callable, optional
+        Called before the pending records are written, e.g., to make
+        sure that the outputs they refer to are on disk.
+
+    Examples
+    --------
+    >>> cp = Checkpoint("nc2mmd.checkpoint", interval=1)
+    >>> cp.reset()
+    >>> cp.add("/data/a.nc", "no.met:d81ac3b4-9ab8-44ac-8b11-6bc2a4d1b8b5", "/mmd/a.xml")
+    >>> Checkpoint("nc2mmd.checkpoint").load().is_done("/data/a.nc")
+    True
+    """
+
+    def __init__(self, path, interval=100, sync=None):
+        self.path = path
+        self.interval = interval
+        self.sync = sync
+        self.completed = {}
+        self.pending = []
+
+    @staticmethod
+    def _key(input_file):
+        return os.path.abspath(str(input_file))
+
+    def load(self):
+        """Read the completed files from the checkpoint file, if it
+        exists, and return self. A truncated last line, from an
+        interrupted write, is removed from the file, so that the next
+        records are appended after the last complete one.
+        """
+        self.completed = {}
+        if not os.path.isfile(self.path):
+            return self
+        with open(self.path, "rb+") as fh:
+            data = fh.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                fh.truncate(end)
+                fh.flush()
+                os.fsync(fh.fileno())
+        for line in data[:end].decode("utf-8", "replace").splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Record corrupted by an earlier interrupted write
+                continue
+            self.completed[record["input"]] = record
+        return self
+
+    def reset(self):
+        """Start a new checkpoint, discarding any previous progress."""
+        self.completed = {}
+        self.pending = []
+        with open(self.path, "w"):
+            pass
+
+    def is_done(self, input_file):
+        """Return True if input_file has already been processed."""
+        return self._key(input_file) in self.completed
+
+    def add(self, input_file, metadata_id, output=None):
+        """Record that input_file has been processed."""
+        record = {
+            "input": self._key(input_file),
+            "metadata_id": metadata_id,
+            "output": None if output is None else str(output),
+        }
+        self.completed[record["input"]] = record
+        self.pending.append(record)
+        if self.interval is not None and len(self.pending) >= self.interval:
+            self.save()
+
+    def save(self):
+        """Append the pending records to the checkpoint file, and
+        sync it to disk.
+        """
+        if not self.pending:
+            return
+        if self.sync is not None:
+            self.sync()
+        data = "".join(json.dumps(record) + "\n" for record in self.pending)
+        with open(self.path, "a") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.pending = []
@@ -0,0 +1,509 @@
+"""
+Tools for deriving the geographic and temporal extent of a netCDF-CF
+dataset from its coordinate variables, for files that lack the ACDD
+geospatial_* and time_coverage_* attributes.
+
+The coordinate variables are read in blocks along their first
+dimension, so that large (e.g., satellite swath) arrays are never
+loaded into memory all at once. For a time coordinate variable, only
+the first and last values are read, and for the footprint polygon of a
+swath, only (a subsample of) the edges of the latitude and longitude
+arrays.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import math
+
+import netCDF4
+import numpy as np
+
+from shapely.geometry import Polygon
+
+# Maximum number of array elements read at a time
+CHUNK_SIZE = 2**22
+
+LATITUDE_UNITS = ("degrees_north", "degree_north", "degree_N", "degrees_N", "degreeN",
+                  "degreesN")
+LONGITUDE_UNITS = ("degrees_east", "degree_east", "degree_E", "degrees_E", "degreeE",
+                   "degreesE")
+
+# Number of decimals of the derived extent
+DECIMALS = 4
+
+# Default maximum number of vertices of a footprint polygon, and number
+# of points read along each edge of a swath
+MAX_VERTICES = 100
+EDGE_SAMPLES = 500
+
+
+def _data_variables(ncin):
+    """Return the variables of ncin that have data, i.e., not those of
+    a json header (see nc_to_mmd.nc_wrapper).
+    """
+    return [var for var in ncin.variables.values() if isinstance(var, netCDF4.Variable)]
+
+
+def find_coordinate(ncin, standard_name, units=()):
+    """Return the variable of ncin with the given standard_name, or, if
+    there is none, the first variable with one of the given units.
+    Return None if no variable is found.
+    """
+    variables = _data_variables(ncin)
+    for var in variables:
+        if getattr(var, "standard_name", None) == standard_name:
+            return var
+    for var in variables:
+        if getattr(var, "units", None) in units:
+            return var
+    return None
+
+
+def _as_float(values):
+    """Return values as a float array, with masked values as NaN."""
+    values = np.ma.asarray(values)
+    if values.dtype.kind != "f":
+        values = values.astype(float)
+    return np.ma.filled(values, np.nan)
+
+
+def iter_chunks(var, chunk_size=CHUNK_SIZE):
+    """Read a netCDF variable in blocks along its first dimension, with
+    at most chunk_size elements in each block (but at least one index
+    of the first dimension).
+
+    Yields
+    ------
+    chunk : numpy.ndarray
+        The values of the block, as floats. Fill values and values
+        outside the valid range are NaN.
+    """
+    if var.ndim == 0:
+        yield _as_float(var[...])
+        return
+    row_size = int(np.prod(var.shape[1:]))
+    step = max(1, chunk_size // max(row_size, 1))
+    for start in range(0, var.shape[0], step):
+        yield _as_float(var[start:start + step])
+
+
+def _chunk_min_max(chunk):
+    """Return the minimum and maximum of chunk, ignoring NaNs (NaN if
+    all values are NaN). Unlike numpy.nanmin, this does not copy the
+    array.
+    """
+    if chunk.size == 0:
+        return np.nan, np.nan
+    return float(np.fmin.reduce(chunk, axis=None)), float(np.fmax.reduce(chunk, axis=None))
+
+
+def min_max(chunks):
+    """Return the minimum and maximum of the values in chunks (an
+    iterable of arrays), ignoring NaNs, or (None, None) if there are
+    no other values.
+    """
+    vmin = vmax = None
+    for chunk in chunks:
+        cmin, cmax = _chunk_min_max(chunk)
+        if np.isnan(cmin):
+            continue
+        vmin = cmin if vmin is None else min(vmin, cmin)
+        vmax = cmax if vmax is None else max(vmax, cmax)
+    return vmin, vmax
+
+
+def _wrap(lon):
+    """Return lon in the range (-180, 180]."""
+    return lon - 360. if lon > 180. else lon
+
+
+def longitude_extent(chunks):
+    """Return the western and eastern limits of the longitudes in
+    chunks (an iterable of arrays), ignoring NaNs, or (None, None) if
+    there are no other values.
+
+    The limits are found both with the longitudes in [-180, 180] and
+    in [0, 360], and the narrowest range is returned, in [-180, 180].
+    If the data crosses the antimeridian, west is larger than east.
+    """
+    bounds180 = []
+    bounds360 = []
+    for chunk in chunks:
+        lo, hi = _chunk_min_max(chunk)
+        if np.isnan(lo):
+            continue
+        if lo < -180. or hi > 180.:
+            chunk = np.where(chunk > 180., chunk - 360., chunk)
+            chunk = np.where(chunk < -180., chunk + 360., chunk)
+            lo, hi = _chunk_min_max(chunk)
+        bounds180.append((lo, hi))
+        if lo < 0.:
+            bounds360.append(_chunk_min_max(np.where(chunk < 0., chunk + 360., chunk)))
+        else:
+            bounds360.append((lo, hi))
+    if not bounds180:
+        return None, None
+    west180 = min(bb[0] for bb in bounds180)
+    east180 = max(bb[1] for bb in bounds180)
+    west360 = min(bb[0] for bb in bounds360)
+    east360 = max(bb[1] for bb in bounds360)
+    if east360 - west360 < east180 - west180:
+        return _wrap(west360), _wrap(east360)
+    return west180, east180
+
+
+def _grid_mapping(ncin):
+    """Return the grid mapping variable referred to by the data
+    variables of ncin, or None.
+    """
+    for var in _data_variables(ncin):
+        name = getattr(var, "grid_mapping", None)
+        if name is None:
+            continue
+        # The extended form is "<grid mapping>: <coordinates> ..."
+        name = name.split()[0].rstrip(":")
+        if name in ncin.variables:
+            return ncin.variables[name]
+    return None
+
+
+def projected_extent(ncin):
+    """Return the geographic extent of a dataset on a projected grid,
+    with 1D projection_x_coordinate and projection_y_coordinate
+    variables and a CF grid mapping, or None if ncin has no such grid.
+
+    The boundary of the grid is transformed to latitude and longitude
+    with pyproj, which must be installed. If the grid contains a pole,
+    the extent includes it.
+    """
+    x = find_coordinate(ncin, "projection_x_coordinate")
+    y = find_coordinate(ncin, "projection_y_coordinate")
+    grid_mapping = _grid_mapping(ncin)
+    if x is None or y is None or grid_mapping is None or x.ndim != 1 or y.ndim != 1:
+        return None
+
+    import pyproj
+
+    crs = pyproj.CRS.from_cf({name: grid_mapping.getncattr(name)
+                              for name in grid_mapping.ncattrs()})
+    scale = {"km": 1000., "kilometre": 1000., "kilometer": 1000.}
+    xx = np.asarray(x[:], dtype=float) * scale.get(getattr(x, "units", "m"), 1.)
+    yy = np.asarray(y[:], dtype=float) * scale.get(getattr(y, "units", "m"), 1.)
+
+    # Only the boundary of the grid is transformed
+    bx = np.concatenate([xx, xx, np.full(yy.size, xx[0]), np.full(yy.size, xx[-1])])
+    by = np.concatenate([np.full(xx.size, yy[0]), np.full(xx.size, yy[-1]), yy, yy])
+    to_lonlat = pyproj.Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+    lon, lat = to_lonlat.transform(bx, by)
+    # Points that cannot be transformed are inf
+    lat = np.where(np.isfinite(lat), lat, np.nan)
+    lon = np.where(np.isfinite(lon), lon, np.nan)
+
+    south, north = min_max([lat])
+    west, east = longitude_extent([lon])
+    if south is None or west is None:
+        return None
+
+    from_lonlat = pyproj.Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+    for pole in [90., -90.]:
+        px, py = from_lonlat.transform(0., pole)
+        if min(xx[0], xx[-1]) <= px <= max(xx[0], xx[-1]) and \
+                min(yy[0], yy[-1]) <= py <= max(yy[0], yy[-1]):
+            north = max(north, pole)
+            south = min(south, pole)
+            west, east = -180., 180.
+    return _rectangle(north, south, east, west)
+
+
+def _rectangle(north, south, east, west):
+    """Return the limits as a dict, rounded outwards to DECIMALS
+    decimals.
+    """
+    scale = 10**DECIMALS
+    return {
+        "north": math.ceil(north*scale) / scale,
+        "south": math.floor(south*scale) / scale,
+        "east": math.ceil(east*scale) / scale,
+        "west": math.floor(west*scale) / scale,
+    }
+
+
+def geographic_extent(ncin, chunk_size=CHUNK_SIZE):
+    """Derive the geographic extent of a dataset from its latitude and
+    longitude variables, or, if it has none, from its projected
+    coordinates (see projected_extent).
+
+    Parameters
+    ----------
+    ncin : netCDF4.Dataset
+        The dataset.
+    chunk_size : int, default CHUNK_SIZE
+        Maximum number of elements of a coordinate variable that is
+        read at a time.
+
+    Returns
+    -------
+    extent : dict
+        The north, south, east and west limits of the valid
+        coordinates, in degrees. The west limit is larger than the
+        east limit if the dataset crosses the antimeridian. None if
+        the extent cannot be derived.
+    """
+    lat = find_coordinate(ncin, "latitude", LATITUDE_UNITS)
+    lon = find_coordinate(ncin, "longitude", LONGITUDE_UNITS)
+    if lat is None or lon is None:
+        return projected_extent(ncin)
+    south, north = min_max(iter_chunks(lat, chunk_size))
+    west, east = longitude_extent(iter_chunks(lon, chunk_size))
+    if south is None or west is None:
+        return None
+    return _rectangle(north, south, east, west)
+
+
+def find_time_coordinate(ncin):
+    """Return the time coordinate of ncin, i.e., the variable with
+    units "<unit> since <date>" and standard_name time, axis T or name
+    time (in that order of preference), or None.
+    """
+    candidates = [var for var in _data_variables(ncin)
+                  if " since " in str(getattr(var, "units", ""))]
+    for var in candidates:
+        if getattr(var, "standard_name", None) == "time":
+            return var
+    for var in candidates:
+        if getattr(var, "axis", None) == "T":
+            return var
+    for var in candidates:
+        if var.name == "time":
+            return var
+    return None
+
+
+def _is_coordinate_variable(var):
+    """Return True if var is a CF coordinate variable (a 1D variable
+    with the same name as its dimension), which must be monotonic.
+    """
+    return var.ndim == 1 and var.dimensions[0] == var.name
+
+
+def time_limits(ncin, var, chunk_size=CHUNK_SIZE):
+    """Return the first and last time of the time variable var, or of
+    its cell bounds if it has any, in the units of var, or (None, None)
+    if there are no valid times.
+
+    If var is a coordinate variable, only its first and last values
+    (or bounds) are read, since they must be monotonic. Otherwise, or
+    if any of these values are missing, all the values are read in
+    chunks.
+    """
+    values = var
+    if "bounds" in var.ncattrs() and var.bounds in ncin.variables:
+        values = ncin.variables[var.bounds]
+    if _is_coordinate_variable(var) and var.size > 0:
+        ends = np.concatenate([_as_float(values[0]).ravel(), _as_float(values[-1]).ravel()])
+        if not np.isnan(ends).any():
+            return float(ends.min()), float(ends.max())
+    return min_max(iter_chunks(values, chunk_size))
+
+
+def format_time(value, units, calendar="standard"):
+    """Decode a CF time value with the given units and calendar, and
+    return it in the normalized ISO 8601 form (see
+    nc_to_mmd.normalize_iso8601).
+    """
+    dt = netCDF4.num2date(value, units, calendar=calendar)
+    sec_frac = "" if dt.microsecond == 0 else ".%06d" % dt.microsecond
+    return "%04d-%02d-%02dT%02d:%02d:%02d%sZ" % (
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, sec_frac
+    )
+
+
+def temporal_extent(ncin, chunk_size=CHUNK_SIZE):
+    """Derive the temporal extent of a dataset from its time
+    coordinate.
+
+    Parameters
+    ----------
+    ncin : netCDF4.Dataset
+        The dataset.
+    chunk_size : int, default CHUNK_SIZE
+        Maximum number of elements of the time variable that is read
+        at a time, if it is not a coordinate variable.
+
+    Returns
+    -------
+    extent : dict
+        The start_date and end_date of the dataset, in ISO 8601 format.
+        None if the extent cannot be derived.
+    """
+    var = find_time_coordinate(ncin)
+    if var is None:
+        return None
+    start, end = time_limits(ncin, var, chunk_size)
+    if start is None:
+        return None
+    calendar = getattr(var, "calendar", "standard")
+    return {
+        "start_date": format_time(start, var.units, calendar),
+        "end_date": format_time(end, var.units, calendar),
+    }
+
+
+def _sample(var, index, samples):
+    """Read at most samples + 1 evenly spaced values of a row or column
+    of the 2D variable var, including the first and the last. index is
+    a tuple with an integer for the fixed dimension and None for the
+    sampled one.
+    """
+    axis = index.index(None)
+    size = var.shape[axis]
+    step = max(1, (size - 1) // max(samples, 1))
+    if axis == 1:
+        # Reading the full row is faster than a strided read
+        values = _as_float(var[index[0], :])
+        sampled = values[::step]
+        last = values[-1:]
+    else:
+        sampled = _as_float(var[::step, index[1]])
+        last = _as_float(var[size - 1:, index[1]])
+    if (size - 1) % step != 0:
+        sampled = np.concatenate([sampled, last])
+    return sampled
+
+
+def _edges(var, samples):
+    """Read the boundary of the 2D variable var, with at most samples
+    + 1 points along each edge, as a ring (first row, last column,
+    last row reversed, first column reversed).
+    """
+    ny, nx = var.shape
+    return np.concatenate([
+        _sample(var, (0, None), samples),
+        _sample(var, (None, nx - 1), samples),
+        _sample(var, (ny - 1, None), samples)[::-1],
+        _sample(var, (None, 0), samples)[::-1],
+    ])
+
+
+def _vertices(polygon):
+    """Return the number of vertices of a polygon, or of all parts of
+    a multipolygon.
+    """
+    if polygon.is_empty:
+        return 0
+    if polygon.geom_type != "Polygon":
+        return sum(_vertices(part) for part in polygon.geoms)
+    return len(polygon.exterior.coords) - 1
+
+
+def _bisect_tolerance(polygon, max_vertices, preserve_topology):
+    """Return polygon simplified with the smallest tolerance that gives
+    at most max_vertices vertices (found by bisection, to 0.1 % of the
+    size of the polygon).
+    """
+    minx, miny, maxx, maxy = polygon.bounds
+    low, high = 0., max(maxx - minx, maxy - miny)
+    resolution = 1e-3 * high
+    while high - low > resolution:
+        tolerance = (low + high) / 2
+        simplified = polygon.simplify(tolerance, preserve_topology=preserve_topology)
+        if _vertices(simplified) > max_vertices:
+            low = tolerance
+        else:
+            high = tolerance
+    return polygon.simplify(high, preserve_topology=preserve_topology)
+
+
+def simplify(polygon, max_vertices):
+    """Simplify a shapely polygon to at most max_vertices vertices,
+    with the smallest tolerance that is sufficient.
+
+    The Douglas-Peucker algorithm is much faster without
+    preserve_topology, which is only used if the result is not a valid
+    polygon. If neither result is valid with at most max_vertices
+    vertices, the convex hull of the polygon is simplified instead,
+    and as a last resort the bounding box (or, for max_vertices=3, a
+    triangle of the convex hull) is returned.
+    """
+    if max_vertices < 3:
+        raise ValueError("A polygon must have at least 3 vertices")
+
+    def valid(pp):
+        if pp.geom_type != "Polygon" or not pp.is_valid:
+            return False
+        return 3 <= _vertices(pp) <= max_vertices
+
+    if _vertices(polygon) <= max_vertices:
+        return polygon
+    for candidate, preserve_topology in [(polygon, False), (polygon, True),
+                                         (polygon.convex_hull, False)]:
+        simplified = _bisect_tolerance(candidate, max_vertices, preserve_topology)
+        if valid(simplified):
+            return simplified
+    if max_vertices >= 4:
+        return polygon.envelope
+    return Polygon(polygon.convex_hull.exterior.coords[:3])
+
+
+def footprint(ncin, max_vertices=MAX_VERTICES, edge_samples=EDGE_SAMPLES):
+    """Derive the footprint polygon of a swath from the edges of its 2D
+    latitude and longitude variables.
+
+    Only edge_samples points along each edge of the arrays are read,
+    and the polygon is simplified to at most max_vertices vertices.
+    If the swath crosses the antimeridian, it is simplified with
+    continuous longitudes in [0, 360], which are then wrapped back to
+    (-180, 180], as required by EPSG:4326.
+
+    Parameters
+    ----------
+    ncin : netCDF4.Dataset
+        The dataset.
+    max_vertices : int, default MAX_VERTICES
+        Maximum number of vertices of the polygon.
+    edge_samples : int, default EDGE_SAMPLES
+        Number of points read along each edge of the swath.
+
+    Returns
+    -------
+    polygon : dict
+        srsName and pos (a closed ring of "<lat> <lon>" positions, like
+        the ACDD geospatial_bounds attribute), or None if the dataset
+        has no 2D latitude and longitude variables.
+    """
+    lat = find_coordinate(ncin, "latitude", LATITUDE_UNITS)
+    lon = find_coordinate(ncin, "longitude", LONGITUDE_UNITS)
+    # A json header (see nc_to_mmd.nc_wrapper) has no data
+    if not (isinstance(lat, netCDF4.Variable) and isinstance(lon, netCDF4.Variable)):
+        return None
+    if lat.ndim != 2 or lat.shape != lon.shape:
+        return None
+    lats = _edges(lat, edge_samples)
+    lons = _edges(lon, edge_samples)
+    valid = ~(np.isnan(lats) | np.isnan(lons))
+    lats = lats[valid]
+    lons = lons[valid]
+    # Drop repeated points (e.g., the corners, which end two edges)
+    keep = np.ones(lats.size, dtype=bool)
+    keep[1:] = (np.diff(lats) != 0.) | (np.diff(lons) != 0.)
+    lats = lats[keep]
+    lons = lons[keep]
+    if lats.size < 3:
+        return None
+
+    west, east = longitude_extent([lons])
+    if west > east:
+        lons = np.where(lons < 0., lons + 360., lons)
+
+    polygon = simplify(Polygon(np.column_stack([lats, lons])), max_vertices)
+    coords = np.array(polygon.exterior.coords)
+    if west > east:
+        coords[:, 1] = np.where(coords[:, 1] > 180., coords[:, 1] - 360., coords[:, 1])
+    pos = ["%.4f %.4f" % (xx, yy) for xx, yy in coords]
+    return {"srsName": "EPSG:4326", "pos": pos}
@@ -0,0 +1,135 @@
+"""
+Tool for detecting repeated metadata IDs, within a batch run and,
+optionally, across runs and processes through an SQLite database.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import sqlite3
+
+
+class DuplicateIdError(ValueError):
+    """Raised when the same metadata ID is found in more than one
+    file.
+    """
+    pass
+
+
+class IdRegistry(object):
+    """Register metadata IDs and the files they are read from.
+
+    The IDs of the current run are kept in a dict, so lookups take
+    constant time. If db_path is given, the IDs are also stored in an
+    SQLite database, which can be shared by several runs and worker
+    processes. An ID that is registered again for the same file (e.g.,
+    when a file is harvested again after an update) is not a
+    collision.
+
+    Parameters
+    ----------
+    db_path : str, optional
+        Path to the SQLite database. It is created if it does not
+        exist.
+
+    Examples
+    --------
+    >>> registry = IdRegistry()
+    >>> registry.register("no.met:d81ac3b4-9ab8-44ac-8b11-6bc2a4d1b8b5", "/data/a.nc")
+    True
+    >>> registry.register("no.met:d81ac3b4-9ab8-44ac-8b11-6bc2a4d1b8b5", "/data/b.nc")
+    False
+    >>> registry.collisions
+    [('no.met:d81ac3b4-9ab8-44ac-8b11-6bc2a4d1b8b5', '/data/b.nc', '/data/a.nc')]
+    """
+
+    def __init__(self, db_path=None):
+        self.ids = {}
+        self.collisions = []
+        self.db = None
+        if db_path is not None:
+            # Autocommit mode, so that other processes see the IDs
+            # as soon as they are registered
+            self.db = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata_ids "
+                "(metadata_id TEXT PRIMARY KEY, path TEXT NOT NULL)"
+            )
+
+    def __contains__(self, metadata_id):
+        if metadata_id in self.ids:
+            return True
+        return self.db is not None and self._db_path(metadata_id) is not None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _db_path(self, metadata_id):
+        row = self.db.execute(
+            "SELECT path FROM metadata_ids WHERE metadata_id = ?", (metadata_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def register(self, metadata_id, path):
+        """Register the metadata ID of a file.
+
+        Returns
+        -------
+        True if the ID is new (or already registered for the same
+        file), otherwise False. Collisions are recorded in
+        self.collisions as (metadata_id, path, previous path) tuples.
+        """
+        path = os.path.abspath(str(path))
+        previous = self.ids.get(metadata_id)
+        if previous is None and self.db is not None:
+            try:
+                self.db.execute(
+                    "INSERT INTO metadata_ids (metadata_id, path) VALUES (?, ?)",
+                    (metadata_id, path)
+                )
+            except sqlite3.IntegrityError:
+                previous = self._db_path(metadata_id)
+        if previous is not None and previous != path:
+            self.collisions.append((metadata_id, path, previous))
+            return False
+        self.ids[metadata_id] = path
+        return True
+
+    def unregister(self, metadata_id, path):
+        """Remove the metadata ID of a file, e.g., if no MMD file was
+        written for it. IDs registered for other files are kept.
+        """
+        path = os.path.abspath(str(path))
+        if self.ids.get(metadata_id) == path:
+            del self.ids[metadata_id]
+        if self.db is not None:
+            self.db.execute(
+                "DELETE FROM metadata_ids WHERE metadata_id = ? AND path = ?",
+                (metadata_id, path)
+            )
+
+    def report(self):
+        """Return a description of all collisions."""
+        lines = [
+            "%s in %s (already found in %s)" % (metadata_id, path, previous)
+            for metadata_id, path, previous in self.collisions
+        ]
+        return "\n\t".join(["Unique ID repetition. Please check your ID's."] + lines)
+
+    def check(self):
+        """Raise DuplicateIdError if any collisions were found."""
+        if self.collisions:
+            raise DuplicateIdError(self.report())
+
+    def close(self):
+        """Close the database connection."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
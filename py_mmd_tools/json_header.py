@@ -0,0 +1,248 @@
+"""
+Tools for reading the json headers of netCDF-CF files (see
+py_mmd_tools.script.ncheader2json) incrementally, so that only the
+global attributes and the variable attributes that are used in the
+translation to MMD are kept in memory. The result can be translated
+with Nc_to_mmd(header, json_input=True).
+
+The header is parsed with the json module, one top level value or
+one variable at a time. Optionally, it can be parsed with ijson
+instead, but ijson does not accept the NaN and Infinity values that
+ncheader2json writes for, e.g., _FillValue attributes.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import codecs
+import json
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+# Number of characters (or bytes) read from the header at a time
+CHUNK_SIZE = 2**16
+
+# Variable attributes that are used by Nc_to_mmd
+VARIABLE_ATTRIBUTES = frozenset(["standard_name"])
+
+WHITESPACE = " \t\n\r"
+NUMBER = "0123456789+-.eE"
+
+
+def _variable(value, attributes):
+    """Return the variable header value with only the given
+    attributes.
+    """
+    attrs = value.get("attrs", {}) if isinstance(value, dict) else {}
+    return {"attrs": {name: attrs[name] for name in attrs if name in attributes}}
+
+
+class _Reader(object):
+    """Incremental reader of a json header, which decodes one top level
+    value, or one variable, at a time with json.JSONDecoder.raw_decode.
+    Only the part of the header that is not yet parsed is buffered.
+    """
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        """Read the next chunk of size characters (or bytes), by default
+        chunk_size, into the buffer, and return False at the end of the
+        header.
+        """
+        if self.eof:
+            return False
+        while True:
+            data = self.fp.read(size or self.chunk_size)
+            if not isinstance(data, bytes):
+                break
+            text = self.utf8.decode(data, final=not data)
+            # Read on if the chunk ends within a multibyte character
+            if text or not data:
+                data = text
+                break
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        """Return the next non-whitespace character, or '' at the end
+        of the header.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def error(self, msg):
+        return json.JSONDecodeError(msg, self.buffer, self.pos)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self.error("Expecting '%s'" % char)
+        self.pos += 1
+
+    def value(self):
+        """Decode and return the next json value.
+
+        The value is decoded again from its start after each read, so
+        the size of the reads is doubled until the value is complete, to
+        keep the decoding of large values linear.
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill(size):
+                    size *= 2
+                    continue
+                raise
+            # A number may continue in the next chunk
+            number = isinstance(value, (int, float))
+            if number and not self.buffer[end:].strip(NUMBER) and self.fill(size):
+                size *= 2
+                continue
+            self.pos = end
+            return value
+
+    def key(self):
+        if self.peek() != '"':
+            raise self.error("Expecting property name enclosed in double quotes")
+        key = self.value()
+        self.expect(":")
+        return key
+
+    def members(self, func):
+        """Call func(key) for each member of the next json object."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            func(self.key())
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                self.pos -= 1
+                raise self.error("Expecting ',' delimiter")
+
+
+def _load_json(fp, attributes, chunk_size):
+    reader = _Reader(fp, chunk_size)
+    header = {}
+    variables = {}
+
+    def add_variable(name):
+        variables[name] = _variable(reader.value(), attributes)
+
+    def add_member(key):
+        if key == "variables":
+            variables.clear()
+            reader.members(add_variable)
+            header[key] = variables
+        else:
+            header[key] = reader.value()
+
+    reader.members(add_member)
+    if reader.peek() != "":
+        raise reader.error("Extra data")
+    return header
+
+
+def _ijson_value(events):
+    """Build the next value from the ijson events."""
+    builder = ijson.ObjectBuilder()
+    depth = 0
+    for prefix, event, value in events:
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        if depth == 0:
+            return builder.value
+
+
+def _load_ijson(fp, attributes, chunk_size):
+    events = ijson.parse(fp, buf_size=chunk_size, use_float=True)
+    if next(events, (None, None, None))[1] != "start_map":
+        raise ValueError("Invalid json header: expecting an object")
+    header = {}
+    for prefix, event, value in events:
+        if event != "map_key" or prefix != "":
+            continue
+        if value != "variables":
+            header[value] = _ijson_value(events)
+            continue
+        if next(events, (None, None, None))[1] != "start_map":
+            raise ValueError("Invalid json header: variables must be an object")
+        variables = {}
+        for prefix, event, name in events:
+            if event == "end_map":
+                break
+            if event == "map_key":
+                variables[name] = _variable(_ijson_value(events), attributes)
+        header[value] = variables
+    return header
+
+
+def load_header(fp, attributes=VARIABLE_ATTRIBUTES, chunk_size=CHUNK_SIZE, use_ijson=False):
+    """Read a json header of a netCDF-CF file incrementally.
+
+    Parameters
+    ----------
+    fp : file-like object
+        The json header, opened in binary or text mode.
+    attributes : set, default VARIABLE_ATTRIBUTES
+        The variable attributes to keep. The other variable attributes,
+        and the dtype and shape of the variables, are discarded as soon
+        as each variable is parsed.
+    chunk_size : int, default 2**16
+        Number of bytes (or characters) read at a time.
+    use_ijson : bool, default False
+        Parse the header with ijson (which must be installed, e.g. with
+        the ijson extra of py-mmd-tools). Only for headers without NaN
+        and Infinity values.
+
+    Returns
+    -------
+    header : dict
+        The global attributes ('global_variables'), the file
+        information, and the kept attributes of each variable
+        ('variables'), in the format of ncheader2json.
+
+    Raises
+    ------
+    ValueError
+        If the header is not valid json.
+    """
+    if use_ijson:
+        if ijson is None:
+            raise ImportError("ijson is not installed")
+        try:
+            return _load_ijson(fp, attributes, chunk_size)
+        except ijson.JSONError as e:
+            raise ValueError("Invalid json header: %s" % e) from e
+    return _load_json(fp, attributes, chunk_size)
@@ -0,0 +1,220 @@
+"""
+Tool for collecting statistics from batch runs of the nc2mmd and
+check_nc scripts, and exporting them in the OpenMetrics text format
+(e.g., for the Prometheus node_exporter textfile collector).
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import time
+
+from bisect import bisect_left
+
+from py_mmd_tools.mmd_writer import write_atomic
+
+
+class Histogram(object):
+    """Cumulative histogram of observed values (e.g., latencies in
+    seconds).
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value):
+        """Add a value to the histogram."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        """Return a list of (upper bound, cumulative count) tuples,
+        ending with the '+Inf' bucket.
+        """
+        bounds = [_format_value(bb) for bb in self.buckets] + ["+Inf"]
+        counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return list(zip(bounds, counts))
+
+
+def _format_value(value):
+    """Format a sample value the way OpenMetrics expects it."""
+    if isinstance(value, float) and value.is_integer():
+        return "%.1f" % value
+    return str(value)
+
+
+def _format_labels(labels):
+    """Format a dict of labels as '{key="value",...}'."""
+    if not labels:
+        return ""
+    items = []
+    for key, val in sorted(labels.items()):
+        val = str(val).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        items.append('%s="%s"' % (key, val))
+    return "{%s}" % ",".join(items)
+
+
+class Metrics(object):
+    """Collect throughput, error and latency statistics for a batch
+    run, based on the per-file results of Nc_to_mmd.
+
+    Parameters
+    ----------
+    job : str, default 'nc2mmd'
+        Name of the batch job. It is used as a label on all the
+        metrics, and to name the output file if the output path is a
+        textfile collector directory.
+    prefix : str, default 'py_mmd_tools'
+        Prefix of all metric names.
+    buckets : tuple of float, optional
+        Upper bounds (in seconds) of the latency histogram buckets.
+
+    Examples
+    --------
+    >>> metrics = Metrics(job="check_nc")
+    >>> metrics.observe("translate", 0.2)
+    >>> "py_mmd_tools_stage_duration_seconds_count" in metrics.render()
+    True
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+
+    def __init__(self, job="nc2mmd", prefix="py_mmd_tools", buckets=None):
+        self.job = job
+        self.prefix = prefix
+        self.buckets = self.DEFAULT_BUCKETS if buckets is None else buckets
+        self.start_time = time.time()
+        self.last_write = None
+        self.files_processed = {"ok": 0, "failed": 0}
+        self.failures = {}
+        self.bytes_hashed = 0
+        self.stage_durations = {}
+        self.opendap_probe_durations = Histogram(self.buckets)
+
+    def observe(self, stage, seconds):
+        """Add the duration of a processing stage to its histogram."""
+        if stage == "opendap_probe":
+            self.opendap_probe_durations.observe(seconds)
+            return
+        if stage not in self.stage_durations:
+            self.stage_durations[stage] = Histogram(self.buckets)
+        self.stage_durations[stage].observe(seconds)
+
+    def record_file(self, md=None, error=None):
+        """Record the result of processing one file.
+
+        Parameters
+        ----------
+        md : Nc_to_mmd, optional
+            The Nc_to_mmd instance used to process the file. Its
+            timings and number of hashed bytes are added to the
+            statistics.
+        error : Exception or str, optional
+            The exception raised while processing the file, if any, or
+            the name of the error if the file was rejected without an
+            exception (e.g., "SchemaValidationError").
+        """
+        if md is not None:
+            for stage, seconds in getattr(md, "timings", {}).items():
+                self.observe(stage, seconds)
+            self.bytes_hashed += getattr(md, "bytes_hashed", 0)
+        if error is None:
+            self.files_processed["ok"] += 1
+        else:
+            self.files_processed["failed"] += 1
+            error_type = error if isinstance(error, str) else type(error).__name__
+            self.failures[error_type] = self.failures.get(error_type, 0) + 1
+
+    def render(self):
+        """Return the collected statistics in the OpenMetrics text
+        format.
+        """
+        job = {"job": self.job}
+        lines = []
+
+        def add_metric(name, mtype, help_text, samples):
+            lines.append("# TYPE %s %s" % (name, mtype))
+            lines.append("# HELP %s %s" % (name, help_text))
+            for suffix, labels, value in samples:
+                lines.append("%s%s%s %s" % (name, suffix, _format_labels(labels),
+                                            _format_value(value)))
+
+        def histogram_samples(histogram, labels):
+            samples = []
+            for le, count in histogram.cumulative_counts():
+                samples.append(("_bucket", dict(labels, le=le), count))
+            samples.append(("_count", labels, histogram.count))
+            samples.append(("_sum", labels, float(histogram.sum)))
+            return samples
+
+        name = self.prefix + "_files_processed"
+        add_metric(name, "counter", "Number of processed files.", [
+            ("_total", dict(job, status=status), count)
+            for status, count in sorted(self.files_processed.items())
+        ])
+
+        name = self.prefix + "_failures"
+        add_metric(name, "counter", "Number of failed files by error type.", [
+            ("_total", dict(job, error_type=error_type), count)
+            for error_type, count in sorted(self.failures.items())
+        ])
+
+        name = self.prefix + "_hashed_bytes"
+        add_metric(name, "counter", "Number of bytes read for checksum calculation.", [
+            ("_total", job, self.bytes_hashed)
+        ])
+
+        name = self.prefix + "_stage_duration_seconds"
+        samples = []
+        for stage, histogram in sorted(self.stage_durations.items()):
+            samples.extend(histogram_samples(histogram, dict(job, stage=stage)))
+        add_metric(name, "histogram", "Duration of each processing stage per file.", samples)
+
+        name = self.prefix + "_opendap_probe_duration_seconds"
+        add_metric(name, "histogram", "Duration of OPeNDAP url accessibility checks.",
+                   histogram_samples(self.opendap_probe_durations, job))
+
+        name = self.prefix + "_run_start_timestamp_seconds"
+        add_metric(name, "gauge", "Start time of the batch run.", [
+            ("", job, float(self.start_time))
+        ])
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the statistics to a file, replacing it atomically.
+
+        If path is a directory (e.g., the node_exporter textfile
+        collector directory), the statistics are written to the file
+        <path>/<job>.prom.
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, "%s.prom" % self.job)
+        write_atomic(path, self.render())
+        self.last_write = time.time()
+        return path
+
+    def write_if_due(self, path, interval):
+        """Write the statistics if more than interval seconds have
+        passed since the last write (or the start of the run).
+        """
+        last = self.start_time if self.last_write is None else self.last_write
+        if time.time() - last >= interval:
+            self.write(path)
+            return True
+        return False
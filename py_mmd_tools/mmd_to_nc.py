@@ -12,40 +12,163 @@ py-mmd-tools is licensed under the Apache License 2.0
 <https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
 """
 
+import os
 import yaml
+import functools
 import netCDF4 as nc
+import numpy as np
 import lxml.etree as ET
 import py_mmd_tools
+from py_mmd_tools import mmd_xml
+from concurrent.futures import ProcessPoolExecutor
 from pkg_resources import resource_string
 
+MMD_NS = 'http://www.met.no/schema/mmd'
+
+
+@functools.lru_cache(maxsize=None)
+def _xpath(path):
+    """Return the compiled XPath expression for path, which uses the
+    'mmd' prefix for the MMD namespace.
+    """
+    return ET.XPath(path, namespaces={'mmd': MMD_NS})
+
+
+def _find(element, path):
+    """Return the first match of path in element, or None."""
+    found = _xpath(path)(element)
+    return found[0] if found else None
+
+
+@functools.lru_cache(maxsize=None)
+def load_mmd_yaml():
+    """Return the translation between MMD and ACDD (mmd_elements.yaml).
+    The file is only parsed once per process, and the returned dict is
+    shared, so it must not be modified.
+    """
+    return yaml.load(
+        resource_string(py_mmd_tools.__name__, 'mmd_elements.yaml'), Loader=yaml.FullLoader
+    )
+
+
+def cast_attribute(value, old):
+    """
+    Cast value (an ACDD attribute translated from MMD) to the type of the existing global
+    attribute old, if old is numeric. Comma separated values are cast to arrays.
+
+    Returns
+    ====
+    The cast value, or value unchanged if old is None or not numeric, or if the cast fails.
+    """
+    if old is None or isinstance(old, str):
+        return value
+    dtype = np.asarray(old).dtype
+    if dtype.kind not in 'biuf':
+        return value
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(',')]
+    try:
+        cast = np.asarray(value, dtype=float).astype(dtype)
+    except (TypeError, ValueError):
+        return value
+    if cast.size == 1 and np.ndim(old) == 0:
+        return cast.reshape(())[()]
+    return cast
+
+
+def same_attribute(old, value):
+    """
+    Return True if the existing global attribute old has the value of the ACDD attribute value.
+    Numeric attributes are compared numerically (see cast_attribute).
+    """
+    if old is None:
+        return False
+    if isinstance(old, str):
+        return old == value
+    cast = cast_attribute(value, old)
+    if isinstance(cast, str) or np.shape(cast) != np.shape(old):
+        return False
+    try:
+        return bool(np.allclose(np.asarray(old, dtype=float), np.asarray(cast, dtype=float)))
+    except (TypeError, ValueError):
+        return False
+
 
 class Mmd_to_nc(object):
     # ACDD version
     ACDD = 'ACDD-1.3'
 
-    def __init__(self, mmd_product, nc_file):
+    # Methods for MMD elements that need special treatment, by local name
+    ELEMENT_HANDLERS = {
+        'metadata_identifier': 'process_metadata_identifier',
+        'title': 'process_title_and_abstract',
+        'abstract': 'process_title_and_abstract',
+        'keywords': 'process_keywords',
+        'last_metadata_update': 'process_last_metadata_update',
+        'personnel': 'process_personnel',
+    }
+    # Methods for MMD elements that need special treatment if they have
+    # child elements, by local name
+    PARENT_HANDLERS = {
+        'dataset_citation': 'process_citation',
+        'data_center': 'process_institution',
+        'project': 'process_project',
+    }
+
+    def __init__(self, mmd_product, nc_file, mmd_yaml=None, verbose=True):
         """Class for updating a NetCDF file that is compliant with the CF-conventions and ACDD
         from an MMD XML file.
         Args:
-            mmd_product (str): Input MMD xml file.
+            mmd_product (str): Input MMD xml file, or an MMD element tree or mmd:mmd element
+                (e.g., from py_mmd_tools.mmd_xml.iter_records).
             nc_file (str): Nc file to update.
+            mmd_yaml (dict): Translation between MMD and ACDD. Optional. Default is the
+                parsed mmd_elements.yaml, shared by all instances (see load_mmd_yaml).
+            verbose (bool): Print the MMD elements that are not found in the MMD file.
+                Optional. Default is True.
         """
 
         # NC file
         self.nc = nc_file
         # MMD file content and namespaces
-        tree = ET.parse(mmd_product)
+        if isinstance(mmd_product, ET._Element):
+            tree = ET.ElementTree(mmd_product)
+        elif isinstance(mmd_product, ET._ElementTree):
+            tree = mmd_product
+        else:
+            tree = ET.parse(mmd_product)
         self.tree = tree
         self.namespaces = tree.getroot().nsmap
         self.namespaces.update({'xml': 'http://www.w3.org/XML/1998/namespace'})
         # Translation file between MMD and ACDD
-        self.mmd_yaml = yaml.load(
-            resource_string(py_mmd_tools.__name__, 'mmd_elements.yaml'), Loader=yaml.FullLoader
-        )
-        # Dictionary that will contain all ACDD attributes
-        self.acdd_metadata = None
+        if mmd_yaml is None:
+            mmd_yaml = load_mmd_yaml()
+        self.mmd_yaml = mmd_yaml
+        self.verbose = verbose
+        # Dictionary that will contain all ACDD attributes, as lists of values and separators
+        # that are joined when the attributes are read (see acdd_metadata)
+        self._acdd_parts = None
         return
 
+    @property
+    def acdd_metadata(self):
+        """
+        Dictionary with the ACDD attributes translated so far, or None if there are none.
+        """
+        if self._acdd_parts is None:
+            return None
+        return {
+            key: parts[0] if len(parts) == 1 else ''.join(parts)
+            for key, parts in self._acdd_parts.items()
+        }
+
+    @acdd_metadata.setter
+    def acdd_metadata(self, acdd_metadata):
+        if acdd_metadata is None:
+            self._acdd_parts = None
+        else:
+            self._acdd_parts = {key: [value] for key, value in acdd_metadata.items()}
+
     @staticmethod
     def get_acdd(mmd_field):
         """
@@ -119,7 +242,7 @@ class Mmd_to_nc(object):
                     raise ValueError('Multiple ACDD or ACCD extension fields provided.'
                                      ' Please use another translation function.')
                 # Update the dictionary containing the ACDD elements
-                self.update_acdd({acdd_name[0]: xml_element.text}, {acdd_name[0]: sep})
+                self.update_acdd({acdd_name[0]: xml_element.text}, {acdd_name[0]: sep[0]})
 
     def update_acdd(self, new_dict, sep=None):
         """
@@ -134,26 +257,25 @@ class Mmd_to_nc(object):
             defined, it must contain the same keys as new_dict.
 
         """
-        # If self.acdd_metadata is empty, fill it with new_dict
-        if self.acdd_metadata is None:
-            self.acdd_metadata = new_dict
-
-        # Main case
-        else:
-
-            # Loop on new_dict keys
-            for key in new_dict:
-
-                # If a key is already present in acdd_metadata,
-                # then the content of new_dict[key] must be appended to the already existing
-                # content of self.acdd_metadata[key], using the separator from the sep dictionary
-                if key in self.acdd_metadata:
-                    self.acdd_metadata[key] = sep[key].join([self.acdd_metadata[key],
-                                                             new_dict[key]])
-
-                # Otherwise, add a new key to acdd_metadata
-                else:
-                    self.acdd_metadata[key] = new_dict[key]
+        # The values are collected in lists, and only joined when the ACDD attributes are read,
+        # to avoid building the same string repeatedly for MMD elements with many repetitions
+        if self._acdd_parts is None:
+            self._acdd_parts = {}
+
+        # Loop on new_dict keys
+        for key in new_dict:
+
+            # If a key is already present in acdd_metadata,
+            # then the content of new_dict[key] must be appended to the already existing
+            # content of self.acdd_metadata[key], using the separator from the sep dictionary
+            if key in self._acdd_parts:
+                if not isinstance(sep[key], str):
+                    raise TypeError("No separator given for the repeated ACDD attribute %s" % key)
+                self._acdd_parts[key].extend([sep[key], new_dict[key]])
+
+            # Otherwise, add a new key to acdd_metadata
+            else:
+                self._acdd_parts[key] = [new_dict[key]]
 
     def process_metadata_identifier(self, element):
         """ The metadata_identifier in MMD is translated to two
@@ -177,14 +299,11 @@ class Mmd_to_nc(object):
         """ long and short names need to be recomposed.
         """
         # Corresponding ACDD element name
-        print(element)
         acdd_name, comments, sep = Mmd_to_nc.get_acdd(
             self.mmd_yaml['data_center']['data_center_name'])
         assert 'institution' in acdd_name
-        inst_name = '%s (%s)' % (element.find('mmd:data_center_name/mmd:long_name',
-                                              namespaces=self.namespaces).text,
-                                 element.find('mmd:data_center_name/mmd:short_name',
-                                              namespaces=self.namespaces).text)
+        inst_name = '%s (%s)' % (_find(element, 'mmd:data_center_name/mmd:long_name').text,
+                                 _find(element, 'mmd:data_center_name/mmd:short_name').text)
         self.update_acdd({
             'institution': inst_name
         })
@@ -193,15 +312,12 @@ class Mmd_to_nc(object):
         """ long and short names need to be recomposed.
         """
         # Corresponding ACDD element name
-        print(element)
         acdd_name, comments, sep = Mmd_to_nc.get_acdd(self.mmd_yaml['platform'])
         assert 'platform' in acdd_name
-        platf_name = '%s (%s)' % (element.find('mmd:long_name', namespaces=self.namespaces).text,
-                                  element.find('mmd:short_name', namespaces=self.namespaces).text)
-        instr_name = '%s (%s)' % (element.find('mmd:instrument/mmd:long_name',
-                                               namespaces=self.namespaces).text,
-                                  element.find('mmd:instrument/mmd:short_name',
-                                               namespaces=self.namespaces).text)
+        platf_name = '%s (%s)' % (_find(element, 'mmd:long_name').text,
+                                  _find(element, 'mmd:short_name').text)
+        instr_name = '%s (%s)' % (_find(element, 'mmd:instrument/mmd:long_name').text,
+                                  _find(element, 'mmd:instrument/mmd:short_name').text)
         self.update_acdd({
             'platform': platf_name,
             'instrument': instr_name
@@ -213,8 +329,8 @@ class Mmd_to_nc(object):
         # Corresponding ACDD element name
         acdd_name, comments, sep = Mmd_to_nc.get_acdd(self.mmd_yaml['project'])
         assert 'project' in acdd_name
-        proj_name = '%s (%s)' % (element.find('mmd:long_name', namespaces=self.namespaces).text,
-                                 element.find('mmd:short_name', namespaces=self.namespaces).text)
+        proj_name = '%s (%s)' % (_find(element, 'mmd:long_name').text,
+                                 _find(element, 'mmd:short_name').text)
         self.update_acdd({
             'project': proj_name
         })
@@ -240,8 +356,7 @@ class Mmd_to_nc(object):
         """
 
         self.update_acdd({
-            'date_created': element.find('mmd:update/mmd:datetime',
-                                         namespaces=self.namespaces).text
+            'date_created': _find(element, 'mmd:update/mmd:datetime').text
         }, {
             'date_created': self.mmd_yaml['last_metadata_update']['update']
                                          ['datetime']['acdd']['date_created']
@@ -280,7 +395,7 @@ class Mmd_to_nc(object):
         # and they are not the same for creator and contributor type,
         # and some are optional while others are required,
         # so build appropriate lists of fields to translate
-        if element.find('mmd:role', namespaces=self.namespaces).text == 'Technical contact':
+        if _find(element, 'mmd:role').text == 'Technical contact':
             prefix = 'creator'
             acdd_translation_and_mmd_required_fields = ['role', 'name', 'email']
             acdd_translation_and_mmd_optional_fields = ['organisation']
@@ -292,12 +407,12 @@ class Mmd_to_nc(object):
         # Process the mandatory fields
         for mmd_field in acdd_translation_and_mmd_required_fields:
             nc_field = '_'.join([prefix, mmd_field])
-            out[nc_field] = element.find(f'mmd:{mmd_field}', namespaces=self.namespaces).text
+            out[nc_field] = _find(element, f'mmd:{mmd_field}').text
             sep[nc_field] = separator
 
         # Process the optional field, so first check if they are defined in the MMD file
         for mmd_field in acdd_translation_and_mmd_optional_fields:
-            field = element.find(f'mmd:{mmd_field}', namespaces=self.namespaces)
+            field = _find(element, f'mmd:{mmd_field}')
             if field is not None:
                 nc_field = '_'.join([prefix, mmd_field])
                 out[nc_field] = field.text
@@ -337,15 +452,14 @@ class Mmd_to_nc(object):
 
         # ACDD keywords element
         # Syntax: "prefix:keyword"
-        out['keywords'] = ':'.join([prefix, element.find('mmd:keyword',
-                                                         namespaces=self.namespaces).text])
+        out['keywords'] = ':'.join([prefix, _find(element, 'mmd:keyword').text])
         for key in self.mmd_yaml['keywords']['keyword']['acdd'].keys():
             sep['keywords'] = self.mmd_yaml['keywords']['keyword']['acdd'][key]['separator']
 
         # ACDD keywords_vocabulary element
         # Syntax: "prefix:uri"
         # URI is only optional in MMD, so check if it is defined before translation
-        found = element.find('mmd:resource', namespaces=self.namespaces)
+        found = _find(element, 'mmd:resource')
         if found is not None:
             out['keywords_vocabulary'] = ':'.join([prefix, found.text])
             for key in self.mmd_yaml['keywords']['vocabulary']['acdd'].keys():
@@ -380,7 +494,7 @@ class Mmd_to_nc(object):
             </mmd:dataset_citation>
         """
         for child in ['publisher', 'url']:
-            found = element.find(f'mmd:{child}', namespaces=self.namespaces)
+            found = _find(element, f'mmd:{child}')
             if found is not None:
                 self.update_acdd({
                     list(self.mmd_yaml['dataset_citation'][child]['acdd'].keys())[0]: found.text
@@ -409,104 +523,254 @@ class Mmd_to_nc(object):
         if element.attrib["{%s}" % self.namespaces['xml'] + 'lang'] == 'en':
             self.update_acdd({acdd_name[0]: element.text})
 
-    def update_nc(self):
+    def process_children(self, element):
         """
-        Update a netcdf file global attributes.
+        Translate the child elements (and grandchild elements) of an MMD element to ACDD.
+
+        Input
+        ====
+        element: XML element from MMD with child elements, e.g., 'platform'
         """
+        # Name of the parent element without namespace
+        parent_name = ET.QName(element).localname
+        # Extract of mmd_yaml for this element and its children
+        mmd_yaml_extract = self.mmd_yaml[parent_name]
+
+        if parent_name == 'platform':
+            self.process_platforminstrument_name(element)
+        # Loop on child elements
+        for child_element in element:
+
+            # If child element has children elements also
+            if len(child_element) > 0:
+
+                # Extract of mmd_yaml_extract for this child element and its children
+                child_name = ET.QName(child_element).localname
+                mmd_yaml_extract_extract = mmd_yaml_extract[child_name]
+
+                for grandchild_element in child_element:
+                    self.process_element(grandchild_element, mmd_yaml_extract_extract)
+
+            # If child element has no children elements
+            else:
+                self.process_element(child_element, mmd_yaml_extract)
+
+    def to_acdd(self):
+        """
+        Translate the MMD elements to ACDD, and return the ACDD dictionary (self.acdd_metadata).
+
+        The MMD tree is traversed once, collecting the top level elements by local name. They
+        are then translated in the order of mmd_yaml (so that, e.g., dataset_citation is
+        processed after the elements it depends on), using the methods in ELEMENT_HANDLERS and
+        PARENT_HANDLERS for elements that need special treatment.
+        """
+        self._acdd_parts = None
+        prefix = '{%s}' % MMD_NS
+        elements = {}
+        for element in self.tree.getroot():
+            # Skip comments and processing instructions, and elements from other namespaces
+            if isinstance(element.tag, str) and element.tag.startswith(prefix):
+                elements.setdefault(element.tag[len(prefix):], []).append(element)
 
         # Loop on elements from mmd_yaml
         for mmd_element in self.mmd_yaml:
 
-            # Find corresponding XML element in the MMD file
-            elements = self.tree.findall('mmd:' + mmd_element, self.namespaces)
-
             # Not all elements on mmd_yaml are required MMD elements,
             # So, if element is not found in the MMD file, continue
-            if len(elements) == 0:
-                print(f'{mmd_element} not found in input MMD file')
+            if mmd_element not in elements:
+                if self.verbose:
+                    print(f'{mmd_element} not found in input MMD file')
                 continue
 
+            handler = self.ELEMENT_HANDLERS.get(mmd_element)
+            parent_handler = self.PARENT_HANDLERS.get(mmd_element)
+
             # Loop the elements found in the MMD file (some MMD
             # elements have repetition allowed)
-            for element in elements:
-
-                # Special case for metadata_identifier
-                if mmd_element == 'metadata_identifier':
-                    self.process_metadata_identifier(element)
-
-                # Special case for MMD elements "title" and "abstract"
-                elif mmd_element in ['title', 'abstract']:
-                    self.process_title_and_abstract(element)
-
-                # Special case for keywords element
-                elif mmd_element == 'keywords':
-                    self.process_keywords(element)
-
-                # Special case for MMD element "last_metadata_update"
-                elif mmd_element == 'last_metadata_update':
-                    self.process_last_metadata_update(element)
-
-                # Special case for MMD element 'personnel' and its child elements
-                elif mmd_element == 'personnel':
-                    self.process_personnel(element)
+            for element in elements[mmd_element]:
+                if handler is not None:
+                    getattr(self, handler)(element)
 
                 # If XML element found has no child elements, process it directly
-                elif len(list(element)) == 0:
+                elif len(element) == 0:
                     self.process_element(element, self.mmd_yaml)
 
-                # Special case for MMD element "dataset_citation"
-                # Processed last as its translation depends on other MMD elements processed
-                # previously
-                elif mmd_element == 'dataset_citation':
-                    self.process_citation(element)
-
-                elif mmd_element == 'data_center':
-                    self.process_institution(element)
-
-                elif mmd_element == 'project':
-                    self.process_project(element)
+                elif parent_handler is not None:
+                    getattr(self, parent_handler)(element)
 
                 # Last case: the XML element has child elements
                 else:
+                    self.process_children(element)
+
+        return self.acdd_metadata
+
+    def conventions(self, current):
+        """
+        Return the Conventions global attribute, with the ACDD version added to the current
+        Conventions (if it is not already there).
+        """
+        if not current:
+            return self.ACDD
+        if self.ACDD in [convention.strip() for convention in current.split(',')]:
+            return current
+        return current + ', ' + self.ACDD
 
-                    # Name of the parent element without namespace
-                    parent_name = ET.QName(element).localname
-                    # Extract of mmd_yaml for this element and its children
-                    mmd_yaml_extract = self.mmd_yaml[parent_name]
+    def diff_nc(self):
+        """
+        Compare the ACDD attributes translated from MMD with the global attributes of the netcdf
+        file, which is only opened for reading.
 
-                    if mmd_element == 'platform':
-                        self.process_platforminstrument_name(element)
-                    # Loop on child elements
-                    for child_element in list(element):
+        Returns
+        ====
+        delta: dictionary with the global attributes that are missing or have another value in
+            the netcdf file, as {name: (current value or None, new value)}. Numeric attributes
+            are compared numerically, and their new value is cast to the type of the current
+            value. The dictionary is empty if the netcdf file is up to date.
+        """
+        acdd_metadata = self.to_acdd()
+        with nc.Dataset(self.nc, 'r') as f:
+            current = {key: f.getncattr(key) for key in f.ncattrs()}
+        acdd_metadata['Conventions'] = self.conventions(current.get('Conventions'))
+
+        delta = {}
+        for key, value in acdd_metadata.items():
+            old = current.get(key)
+            if not same_attribute(old, value):
+                delta[key] = (old, cast_attribute(value, old))
+        return delta
+
+    def update_nc(self, overwrite=False):
+        """
+        Update a netcdf file global attributes.
 
-                        # If child element has children elements also
-                        if len(list(child_element)) > 0:
+        Input
+        ====
+        overwrite: bool. Optional. Default is False, which raises an Exception if any of the
+            ACDD attributes is already a global attribute of the netcdf file (except for
+            Conventions). If True, only the attributes that are missing or have changed (see
+            diff_nc) are written, in a single call to setncatts, and the netcdf file is not
+            opened for writing if it is already up to date.
 
-                            # Extract of mmd_yaml_extract for this child element and its children
-                            child_name = ET.QName(child_element).localname
-                            mmd_yaml_extract_extract = mmd_yaml_extract[child_name]
+        Returns
+        ====
+        Dictionary with the global attributes that were written.
+        """
+        if overwrite:
+            acdd_metadata = {key: new for key, (old, new) in self.diff_nc().items()}
+            if acdd_metadata:
+                with nc.Dataset(self.nc, 'a') as f:
+                    f.setncatts(acdd_metadata)
+            return acdd_metadata
 
-                            for grandchild_element in list(child_element):
-                                self.process_element(grandchild_element, mmd_yaml_extract_extract)
+        acdd_metadata = self.to_acdd()
 
-                        # If child element has no children elements
-                        else:
-                            self.process_element(child_element, mmd_yaml_extract)
+        # The netcdf library creates missing files in append mode
+        if not os.path.isfile(self.nc):
+            raise FileNotFoundError("No such netcdf file: %s" % self.nc)
 
         # Open netcdf file for reading and appending
         with nc.Dataset(self.nc, 'a') as f:
 
             # Append global attribute Conventions
-            self.acdd_metadata['Conventions'] = f.Conventions + ', ' + self.ACDD
+            acdd_metadata['Conventions'] = self.conventions(getattr(f, 'Conventions', None))
 
             # Check that there is no conflict between ACDD global attributes created from MMD
             # and global attributes already set in netcdf file. Only new global attributes are
             # allowed, except for Conventions.
-            for key in self.acdd_metadata:
+            for key in acdd_metadata:
                 if key in f.ncattrs() and key != 'Conventions':
                     raise Exception("%s is already a global attribute" % key)
 
             # Add all global metadata to netcdf at once
-            f.setncatts(self.acdd_metadata)
-
-        return
+            f.setncatts(acdd_metadata)
+
+        return acdd_metadata
+
+
+def mmd_to_acdd(mmd, mmd_yaml=None):
+    """
+    Translate an MMD record to ACDD, without reading or writing any files.
+
+    Input
+    ====
+    mmd: MMD element tree, mmd:mmd element, or MMD document as bytes
+    mmd_yaml: translation between MMD and ACDD. Optional. Default is the parsed
+        mmd_elements.yaml.
+
+    Returns
+    ====
+    Dictionary with the ACDD attributes (without Conventions).
+    """
+    if isinstance(mmd, bytes):
+        mmd = ET.fromstring(mmd)
+    return Mmd_to_nc(mmd, None, mmd_yaml=mmd_yaml, verbose=False).to_acdd() or {}
+
+
+def iter_acdd(source, mmd_yaml=None):
+    """
+    Translate the MMD records in an MMD file or collection file to ACDD, one record at a time.
+
+    Input
+    ====
+    source: MMD file or collection file, or file object (see py_mmd_tools.mmd_xml.iter_records)
+    mmd_yaml: translation between MMD and ACDD. Optional. Default is the parsed
+        mmd_elements.yaml.
+
+    Yields
+    ====
+    Dictionary with the ACDD attributes of each record.
+    """
+    for record in mmd_xml.iter_records(source):
+        yield mmd_to_acdd(record, mmd_yaml=mmd_yaml)
+
+
+def _update_nc_file(mmd_product, nc_file, overwrite=False, dry_run=False):
+    """Update nc_file from mmd_product, and return the result as
+    (mmd_product, nc_file, error, delta), where error is None on
+    success.
+    """
+    delta = None
+    try:
+        md = Mmd_to_nc(mmd_product, nc_file)
+        if dry_run:
+            delta = md.diff_nc()
+        else:
+            delta = md.update_nc(overwrite=overwrite)
+    except Exception as e:
+        return mmd_product, nc_file, '%s: %s' % (type(e).__name__, e), delta
+    return mmd_product, nc_file, None, delta
+
+
+def update_nc_files(pairs, processes=None, chunksize=1, overwrite=False, dry_run=False):
+    """
+    Update many NetCDF files from MMD files in a pool of worker processes.
+
+    Each worker parses mmd_elements.yaml once, and shares it between all the files it updates.
+    A failure for one file does not stop the other updates.
+
+    Input
+    ====
+    pairs: iterable of (MMD file, NetCDF file) tuples
+    processes: number of worker processes. Optional. Default is the number of CPUs. If 1,
+        the files are updated in the current process.
+    chunksize: number of pairs sent to a worker process at a time. Optional. Default is 1.
+    overwrite: replace global attributes that are already in the NetCDF files, and only write
+        the attributes that have changed (see Mmd_to_nc.update_nc). Optional. Default is False.
+    dry_run: only compare the attributes with the NetCDF files (see Mmd_to_nc.diff_nc).
+        Optional. Default is False.
+
+    Returns
+    ====
+    results: list of (MMD file, NetCDF file, error, delta) tuples, in the order of pairs, where
+        error is None if the update succeeded, and otherwise a description of the error. delta
+        is the dictionary returned by Mmd_to_nc.diff_nc if dry_run is True, and otherwise the
+        global attributes that were written.
+    """
+    pairs = list(pairs)
+    if len(pairs) == 0:
+        return []
+    update = functools.partial(_update_nc_file, overwrite=overwrite, dry_run=dry_run)
+    if processes == 1:
+        return [update(mmd_product, nc_file) for mmd_product, nc_file in pairs]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(update, *zip(*pairs), chunksize=chunksize))
@@ -0,0 +1,292 @@
+"""
+Tools for writing MMD files atomically, optionally gzip compressed or
+bundled in tar or zip archives, with batched syncing to disk. This
+keeps the number of metadata operations low when writing many MMD
+files to a parallel filesystem (e.g., Lustre).
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import io
+import os
+import glob
+import gzip
+import time
+import secrets
+import tarfile
+import zipfile
+
+
+# Suffix of the temporary files, which are named
+# .<final name>.<random>.tmp
+TMP_SUFFIX = ".tmp"
+
+
+def _mkstemp(path):
+    """Create a temporary file next to path, and return its file
+    descriptor and name. The file mode is 0666 minus the umask, as for
+    a file created with open(), since it is renamed to path.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp = os.path.join(dirname, ".%s.%s%s" % (
+            os.path.basename(path), secrets.token_hex(4), TMP_SUFFIX))
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+def remove_stale_files(dirname):
+    """Remove the temporary files that an interrupted run has left in
+    dirname, and return their names. Must not be called while another
+    process is writing to dirname.
+    """
+    removed = []
+    pattern = ".*.*" + TMP_SUFFIX
+    for tmp in glob.glob(os.path.join(glob.escape(str(dirname)), pattern)):
+        os.unlink(tmp)
+        removed.append(tmp)
+    return removed
+
+
+def _to_bytes(content):
+    if isinstance(content, str):
+        return content.encode("utf-8")
+    return content
+
+
+def _fsync_dir(dirname):
+    """Sync a directory, so that renames in it are persistent."""
+    fd = os.open(dirname, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, content, fsync=False):
+    """Write content (str or bytes) to path via a temporary file in
+    the same directory, which is renamed to path when complete.
+    Readers therefore never see a partially written file.
+    """
+    path = str(path)
+    fd, tmp = _mkstemp(path)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(_to_bytes(content))
+            if fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    if fsync:
+        _fsync_dir(os.path.dirname(os.path.abspath(path)))
+    return path
+
+
+class FileWriter(object):
+    """Write one file per MMD document.
+
+    Each document is written to a temporary file. If fsync is True,
+    the temporary files are synced and renamed in batches of
+    batch_size files, followed by a single sync of each output
+    directory. Otherwise, the files are renamed immediately.
+
+    Parameters
+    ----------
+    compress : bool, default False
+        Gzip the files, and add the suffix '.gz' to their names.
+    batch_size : int, default 100
+        Number of files per batch of syncs.
+    fsync : bool, default True
+        Sync the files to disk before they get their final names.
+
+    Examples
+    --------
+    >>> with FileWriter(compress=True) as writer:
+    ...     writer.write("/tmp/example.xml", "<mmd:mmd/>")
+    '/tmp/example.xml.gz'
+    """
+
+    def __init__(self, compress=False, batch_size=100, fsync=True):
+        self.compress = compress
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, path, content):
+        """Write content (str or bytes) to path, and return the final
+        path of the file. If fsync is True, the file only exists at
+        that path after the next flush(); until then, it is a hidden
+        temporary file (see remove_stale_files).
+        """
+        path = str(path)
+        data = _to_bytes(content)
+        if self.compress:
+            path += ".gz"
+            data = gzip.compress(data)
+        if not self.fsync:
+            return write_atomic(path, data)
+        fd, tmp = _mkstemp(path)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.pending.append((tmp, path))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return path
+
+    def flush(self):
+        """Sync and rename all pending files."""
+        dirs = set()
+        for tmp, path in self.pending:
+            with open(tmp, "rb") as fh:
+                os.fsync(fh.fileno())
+            os.replace(tmp, path)
+            dirs.add(os.path.dirname(os.path.abspath(path)))
+        for dirname in dirs:
+            _fsync_dir(dirname)
+        self.pending = []
+
+    def close(self):
+        """Flush the pending files."""
+        self.flush()
+
+
+class ArchiveWriter(object):
+    """Bundle MMD documents in tar or zip archives.
+
+    The documents are written to numbered archive parts,
+    <name>.<number>.<suffix>, each holding at most batch_size
+    documents. A part is written to a temporary file, and only gets
+    its final name (after being synced to disk) when it is complete.
+    New parts are numbered after existing ones, so that a resumed run
+    does not overwrite the output of an interrupted run.
+
+    Parameters
+    ----------
+    path : str
+        Archive name. The format is given by the suffix, which must
+        be one of '.tar', '.tar.gz', '.tgz' or '.zip'.
+    batch_size : int, default 1000
+        Maximum number of documents per archive part.
+
+    Examples
+    --------
+    >>> with ArchiveWriter("/tmp/mmd.tar") as writer:
+    ...     location = writer.write("/tmp/mmd/example.xml", "<mmd:mmd/>")
+    >>> location.endswith(".tar:example.xml")
+    True
+    """
+
+    SUFFIXES = (".tar.gz", ".tgz", ".tar", ".zip")
+
+    def __init__(self, path, batch_size=1000):
+        path = str(path)
+        for suffix in self.SUFFIXES:
+            if path.endswith(suffix):
+                break
+        else:
+            raise ValueError("Archive name must end with one of %s" % ", ".join(self.SUFFIXES))
+        self.suffix = suffix
+        self.base = path[:-len(suffix)]
+        self.batch_size = batch_size
+        self.part = self._last_part()
+        self.archive = None
+        self.tmp = None
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _part_name(self, part):
+        return "%s.%05d%s" % (self.base, part, self.suffix)
+
+    def _last_part(self):
+        last = 0
+        for fn in glob.glob(glob.escape(self.base) + ".*" + self.suffix):
+            number = fn[len(self.base) + 1:-len(self.suffix)]
+            if number.isdigit():
+                last = max(last, int(number))
+        return last
+
+    def _open(self):
+        self.part += 1
+        fd, self.tmp = _mkstemp(self._part_name(self.part))
+        os.close(fd)
+        if self.suffix == ".zip":
+            self.archive = zipfile.ZipFile(self.tmp, "w", compression=zipfile.ZIP_DEFLATED)
+        elif self.suffix == ".tar":
+            self.archive = tarfile.open(self.tmp, "w")
+        else:
+            self.archive = tarfile.open(self.tmp, "w:gz")
+        self.count = 0
+
+    @property
+    def is_open(self):
+        """True if an archive part is being written."""
+        return self.archive is not None
+
+    @property
+    def current(self):
+        """Final name of the archive part that is being written."""
+        return self._part_name(self.part)
+
+    def write(self, path, content):
+        """Add content (str or bytes) to the archive, with the base
+        name of path as member name. Returns '<archive part>:<member>'.
+        """
+        if self.archive is None:
+            self._open()
+        data = _to_bytes(content)
+        member = os.path.basename(str(path))
+        if self.suffix == ".zip":
+            self.archive.writestr(member, data)
+        else:
+            info = tarfile.TarInfo(member)
+            info.size = len(data)
+            info.mtime = time.time()
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(data))
+        location = "%s:%s" % (self.current, member)
+        self.count += 1
+        if self.count >= self.batch_size:
+            self.flush()
+        return location
+
+    def flush(self):
+        """Complete the current archive part."""
+        if self.archive is None:
+            return
+        self.archive.close()
+        self.archive = None
+        with open(self.tmp, "rb") as fh:
+            os.fsync(fh.fileno())
+        os.replace(self.tmp, self.current)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.current)))
+        self.tmp = None
+
+    def close(self):
+        """Complete the current archive part."""
+        self.flush()
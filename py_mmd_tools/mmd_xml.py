@@ -0,0 +1,321 @@
+"""
+Tools for building MMD documents as lxml element trees, as an
+alternative to rendering the Jinja template (templates/mmd_template.xml)
+as text, for validating and transforming them in memory (e.g., to
+ISO 19115) with XML schemas and XSLT stylesheets that are compiled once
+per thread, and for reading large collections of MMD records one at a
+time.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import threading
+
+import lxml.etree as ET
+
+MMD_NS = "http://www.met.no/schema/mmd"
+GML_NS = "http://www.opengis.net/gml"
+NAMESPACES = {"mmd": MMD_NS, "gml": GML_NS}
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Optional child elements, in MMD order
+PERSONNEL_OPTIONAL = ["phone", "fax", "organisation"]
+CONTACT_ADDRESS = ["address", "city", "province_or_state", "postal_code", "country"]
+PLATFORM_OPTIONAL = ["resource", "orbit_relative", "orbit_absolute", "orbit_direction"]
+INSTRUMENT_OPTIONAL = ["short_name", "long_name", "resource", "mode", "polarisation",
+                       "product_type"]
+ANCILLARY_OPTIONAL = ["cloud_coverage", "scene_coverage", "timeliness"]
+CITATION_OPTIONAL = ["author", "publication_date", "title", "series", "edition", "volume",
+                     "issue", "publication_place", "publisher", "pages", "isbn", "doi", "url",
+                     "other"]
+
+
+def _get(data, key):
+    """Return data[key], or None if it is not available."""
+    if isinstance(data, dict):
+        return data.get(key)
+    return None
+
+
+def _text(data, key):
+    """Return data[key] as text, the same way as the Jinja template
+    renders it (i.e., '' for a missing key, and 'None' for None).
+    """
+    if not isinstance(data, dict) or key not in data:
+        return ""
+    return str(data[key])
+
+
+def _sub(parent, tag, text=None, attrib=None, ns=MMD_NS):
+    """Add a child element to parent, and return it."""
+    element = ET.SubElement(parent, "{%s}%s" % (ns, tag), attrib)
+    if text is not None:
+        element.text = text
+    return element
+
+
+def _sub_optional(parent, data, keys):
+    """Add a child element for each of keys with a value in data."""
+    for key in keys:
+        if _get(data, key):
+            _sub(parent, key, _text(data, key))
+
+
+def metadata_to_tree(data):
+    """Build an MMD document from a metadata dict (as created by
+    Nc_to_mmd.to_mmd), with the same content and element order as
+    templates/mmd_template.xml.
+
+    Parameters
+    ----------
+    data : dict
+        MMD metadata (see Nc_to_mmd.metadata).
+
+    Returns
+    -------
+    root : lxml.etree._Element
+        The mmd:mmd root element.
+    """
+    root = ET.Element("{%s}mmd" % MMD_NS, nsmap=NAMESPACES)
+    _sub(root, "metadata_identifier", _text(data, "metadata_identifier"))
+    for item in _get(data, "alternate_identifier") or []:
+        _sub(root, "alternate_identifier", _text(item, "alternate_identifier"),
+             {"type": _text(item, "alternate_identifier_type")})
+    for title in _get(data, "title") or []:
+        _sub(root, "title", _text(title, "title"), {XML_LANG: _text(title, "lang")})
+    for abstract in _get(data, "abstract") or []:
+        _sub(root, "abstract", _text(abstract, "abstract"), {XML_LANG: _text(abstract, "lang")})
+    _sub(root, "metadata_status", _text(data, "metadata_status"))
+    _sub(root, "dataset_production_status", _text(data, "dataset_production_status"))
+    for collection in _get(data, "collection") or []:
+        _sub(root, "collection", str(collection))
+
+    last_update = _sub(root, "last_metadata_update")
+    for update in _get(_get(data, "last_metadata_update"), "update") or []:
+        element = _sub(last_update, "update")
+        _sub(element, "datetime", _text(update, "datetime"))
+        _sub_optional(element, update, ["type", "note"])
+
+    for temporal_extent in _get(data, "temporal_extent") or []:
+        element = _sub(root, "temporal_extent")
+        _sub(element, "start_date", _text(temporal_extent, "start_date"))
+        _sub_optional(element, temporal_extent, ["end_date"])
+
+    for iso_topic_category in _get(data, "iso_topic_category") or []:
+        _sub(root, "iso_topic_category", str(iso_topic_category))
+
+    for vocabulary in _get(data, "keywords") or []:
+        element = _sub(root, "keywords", attrib={"vocabulary": _text(vocabulary, "vocabulary")})
+        for keyword in _get(vocabulary, "keyword") or []:
+            _sub(element, "keyword", str(keyword))
+        _sub(element, "resource", _text(vocabulary, "resource"))
+        _sub(element, "separator", _text(vocabulary, "separator"))
+
+    geographic_extent = _get(data, "geographic_extent")
+    element = _sub(root, "geographic_extent")
+    rectangle = _get(geographic_extent, "rectangle")
+    rect = _sub(element, "rectangle", attrib={"srsName": _text(rectangle, "srsName")})
+    for direction in ["north", "south", "east", "west"]:
+        _sub(rect, direction, _text(rectangle, direction))
+    polygon = _get(geographic_extent, "polygon")
+    if polygon:
+        gml_polygon = _sub(_sub(element, "polygon"), "Polygon", ns=GML_NS,
+                           attrib={"id": "polygon", "srsName": _text(polygon, "srsName")})
+        ring = _sub(_sub(gml_polygon, "exterior", ns=GML_NS), "LinearRing", ns=GML_NS)
+        for pos in _get(polygon, "pos") or []:
+            _sub(ring, "pos", str(pos), ns=GML_NS)
+
+    _sub_optional(root, data, ["dataset_language", "operational_status", "access_constraint"])
+
+    use_constraint = _get(data, "use_constraint")
+    if use_constraint:
+        element = _sub(root, "use_constraint")
+        _sub_optional(element, use_constraint, ["identifier", "resource", "license_text"])
+
+    for personnel in _get(data, "personnel") or []:
+        element = _sub(root, "personnel")
+        for key in ["role", "name", "email"]:
+            _sub(element, key, _text(personnel, key))
+        _sub_optional(element, personnel, PERSONNEL_OPTIONAL)
+        contact_address = _get(personnel, "contact_address")
+        if contact_address:
+            address = _sub(element, "contact_address")
+            for key in CONTACT_ADDRESS:
+                _sub(address, key, _text(contact_address, key))
+
+    for data_center in _get(data, "data_center") or []:
+        element = _sub(root, "data_center")
+        name = _sub(element, "data_center_name")
+        _sub_optional(name, _get(data_center, "data_center_name"), ["short_name", "long_name"])
+        _sub(element, "data_center_url", _text(data_center, "data_center_url"))
+
+    _sub_optional(root, data, ["quality_control"])
+
+    for data_access in _get(data, "data_access") or []:
+        element = _sub(root, "data_access")
+        for key in ["type", "description", "resource"]:
+            _sub(element, key, _text(data_access, key))
+        wms_layers = _get(data_access, "wms_layers")
+        if wms_layers:
+            layers = _sub(element, "wms_layers")
+            for layer in wms_layers:
+                _sub(layers, "wms_layer", str(layer))
+
+    for related_dataset in _get(data, "related_dataset") or []:
+        _sub(root, "related_dataset", _text(related_dataset, "id"),
+             {"relation_type": _text(related_dataset, "relation_type")})
+
+    storage_information = _get(data, "storage_information")
+    if storage_information:
+        element = _sub(root, "storage_information")
+        for key in ["file_name", "file_location", "file_format"]:
+            _sub(element, key, _text(storage_information, key))
+        _sub(element, "file_size", _text(storage_information, "file_size"),
+             {"unit": _text(storage_information, "file_size_unit")})
+        if _get(storage_information, "checksum"):
+            _sub(element, "checksum", _text(storage_information, "checksum"),
+                 {"type": _text(storage_information, "checksum_type")})
+
+    for related_info in _get(data, "related_information") or []:
+        element = _sub(root, "related_information")
+        for key in ["type", "description", "resource"]:
+            _sub(element, key, _text(related_info, key))
+
+    for project in _get(data, "project") or []:
+        element = _sub(root, "project")
+        _sub(element, "short_name", _text(project, "short_name") if _get(project, "short_name")
+             else "")
+        _sub_optional(element, project, ["long_name"])
+
+    for platform in _get(data, "platform") or []:
+        element = _sub(root, "platform")
+        for key in ["short_name", "long_name"]:
+            _sub(element, key, _text(platform, key) if _get(platform, key) else "")
+        _sub_optional(element, platform, PLATFORM_OPTIONAL)
+        instrument = _get(platform, "instrument")
+        if instrument:
+            _sub_optional(_sub(element, "instrument"), instrument, INSTRUMENT_OPTIONAL)
+        ancillary = _get(platform, "ancillary")
+        if ancillary:
+            _sub_optional(_sub(element, "ancillary"), ancillary, ANCILLARY_OPTIONAL)
+
+    _sub(root, "spatial_representation", _text(data, "spatial_representation"))
+
+    for activity_type in _get(data, "activity_type") or []:
+        _sub(root, "activity_type", str(activity_type))
+
+    for dataset_citation in _get(data, "dataset_citation") or []:
+        _sub_optional(_sub(root, "dataset_citation"), dataset_citation, CITATION_OPTIONAL)
+
+    return root
+
+
+def tostring(root, pretty_print=False):
+    """Serialise an MMD element tree. The output is compact (no
+    indentation) unless pretty_print is True.
+    """
+    return ET.tostring(root, encoding="unicode", pretty_print=pretty_print)
+
+
+# Compiled schemas and stylesheets of each thread, since lxml does not
+# support validating or transforming with the same object in several
+# threads at once
+_compiled = threading.local()
+
+
+def _get_compiled(kind, path, compile):
+    cache = _compiled.__dict__.setdefault(kind, {})
+    path = os.path.abspath(str(path))
+    if path not in cache:
+        cache[path] = compile(ET.parse(path))
+    return cache[path]
+
+
+def get_schema(xsd_path):
+    """Return the compiled XML schema in xsd_path (e.g.,
+    mmd_strict.xsd from the MMD repository). The schema is only
+    compiled the first time it is requested in a thread.
+    """
+    return _get_compiled("schemas", xsd_path, ET.XMLSchema)
+
+
+def validate(root, xsd_path):
+    """Validate an MMD element tree against the XML schema in
+    xsd_path.
+
+    Returns
+    -------
+    errors : list of str
+        The schema errors, as "line <line>: <message>". The list is
+        empty if the document is valid.
+    """
+    schema = get_schema(xsd_path)
+    if schema.validate(root):
+        return []
+    return ["line %d: %s" % (error.line, error.message) for error in schema.error_log]
+
+
+def get_transform(xsl_path):
+    """Return the compiled XSLT stylesheet in xsl_path (e.g.,
+    mmd-to-iso.xsl). The stylesheet is only compiled the first time
+    it is requested in a thread.
+    """
+    return _get_compiled("transforms", xsl_path, ET.XSLT)
+
+
+def transform(root, xsl_path, **params):
+    """Transform an MMD element tree with the XSLT stylesheet in
+    xsl_path.
+
+    Parameters
+    ----------
+    root : lxml.etree._Element
+        The MMD document.
+    xsl_path : str
+        Path to the XSLT stylesheet.
+    params : str
+        XSLT parameters, given as XPath expressions (use
+        lxml.etree.XSLT.strparam for string values).
+
+    Returns
+    -------
+    doc : bytes
+        The transformed document, serialised as specified by the
+        xsl:output element of the stylesheet.
+    """
+    return bytes(get_transform(xsl_path)(root, **params))
+
+
+def iter_records(source):
+    """Read the MMD records (mmd:mmd elements) in source one at a time.
+
+    The file is parsed incrementally, and each record is cleared, and
+    removed from the tree, when the next one is requested, so the
+    memory use does not grow with the number of records. The source
+    can be a single MMD document, or a collection with any number of
+    mmd:mmd elements below a common root element.
+
+    Parameters
+    ----------
+    source : str or file object
+        MMD file, or collection file.
+
+    Yields
+    ------
+    record : lxml.etree._Element
+        An mmd:mmd element, which is only valid until the next record
+        is requested.
+    """
+    for event, record in ET.iterparse(source, events=("end",), tag="{%s}mmd" % MMD_NS):
+        yield record
+        record.clear()
+        # Remove the records that have been processed from the parent
+        while record.getprevious() is not None:
+            del record.getparent()[0]
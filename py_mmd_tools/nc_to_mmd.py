@@ -17,6 +17,9 @@ py-mmd-tools is licensed under the Apache License 2.0
 
 import os
 import re
+import time
+import weakref
+import functools
 import yaml
 import jinja2
 import pathlib
@@ -24,12 +27,14 @@ import warnings
 import shapely.wkt
 
 import numpy as np
+import lxml.etree as ET
 
 from filehash import FileHash
 from itertools import zip_longest
+from collections.abc import Mapping
 from pkg_resources import resource_string
 from dateutil.parser import isoparse
-from uuid import UUID
+from datetime import date
 
 from metvocab.mmdgroup import MMDGroup
 from metvocab.cfstd import CFStandard
@@ -38,37 +43,28 @@ from netCDF4 import Dataset
 
 from shapely.errors import ShapelyError
 
+from py_mmd_tools import extent
+from py_mmd_tools import mmd_xml
+from py_mmd_tools.mmd_writer import write_atomic
+from py_mmd_tools.validators import is_valid_uuid
+from py_mmd_tools.validators import valid_url
+from py_mmd_tools.validators import valid_urls
 
-def valid_url(url):
-    """Validate a url pattern (not its existence)."""
-    if url is None:
-        return False
-    regex = re.compile(
-        r"^(?:http|ftp)s?://"  # http:// or https://
-        r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|"
-        r"localhost|"  # localhost...
-        r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # ...or ip
-        r"(?::\d+)?"  # optional port
-        r"(?:/?|[/?]\S+)$",
-        re.IGNORECASE,
-    )
-    return re.match(regex, url) is not None
-
-
-def normalize_iso8601(s):
-    """Convert provided string (s) to a normalized ISO 8601 value:
 
-    YYYY-mm-ddTHH:MM:SS<second fraction><time zone>.
+# Datetimes that are already in the normalized ISO 8601 form returned
+# by normalize_iso8601 (given that the date exists)
+NORMALIZED_ISO8601 = re.compile(
+    r"([1-9]\d{3})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])"
+    r"T([01]\d|2[0-3]):[0-5]\d:[0-5]\d"
+    r"(\.(?!000000)\d{6})?"
+    r"(Z|\+(?!00:00)([01]\d|2[0-3]):[0-5]\d)"
+)
 
-    Parameters:
-    -----------
-    s: str
 
-    Returns:
-    --------
-    (<normalized ISO 8601 form of s>, None) upon success, otherwise (None, <error reason>).
+def _normalize_iso8601(s):
+    """Parse s with dateutil, and return (<normalized ISO 8601 form of
+    s>, None) or (None, <error reason>). See normalize_iso8601.
     """
-
     # get initial datetime
     try:
         dt = isoparse(s)
@@ -91,6 +87,64 @@ def normalize_iso8601(s):
     return dt.strftime("%Y-%m-%dT%H:%M:%S{}{}".format(sec_frac, tz)), None
 
 
+@functools.lru_cache(maxsize=2**16)
+def _normalize_iso8601_cached(s):
+    match = NORMALIZED_ISO8601.fullmatch(s)
+    if match is not None:
+        try:
+            date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            pass
+        else:
+            return s, None
+    return _normalize_iso8601(s)
+
+
+def normalize_iso8601(s):
+    """Convert provided string (s) to a normalized ISO 8601 value:
+
+    YYYY-mm-ddTHH:MM:SS<second fraction><time zone>.
+
+    Strings that are already normalized are recognised with a regular
+    expression, and returned without being parsed. The results are
+    memoised, since the same datetimes are repeated in many files.
+
+    Parameters:
+    -----------
+    s: str
+
+    Returns:
+    --------
+    (<normalized ISO 8601 form of s>, None) upon success, otherwise (None, <error reason>).
+    """
+    if isinstance(s, str):
+        return _normalize_iso8601_cached(s)
+    return _normalize_iso8601(s)
+
+
+def normalize_iso8601_list(values):
+    """Convert each of the provided strings (e.g., a list or an array of
+    comma separated coverage periods) to a normalized ISO 8601 value
+    (like normalize_iso8601()). Each distinct value is only normalized
+    once.
+
+    Parameters:
+    -----------
+    values: iterable of str
+
+    Returns:
+    --------
+    List of (<normalized ISO 8601 form>, None) or (None, <error reason>), in the order of values.
+    """
+    results = {}
+    normalized = []
+    for s in values:
+        if s not in results:
+            results[s] = normalize_iso8601(s)
+        normalized.append(results[s])
+    return normalized
+
+
 def normalize_iso8601_0(s):
     """Convert s to a normalized ISO 8601 value (like normalize_iso8601()), but don't flag any
     errors. If s is not valid ISO 8601, s itself is returned.
@@ -174,46 +228,172 @@ def get_vocab_dict(field, controlled_vocabulary, resource="", mmd_required_vocab
     return field_data
 
 
+# Standard names of coordinates, which are not used as keywords
+CFSTDN_EXCLUDED = frozenset([
+    "longitude", "latitude", "time", "projection_x_coordinate", "projection_y_coordinate"
+])
+
+
+def variable_attribute_index(ncin, attributes=("standard_name",)):
+    """Return an index of the given variable attributes in ncin, as
+    {<attribute>: {<variable name>: <value>}}. The attribute names of
+    each variable are only read once.
+    """
+    index = {attribute: {} for attribute in attributes}
+    for name, var in ncin.variables.items():
+        var_attributes = var.ncattrs()
+        for attribute in attributes:
+            if attribute in var_attributes:
+                index[attribute][name] = var.getncattr(attribute)
+    return index
+
+
+# Maximum number of memoised CF standard name checks per vocabulary
+CFSTDN_CACHE_SIZE = 2**14
+
+# Results of the CF standard name checks, as {<vocabulary>: {<name>:
+# bool}}. The vocabularies are weakly referenced, so the results are
+# discarded with the vocabulary
+_cfstdn_results = weakref.WeakKeyDictionary()
+
+
+def check_cf_standard_names(names, cfstdn):
+    """Check if each of names is a CF standard name in the vocabulary
+    cfstdn (a metvocab.cfstd.CFStandard), and return {<name>: bool}.
+
+    The results are memoised per vocabulary instance, so each distinct
+    name is only looked up once as long as the same vocabularies are
+    used (see load_vocabularies, and the vocabularies argument of
+    Nc_to_mmd).
+    """
+    checked = _cfstdn_results.setdefault(cfstdn, {})
+    results = {}
+    for name in names:
+        if name not in checked:
+            if len(checked) >= CFSTDN_CACHE_SIZE:
+                checked.clear()
+            checked[name] = cfstdn.check_standard_name(name, True) is True
+        results[name] = checked[name]
+    return results
+
+
+# MMD controlled vocabularies used by Nc_to_mmd, as
+# {<Nc_to_mmd attribute>: <vocabulary url>}
+MMD_VOCABULARIES = {
+    "platform_group": "https://vocab.met.no/mmd/Platform",
+    "instrument_group": "https://vocab.met.no/mmd/Instrument",
+    "operational_status": "https://vocab.met.no/mmd/Operational_Status",
+    "iso_topic_category": "https://vocab.met.no/mmd/ISO_Topic_Category",
+    "contact_roles": "https://vocab.met.no/mmd/Contact_Roles",
+    "activity_type": "https://vocab.met.no/mmd/Activity_Type",
+    "dataset_production_status": "https://vocab.met.no/mmd/Dataset_Production_Status",
+    "quality_control": "https://vocab.met.no/mmd/Quality_Control",
+    "license_group": "https://vocab.met.no/mmd/Use_Constraint",
+}
+
+
+def load_vocabularies():
+    """Initialise the controlled vocabularies used by Nc_to_mmd, and
+    return them as {<Nc_to_mmd attribute>: <vocabulary>}. The CF
+    standard names are in 'cfstdn_keyword'.
+    """
+    vocabularies = {}
+    for name, url in MMD_VOCABULARIES.items():
+        vocabularies[name] = MMDGroup("mmd", url)
+        vocabularies[name].init_vocab()
+    vocabularies["cfstdn_keyword"] = CFStandard()
+    vocabularies["cfstdn_keyword"].init_vocab()
+    return vocabularies
+
+
+def load_mmd_template():
+    """Return the compiled jinja template of the MMD xml document."""
+    env = jinja2.Environment(
+        loader=jinja2.PackageLoader(__name__.split(".")[0], "templates"),
+        autoescape=jinja2.select_autoescape(["html", "xml"]),
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    return env.get_template("mmd_template.xml")
+
+
 class nc_wrapper:
     """
-    Wrapper of dict/json to provide netCDF attr access for compatability
-    in nc_to_mmd
+    Read-only view of a dict/json netCDF header, which provides netCDF
+    attr access for compatability in nc_to_mmd. The attributes are
+    looked up in the header when they are accessed, and the header is
+    neither copied nor modified.
     """
 
+    __slots__ = ("netcdf_header", "_attrs")
+
     def __init__(self, netcdf_header: dict):
         self.netcdf_header = netcdf_header
+        self._attrs = netcdf_header.get("global_variables", {})
 
-        if "global_variables" in netcdf_header:
-            for i in netcdf_header["global_variables"]:
-                setattr(self, i, netcdf_header["global_variables"][i])
-
-        for i in netcdf_header["variables"]:
-            netcdf_header["variables"][i] = nc_sub(netcdf_header["variables"][i])
+    def __getattr__(self, attr):
+        if attr in nc_wrapper.__slots__:
+            raise AttributeError(attr)
+        try:
+            return self._attrs[attr]
+        except KeyError:
+            raise AttributeError(attr) from None
 
     def __getitem__(self, key):
-        return self.netcdf_header["global_variables"][key]
+        return self._attrs[key]
 
     def ncattrs(self):
-        return list(self.netcdf_header["global_variables"].keys())
+        return list(self._attrs.keys())
 
     def getncattr(self, attr):
-        return self.netcdf_header["global_variables"][attr]
+        return self._attrs[attr]
 
     @property
     def variables(self):
-        return self.netcdf_header["variables"]
+        return nc_variables(self.netcdf_header["variables"])
+
+
+class nc_variables(Mapping):
+    """
+    Read-only mapping of the variables in a dict/json netCDF header,
+    which returns an nc_sub view of each variable
+    """
+
+    __slots__ = ("_variables",)
+
+    def __init__(self, variables):
+        self._variables = variables
+
+    def __getitem__(self, name):
+        return nc_sub(self._variables[name])
+
+    def __iter__(self):
+        return iter(self._variables)
+
+    def __len__(self):
+        return len(self._variables)
+
+    def __contains__(self, name):
+        return name in self._variables
 
 
 class nc_sub:
     """
-    Wrapper for handling variable attributes in nc_wrapper
+    Read-only view of the variable attributes in nc_wrapper
     """
 
+    __slots__ = ("netcdf_header",)
+
     def __init__(self, netcdf_header):
         self.netcdf_header = netcdf_header
 
-        for var, value in self.netcdf_header["attrs"].items():
-            setattr(self, var, value)
+    def __getattr__(self, attr):
+        if attr in nc_sub.__slots__:
+            raise AttributeError(attr)
+        try:
+            return self.netcdf_header["attrs"][attr]
+        except KeyError:
+            raise AttributeError(attr) from None
 
     def __getitem__(self, key):
         return self.netcdf_header["attrs"][key]
@@ -236,7 +416,7 @@ class Nc_to_mmd(object):
     LANDING_PAGE_BASE = None
 
     def __init__(self, netcdf_file, opendap_url=None, output_file=None, check_only=False,
-                 json_input=False, checksum_calculation=False):
+                 json_input=False, checksum_calculation=False, vocabularies=None):
         """Class for creating an MMD XML file based on the discovery
         metadata provided in the global attributes of NetCDF files that
         are compliant with the CF-conventions and ACDD.
@@ -255,9 +435,16 @@ class Nc_to_mmd(object):
                 NetCDF filename ('netcdf_file') input parameter is required.
             json_input : bool
                 The provided 'netcdf_file' argument is a dict
-                containing the required NetCDF-CF attrbiutes.
+                containing the required NetCDF-CF attrbiutes. Large
+                json headers can be read with
+                py_mmd_tools.json_header.load_header.
             checksum_calculation : bool, default False
                 True if the file checksum should be calculated.
+            vocabularies : dict, optional
+                Initialised controlled vocabularies (see
+                load_vocabularies). They are only read, so the same
+                vocabularies can be shared by many instances. By
+                default, they are initialised for this instance.
         """
         self.ACDD_ID_INVALID_CHARS = ["\\", "/", ":", " "]
         self.VALID_NAMING_AUTHORITIES = ["no.met", "no.nve", "no.nilu", "no.niva"]
@@ -268,6 +455,11 @@ class Nc_to_mmd(object):
         }
         self.HASH_ALGORITHM = "md5"
         self.checksum_calculation = checksum_calculation
+        # Duration (in seconds) of each processing stage, and number
+        # of bytes read for the checksum calculation
+        self.timings = {}
+        self.bytes_hashed = 0
+        init_start = time.perf_counter()
 
         if (output_file is None or opendap_url is None) and check_only is False:
             raise ValueError(
@@ -277,6 +469,7 @@ class Nc_to_mmd(object):
         super(Nc_to_mmd, self).__init__()
 
         self.output_file = output_file
+        self.output_location = None
         if json_input:
             self.netcdf_file = netcdf_file["archive_location"]
             self.file_size = netcdf_file["file_size"]
@@ -285,45 +478,29 @@ class Nc_to_mmd(object):
                 self.HASH_ALGORITHM = netcdf_file["file_checksum_type"] + "sum"
         else:
             self.netcdf_file = os.path.abspath(netcdf_file)
-            self.file_size = np.round(pathlib.Path(self.netcdf_file).stat().st_size/(1024*1024), 2)
+            file_size_bytes = pathlib.Path(self.netcdf_file).stat().st_size
+            self.file_size = np.round(file_size_bytes/(1024*1024), 2)
             if self.checksum_calculation:
                 # we may have to base it on the complete file - @amundi..
+                start = time.perf_counter()
                 hasher = FileHash(self.HASH_ALGORITHM, chunk_size=1048576)
                 self.file_checksum = hasher.hash_file(self.netcdf_file)
+                self.timings["checksum"] = time.perf_counter() - start
+                self.bytes_hashed = file_size_bytes
 
         self.opendap_url = opendap_url
         self.check_only = check_only
         self.missing_attributes = {"errors": [], "warnings": []}
         self.metadata = {}
+        self.mmd_tree = None
+        self.schema_errors = []
+        self.transform_locations = {}
+        self._variable_index = None
 
-        self.platform_group = MMDGroup("mmd", "https://vocab.met.no/mmd/Platform")
-        self.platform_group.init_vocab()
-
-        self.instrument_group = MMDGroup("mmd", "https://vocab.met.no/mmd/Instrument")
-        self.instrument_group.init_vocab()
-
-        self.operational_status = MMDGroup("mmd", "https://vocab.met.no/mmd/Operational_Status")
-        self.operational_status.init_vocab()
-
-        self.iso_topic_category = MMDGroup("mmd", "https://vocab.met.no/mmd/ISO_Topic_Category")
-        self.iso_topic_category.init_vocab()
-
-        self.contact_roles = MMDGroup("mmd", "https://vocab.met.no/mmd/Contact_Roles")
-        self.contact_roles.init_vocab()
-
-        self.activity_type = MMDGroup("mmd", "https://vocab.met.no/mmd/Activity_Type")
-        self.activity_type.init_vocab()
-
-        self.dataset_production_status = MMDGroup(
-            "mmd", "https://vocab.met.no/mmd/Dataset_Production_Status"
-        )
-        self.dataset_production_status.init_vocab()
-
-        self.quality_control = MMDGroup("mmd", "https://vocab.met.no/mmd/Quality_Control")
-        self.quality_control.init_vocab()
-
-        self.cfstdn_keyword = CFStandard()
-        self.cfstdn_keyword.init_vocab()
+        if vocabularies is None:
+            vocabularies = load_vocabularies()
+        for name, vocabulary in vocabularies.items():
+            setattr(self, name, vocabulary)
 
         self.json_input = json_input
 
@@ -340,6 +517,7 @@ class Nc_to_mmd(object):
         else:
             self.ncin = self.read_nc_file(self.netcdf_file)
             self.check_attributes_not_empty(self.ncin)
+        self.timings["init"] = time.perf_counter() - init_start - self.timings.get("checksum", 0)
 
     def read_nc_file(self, fn):
         """Open netcdf dataset, appending #fillmismatch if necessary"""
@@ -620,13 +798,28 @@ class Nc_to_mmd(object):
             data.append({elem_name: contents[i], "lang": content_lang[i]})
         return data
 
-    def get_temporal_extents(self, mmd_element, ncin):
-        """ToDo: Add docstring"""
+    def get_temporal_extents(self, mmd_element, ncin, from_coordinates=False):
+        """Get the temporal extents from the ACDD time_coverage_start
+        and time_coverage_end attributes.
+
+        If from_coordinates is True, and time_coverage_start is
+        missing, the temporal extent is derived from the time
+        coordinate instead (see py_mmd_tools.extent). This is not
+        possible for json input, which has no data.
+        """
         acdd_start = mmd_element["start_date"].pop("acdd")
         acdd_end = mmd_element["end_date"].pop("acdd")
         data = []
         start_dates = []
         acdd_start_key = list(acdd_start.keys())[0]
+        if from_coordinates and acdd_start_key not in ncin.ncattrs() and not self.json_input:
+            t_ext = extent.temporal_extent(ncin)
+            if t_ext is not None:
+                self.missing_attributes["warnings"].append(
+                    "%s missing - the temporal extent is derived from the time coordinate"
+                    % acdd_start_key
+                )
+                return [t_ext]
         if acdd_start_key in ncin.ncattrs():
             start_dates = self.separate_repeated(True, getattr(ncin, acdd_start_key))
         else:
@@ -660,8 +853,7 @@ class Nc_to_mmd(object):
             self.missing_attributes['errors'].
             """
             ndts = []
-            for dt in dts:
-                ndt, reason = normalize_iso8601(dt)
+            for dt, (ndt, reason) in zip(dts, normalize_iso8601_list(dts)):
                 if ndt is None:
                     ndts.append(dt)  # keep original
                     self.missing_attributes["errors"].append(
@@ -804,21 +996,25 @@ class Nc_to_mmd(object):
 
         return data
 
+    def get_variable_attribute_index(self, ncin):
+        """Return the index of the standard names of the variables in
+        ncin (see variable_attribute_index). The index is only built
+        once per dataset.
+        """
+        if self._variable_index is None or self._variable_index[0] is not ncin:
+            self._variable_index = (ncin, variable_attribute_index(ncin))
+        return self._variable_index[1]
+
     # extract standard names from variables in ncin
     def get_CFSTDN_keywords(self, ncin):
         """Return list of CF variables in the netCDF file
         (longitude and latitude are omitted).
         """
-        varlist = []
-        for key in ncin.variables.keys():
-            if "standard_name" in ncin.variables[key].ncattrs():
-                if all([ncin.variables[key].standard_name not in ["longitude", "latitude", "time",
-                                                                  "projection_x_coordinate",
-                                                                  "projection_y_coordinate"],
-                        ncin.variables[key].standard_name not in varlist]):
-                    varlist.append(ncin.variables[key].standard_name)
-
-        return varlist
+        standard_names = self.get_variable_attribute_index(ncin)["standard_name"].values()
+        # dict keeps the order of the first occurrences
+        return list(dict.fromkeys(
+            name for name in standard_names if name not in CFSTDN_EXCLUDED
+        ))
 
     def get_keywords(self, mmd_element, ncin):
         """ToDo: Add docstring"""
@@ -868,10 +1064,10 @@ class Nc_to_mmd(object):
                 "%s is a required ACDD attribute" % acdd_keyword_key
             )
         if len(cfstd_names) != 0:
+            # Verify whether the standard names are cf-standard names from CFSTDN
+            cfstdn_results = check_cf_standard_names(cfstd_names, self.cfstdn_keyword)
             for cfstd_name in cfstd_names:
-                # Verify whether the standard name is a cf-standard name from CFSTDN
-                cfstdn_search_result = self.cfstdn_keyword.check_standard_name(cfstd_name, True)
-                if cfstdn_search_result is not True:
+                if not cfstdn_results[cfstd_name]:
                     self.missing_attributes["errors"].append(
                         "The standard name %s is not a CF standard name (see "
                         "https://vocab.met.no/CFSTDN)" % (cfstd_name)
@@ -892,10 +1088,14 @@ class Nc_to_mmd(object):
 
         data = []
         if ok_formatting:
-            for vocabulary in vocabularies:
-                prefix = vocabulary.split(":")[0]
-                resource = [r.replace(prefix + ":", "") for r in resources if prefix in r][0]
-                if not valid_url(resource):
+            prefixes = [vocabulary.split(":")[0] for vocabulary in vocabularies]
+            vocabulary_resources = [
+                [r.replace(prefix + ":", "") for r in resources if prefix in r][0]
+                for prefix in prefixes
+            ]
+            for prefix, resource, resource_ok in zip(prefixes, vocabulary_resources,
+                                                     valid_urls(vocabulary_resources)):
+                if not resource_ok:
                     self.missing_attributes["errors"].append(
                         "%s in %s attribute is not a valid url" % (resource, acdd_vocabulary_key)
                     )
@@ -1086,11 +1286,7 @@ class Nc_to_mmd(object):
         >>> is_valid_uuid('c9bf9e58')
         False
         """
-        try:
-            uuid_obj = UUID(uuid_to_test, version=version)
-        except ValueError:
-            return False
-        return str(uuid_obj) == uuid_to_test
+        return is_valid_uuid(uuid_to_test, version=version)
 
     def get_metadata_identifier(self, mmd_element, ncin, **kwargs):
         """Look up ACDD element and populate MMD metadata identifier"""
@@ -1206,13 +1402,29 @@ class Nc_to_mmd(object):
                         )
         return data
 
-    def get_geographic_extent_polygon(self, mmd_element, ncin):
-        """ToDo: Add docstring"""
+    def get_geographic_extent_polygon(self, mmd_element, ncin, from_coordinates=False,
+                                      max_vertices=extent.MAX_VERTICES):
+        """Get the dataset coverage as a polygon from the ACDD
+        geospatial_bounds attribute (WKT).
+
+        If from_coordinates is True, and geospatial_bounds is missing,
+        the footprint of a swath is derived from its 2D latitude and
+        longitude variables instead, with at most max_vertices
+        vertices (see py_mmd_tools.extent.footprint). This is not
+        possible for json input, which has no data.
+        """
         data = None
         acdd = mmd_element["acdd"]
         acdd_key = list(acdd.keys())[0]
         if acdd_key not in ncin.ncattrs():
-            return None
+            if from_coordinates and not self.json_input:
+                data = extent.footprint(ncin, max_vertices=max_vertices)
+            if data is not None:
+                self.missing_attributes["warnings"].append(
+                    "%s missing - the polygon is derived from the coordinate variables"
+                    % acdd_key
+                )
+            return data
         wkt = eval("ncin.%s" % acdd_key)
         try:
             pp = shapely.wkt.loads(wkt)
@@ -1233,12 +1445,37 @@ class Nc_to_mmd(object):
             data = {"srsName": gb_crs, "pos": pos}
         return data
 
-    def get_geographic_extent_rectangle(self, mmd_element, ncin):
-        """Get dataset coverage as a rectangle (north, south, east, west)."""
+    def get_geographic_extent_rectangle(self, mmd_element, ncin, from_coordinates=False):
+        """Get dataset coverage as a rectangle (north, south, east, west).
+
+        If from_coordinates is True, and any of the ACDD attributes
+        are missing, the rectangle is derived from the coordinate
+        variables instead (see py_mmd_tools.extent). This is not
+        possible for json input, which has no data.
+        """
         data = {}
         directions = ["north", "south", "east", "west"]
 
         data["srsName"] = mmd_element["srsName"]["default"]
+        acdd_keys = [list(mmd_element[dir]["acdd"].keys())[0] for dir in directions]
+        missing = [acdd_key for acdd_key in acdd_keys if acdd_key not in ncin.ncattrs()]
+        if from_coordinates and missing and not self.json_input:
+            try:
+                rectangle = extent.geographic_extent(ncin)
+            except ImportError:
+                rectangle = None
+                self.missing_attributes["warnings"].append(
+                    "pyproj is required to derive the geographic extent from projected "
+                    "coordinates"
+                )
+            if rectangle is not None:
+                self.missing_attributes["warnings"].append(
+                    "%s missing - the geographic extent is derived from the coordinate "
+                    "variables" % ", ".join(missing)
+                )
+                data.update(rectangle)
+                return data
+
         for dir in directions:
             acdd = mmd_element[dir]["acdd"]
             acdd_key = list(acdd.keys())[0]
@@ -1427,15 +1664,18 @@ class Nc_to_mmd(object):
         refs = []
         if acdd_key in ncin.ncattrs():
             refs = self.separate_repeated(repetition_allowed, getattr(ncin, acdd_key), separator)
-        for ref in refs:
-            ri = ref.split("(")
+        refs = [ref.split("(") for ref in refs]
+        # The uris are validated together (see valid_urls)
+        uris = [ri[0].strip() for ri in refs if len(ri) == 2]
+        valid_uris = dict(zip(uris, valid_urls(uris)))
+        for ri in refs:
             if len(ri) != 2:
                 self.missing_attributes["errors"].append(
                     "%s must be formed as <uri>(<type>)." % acdd_key
                 )
                 continue
             uri = ri[0].strip()
-            if not valid_url(uri):
+            if not valid_uris[uri]:
                 self.missing_attributes["errors"].append("%s must contain valid uris" % acdd_key)
                 continue
             ref_type = ri[1][:-1]
@@ -1547,9 +1787,6 @@ class Nc_to_mmd(object):
         the SPDX source listed above.
 
         """
-        license_group = MMDGroup("mmd", "https://vocab.met.no/mmd/Use_Constraint")
-        license_group.init_vocab()
-
         data = None
         old_version = False
         acdd_license = list(mmd_element["resource"]["acdd"].keys())[0]
@@ -1585,7 +1822,10 @@ class Nc_to_mmd(object):
                 data["identifier"] = ncin.license
             else:
                 data["identifier"] = ncin.license.split("/")[-1]
-                if not bool(get_vocab_dict(data["identifier"], license_group, data["resource"])):
+                license_dict = get_vocab_dict(
+                    data["identifier"], self.license_group, data["resource"]
+                )
+                if not bool(license_dict):
                     data.pop("identifier")
                     self.missing_attributes["errors"].append(
                         "license should be provided as <url> (<Identifier>)"
@@ -1595,7 +1835,9 @@ class Nc_to_mmd(object):
         # and rewrite data dict if necessary
         if data is not None:
             if "identifier" in data.keys():
-                license_dict = get_vocab_dict(data["identifier"], license_group, data["resource"])
+                license_dict = get_vocab_dict(
+                    data["identifier"], self.license_group, data["resource"]
+                )
                 if not bool(license_dict):
                     data = {"license_text": ncin.license}
 
@@ -1607,6 +1849,14 @@ class Nc_to_mmd(object):
         mmd_yaml=None,
         parent=None,
         overrides=None,
+        writer=None,
+        renderer="jinja",
+        xsd=None,
+        transforms=None,
+        cache=None,
+        from_coordinates=False,
+        max_polygon_vertices=extent.MAX_VERTICES,
+        template=None,
         *args,
         **kwargs,
     ):
@@ -1663,9 +1913,62 @@ class Nc_to_mmd(object):
                 MMD file has been created.
 
         This list can be extended but requires some new code...
+
+        writer : FileWriter or ArchiveWriter, optional
+            Writer (see py_mmd_tools.mmd_writer) used to store the MMD
+            file. By default, the file is written atomically to
+            output_file. The final location is stored in
+            self.output_location.
+        renderer : {'jinja', 'lxml'}, default 'jinja'
+            'jinja' renders templates/mmd_template.xml as text.
+            'lxml' builds the MMD document as an lxml element tree,
+            which is stored in self.mmd_tree, and only serialised
+            (compactly) if the MMD file is written.
+        xsd : str, optional
+            Path to an MMD XML schema (e.g., xsd/mmd_strict.xsd in the
+            MMD repository). If given, the MMD document is validated
+            in memory against the schema, which is compiled once per
+            process. Schema errors are stored in self.schema_errors
+            and returned in msg (with req_ok False), and the MMD file
+            is not written.
+        transforms : dict, optional
+            XSLT stylesheets (e.g., mmd-to-iso.xsl) to apply to the MMD
+            document, keyed by the suffix of the output files. The
+            outputs are written next to the MMD file (or with the same
+            writer), with the suffix replacing the extension of
+            output_file, e.g., {'_iso.xml': 'mmd-to-iso.xsl'} gives
+            <name>_iso.xml. The locations of the outputs are stored in
+            self.transform_locations.
+        cache : py_mmd_tools.translation_cache.TranslationCache, optional
+            Cache of the MMD elements that are translated only from the
+            stable global attributes (see
+            translation_cache.CACHED_ELEMENTS). If the header signature
+            of the netCDF file is already in the cache, these elements,
+            and their errors and warnings, are reused instead of being
+            translated again. This speeds up the translation of the
+            files of a time series.
+        from_coordinates : bool, default False
+            Derive the geographic extent from the coordinate variables
+            if the geospatial_lat_* or geospatial_lon_* attributes are
+            missing, the temporal extent from the time coordinate if
+            the time_coverage_start attribute is missing, and the
+            footprint polygon of a swath from its 2D latitude and
+            longitude variables if the geospatial_bounds attribute is
+            missing.
+        max_polygon_vertices : int, default 100
+            Maximum number of vertices of a footprint polygon derived
+            from the coordinate variables.
+        template : jinja2.Template, optional
+            The compiled MMD template used by the 'jinja' renderer (see
+            load_mmd_template). By default, the template is loaded for
+            each call.
         """
         if collection is not None and type(collection) is not str:
             raise ValueError("collection must be of type str")
+        if renderer not in ["jinja", "lxml"]:
+            raise ValueError("renderer must be either 'jinja' or 'lxml'")
+
+        translate_start = time.perf_counter()
 
         # Overrides
         if overrides is None:
@@ -1680,6 +1983,15 @@ class Nc_to_mmd(object):
         # Get ncin object from instance
         ncin = self.ncin
 
+        def translate(element, func, *args):
+            if cache is None:
+                return func(*args)
+            return cache.translate(signature, element, self.missing_attributes, func, *args)
+
+        if cache is not None:
+            signature = cache.header_signature(ncin,
+                                               index=self.get_variable_attribute_index(ncin))
+
         # Get list of MMD elements
         if mmd_yaml is None:
             mmd_yaml = yaml.load(
@@ -1707,7 +2019,9 @@ class Nc_to_mmd(object):
         self.metadata["metadata_identifier"] = self.get_metadata_identifier(
             mmd_yaml.pop("metadata_identifier"), ncin, **kwargs
         )
-        self.metadata["data_center"] = self.get_data_centers(mmd_yaml.pop("data_center"), ncin)
+        self.metadata["data_center"] = translate(
+            "data_center", self.get_data_centers, mmd_yaml.pop("data_center"), ncin
+        )
         self.metadata["last_metadata_update"] = self.get_metadata_updates(
             mmd_yaml.pop("last_metadata_update"), ncin
         )
@@ -1732,14 +2046,22 @@ class Nc_to_mmd(object):
             mmd_yaml.pop("temporal_extent")
         else:
             self.metadata["temporal_extent"] = self.get_temporal_extents(
-                mmd_yaml.pop("temporal_extent"), ncin
+                mmd_yaml.pop("temporal_extent"), ncin, from_coordinates=from_coordinates
             )
 
-        self.metadata["personnel"] = self.get_personnel(mmd_yaml.pop("personnel"), ncin)
-        self.metadata["keywords"] = self.get_keywords(mmd_yaml.pop("keywords"), ncin)
-        self.metadata["project"] = self.get_projects(mmd_yaml.pop("project"), ncin)
+        self.metadata["personnel"] = translate(
+            "personnel", self.get_personnel, mmd_yaml.pop("personnel"), ncin
+        )
+        self.metadata["keywords"] = translate(
+            "keywords", self.get_keywords, mmd_yaml.pop("keywords"), ncin
+        )
+        self.metadata["project"] = translate(
+            "project", self.get_projects, mmd_yaml.pop("project"), ncin
+        )
         if platform is None:
-            self.metadata["platform"] = self.get_platforms(mmd_yaml.pop("platform"), ncin)
+            self.metadata["platform"] = translate(
+                "platform", self.get_platforms, mmd_yaml.pop("platform"), ncin
+            )
         else:
             mmd_yaml.pop("platform")
             self.metadata["platform"] = [platform]
@@ -1784,18 +2106,22 @@ class Nc_to_mmd(object):
             mmd_yaml["geographic_extent"].pop("rectangle")
         else:
             self.metadata["geographic_extent"]["rectangle"] = self.get_geographic_extent_rectangle(
-                mmd_yaml["geographic_extent"].pop("rectangle"), ncin
+                mmd_yaml["geographic_extent"].pop("rectangle"), ncin,
+                from_coordinates=from_coordinates
             )
         # Check for geographic_extent/polygon
         polygon = self.get_geographic_extent_polygon(
-            mmd_yaml["geographic_extent"].pop("polygon"), ncin
+            mmd_yaml["geographic_extent"].pop("polygon"), ncin, from_coordinates=from_coordinates,
+            max_vertices=max_polygon_vertices
         )
         if polygon:
             self.metadata["geographic_extent"]["polygon"] = polygon
         mmd_yaml.pop("geographic_extent")
 
         # Get use_constraint data
-        self.metadata["use_constraint"] = self.get_license(mmd_yaml.pop("use_constraint"), ncin)
+        self.metadata["use_constraint"] = translate(
+            "use_constraint", self.get_license, mmd_yaml.pop("use_constraint"), ncin
+        )
 
         # Data access should not be read from the netCDF-CF file
         mmd_yaml.pop("data_access")
@@ -1807,27 +2133,31 @@ class Nc_to_mmd(object):
 
         # ACDD processing_level follows a controlled vocabulary, so
         # it must be handled separately
-        self.metadata["operational_status"] = self.get_operational_status(
+        self.metadata["operational_status"] = translate(
+            "operational_status", self.get_operational_status,
             mmd_yaml.pop("operational_status"), ncin
         )
 
         # Set ISO_Topic_Category
-        self.metadata["iso_topic_category"] = self.get_iso_topic_category(
+        self.metadata["iso_topic_category"] = translate(
+            "iso_topic_category", self.get_iso_topic_category,
             mmd_yaml.pop("iso_topic_category"), ncin
         )
 
         # Set Activity_Type
-        self.metadata["activity_type"] = self.get_activity_type(
-            mmd_yaml.pop("activity_type"), ncin)
+        self.metadata["activity_type"] = translate(
+            "activity_type", self.get_activity_type, mmd_yaml.pop("activity_type"), ncin
+        )
 
         # Set dataset_production_status
-        self.metadata["dataset_production_status"] = self.get_dataset_production_status(
+        self.metadata["dataset_production_status"] = translate(
+            "dataset_production_status", self.get_dataset_production_status,
             mmd_yaml.pop("dataset_production_status"), ncin
         )
 
         # Set dataset_production_status
-        self.metadata["quality_control"] = self.get_quality_control(
-            mmd_yaml.pop("quality_control"), ncin
+        self.metadata["quality_control"] = translate(
+            "quality_control", self.get_quality_control, mmd_yaml.pop("quality_control"), ncin
         )
 
         # Set alternate_identifier
@@ -1854,30 +2184,66 @@ class Nc_to_mmd(object):
         self.check_conventions(ncin)
         self.check_feature_type(ncin)
 
+        self.timings["translate"] = time.perf_counter() - translate_start
+        # The OPeNDAP check is timed separately
+        self.timings["translate"] -= self.timings.get("opendap_probe", 0)
+
         if len(self.missing_attributes["warnings"]) > 0:
             warnings.warn("\n\t" + "\n\t".join(self.missing_attributes["warnings"]))
         if len(self.missing_attributes["errors"]) > 0:
             raise AttributeError("Errors in %s:\n\t" % self.netcdf_file + "\n\t".join(
                 self.missing_attributes["errors"]))
 
-        env = jinja2.Environment(
-            loader=jinja2.PackageLoader(self.__module__.split(".")[0], "templates"),
-            autoescape=jinja2.select_autoescape(["html", "xml"]),
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
-        template = env.get_template("mmd_template.xml")
-
-        out_doc = template.render(data=self.metadata)
+        start = time.perf_counter()
+        if renderer == "lxml":
+            self.mmd_tree = mmd_xml.metadata_to_tree(self.metadata)
+            out_doc = None
+        else:
+            if template is None:
+                template = load_mmd_template()
+            out_doc = template.render(data=self.metadata)
+        self.timings["render"] = time.perf_counter() - start
 
         # Are all required elements present?
         msg = ""
         req_ok = True
+        # Validate the document in memory, and do not write it if it
+        # is invalid
+        if xsd is not None:
+            start = time.perf_counter()
+            if self.mmd_tree is None:
+                self.mmd_tree = ET.fromstring(out_doc.encode("utf-8"))
+            self.schema_errors = mmd_xml.validate(self.mmd_tree, xsd)
+            self.timings["validate"] = time.perf_counter() - start
+            if self.schema_errors:
+                msg = "Schema errors in %s:\n\t%s" % (
+                    self.netcdf_file, "\n\t".join(self.schema_errors))
+                return False, msg
         # If running in check only mode, exit now
         # and return whether the required elements are present
         if not self.check_only:
-            with open(self.output_file, "w") as fh:
-                fh.write(out_doc)
+            start = time.perf_counter()
+            if out_doc is None:
+                out_doc = mmd_xml.tostring(self.mmd_tree)
+            if writer is None:
+                self.output_location = write_atomic(self.output_file, out_doc)
+            else:
+                self.output_location = writer.write(self.output_file, out_doc)
+            self.timings["write"] = time.perf_counter() - start
+
+            if transforms:
+                start = time.perf_counter()
+                if self.mmd_tree is None:
+                    self.mmd_tree = ET.fromstring(out_doc.encode("utf-8"))
+                base = os.path.splitext(str(self.output_file))[0]
+                for suffix, xsl in transforms.items():
+                    doc = mmd_xml.transform(self.mmd_tree, xsl)
+                    if writer is None:
+                        location = write_atomic(base + suffix, doc)
+                    else:
+                        location = writer.write(base + suffix, doc)
+                    self.transform_locations[suffix] = location
+                self.timings["transform"] = time.perf_counter() - start
 
         return req_ok, msg
 
@@ -1909,6 +2275,7 @@ class Nc_to_mmd(object):
             Adds HTTP data access link if True (default).
         """
         # Check that the OPeNDAP url is accessible
+        start = time.perf_counter()
         try:
             ds = Dataset(self.opendap_url)
         except OSError:
@@ -1916,10 +2283,8 @@ class Nc_to_mmd(object):
             self.missing_attributes["warnings"].append(msg)
         else:
             ds.close()
-        all_netcdf_variables = []
-        for var in ncin.variables:
-            if "standard_name" in ncin.variables[var].ncattrs():
-                all_netcdf_variables.append(ncin.variables[var].name)
+        self.timings["opendap_probe"] = time.perf_counter() - start
+        all_netcdf_variables = list(self.get_variable_attribute_index(ncin)["standard_name"])
         data_accesses = [
             {
                 "type": "OPeNDAP",
@@ -0,0 +1,180 @@
+"""
+Tools for checking that the metadata of netCDF-CF files is preserved
+when it is translated to MMD (with Nc_to_mmd) and back to ACDD (with
+Mmd_to_nc). Both translations are done in memory.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import warnings
+
+import netCDF4
+
+import numpy as np
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from py_mmd_tools.mmd_to_nc import load_mmd_yaml
+from py_mmd_tools.mmd_to_nc import mmd_to_acdd
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+from py_mmd_tools.nc_to_mmd import load_vocabularies
+
+# Controlled vocabularies of a worker process (see _init_worker)
+_vocabularies = None
+
+
+def acdd_attribute_names(mmd_yaml):
+    """Return the set of ACDD attributes (including ACDD extensions)
+    that are translated to or from MMD in mmd_yaml.
+    """
+    names = set()
+    for key, value in mmd_yaml.items():
+        if not isinstance(value, dict):
+            continue
+        if key in ("acdd", "acdd_ext"):
+            names.update(value.keys())
+        else:
+            names.update(acdd_attribute_names(value))
+    return names
+
+
+def _normalize(value):
+    """Return value as a list of items, without the whitespace around
+    the separators of comma separated lists.
+    """
+    return [item.strip() for item in str(value).split(",")]
+
+
+def same_value(original, value):
+    """Return True if value (a string translated from MMD) represents
+    the original global attribute. Numeric attributes, including
+    arrays, are compared with the comma separated numbers in value.
+    """
+    if not isinstance(original, str):
+        try:
+            numbers = [float(item) for item in _normalize(value)]
+            return np.array_equal(np.ravel(original).astype(float), numbers)
+        except (TypeError, ValueError):
+            return False
+    return _normalize(original) == _normalize(value)
+
+
+def compare_attributes(original, acdd, names):
+    """Compare the original global attributes of a netCDF file with the
+    ACDD attributes translated back from MMD.
+
+    Parameters
+    ----------
+    original : dict
+        The original global attributes.
+    acdd : dict
+        The ACDD attributes translated from MMD.
+    names : set
+        The ACDD attributes that are expected to survive the round trip
+        (see acdd_attribute_names). Other original attributes are
+        ignored.
+
+    Returns
+    -------
+    discrepancies : dict
+        'changed': {name: (original, round trip)} for attributes with
+        different values, 'added': {name: round trip} for attributes
+        that are not in the original, and 'missing': {name: original}
+        for attributes that are lost in the round trip.
+    """
+    discrepancies = {"changed": {}, "added": {}, "missing": {}}
+    for name, value in acdd.items():
+        if name not in original:
+            discrepancies["added"][name] = value
+        elif not same_value(original[name], value):
+            discrepancies["changed"][name] = (original[name], value)
+    for name in names:
+        if name in original and name not in acdd:
+            discrepancies["missing"][name] = original[name]
+    return discrepancies
+
+
+def _init_worker():
+    """Load the controlled vocabularies once in a worker process."""
+    global _vocabularies
+    _vocabularies = load_vocabularies()
+
+
+def check_file(nc_file, vocabularies=None):
+    """Translate nc_file to MMD and back to ACDD, and compare the
+    result with the original global attributes. The controlled
+    vocabularies (see nc_to_mmd.load_vocabularies) are those of the
+    worker process, or loaded for the file, unless they are given.
+
+    Returns
+    -------
+    nc_file : str
+        The input file.
+    discrepancies : dict
+        See compare_attributes, or None if the translation failed.
+    error : str
+        Description of the error if the translation failed, otherwise
+        None.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            md = Nc_to_mmd(str(nc_file), check_only=True,
+                           vocabularies=vocabularies or _vocabularies)
+            md.to_mmd(renderer="lxml")
+        acdd = mmd_to_acdd(md.mmd_tree)
+        with netCDF4.Dataset(nc_file) as ncin:
+            original = {name: ncin.getncattr(name) for name in ncin.ncattrs()}
+    except Exception as e:
+        return str(nc_file), None, "%s: %s" % (type(e).__name__, e)
+    names = acdd_attribute_names(load_mmd_yaml())
+    return str(nc_file), compare_attributes(original, acdd, names), None
+
+
+def check_files(nc_files, processes=None, chunksize=1):
+    """Check the round trip of many netCDF files in a pool of worker
+    processes (see check_file), which each load the controlled
+    vocabularies once. If processes is 1, the files are checked in the
+    current process.
+
+    Returns
+    -------
+    results : list
+        The results of check_file, in the order of nc_files.
+    """
+    nc_files = [str(nc_file) for nc_file in nc_files]
+    if processes == 1:
+        vocabularies = load_vocabularies()
+        return [check_file(nc_file, vocabularies) for nc_file in nc_files]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as executor:
+        return list(executor.map(check_file, nc_files, chunksize=chunksize))
+
+
+def summarise(results):
+    """Count the discrepancies of each kind per attribute, and the
+    failed files, in the results of check_files.
+
+    Returns
+    -------
+    summary : collections.Counter
+        Number of files per (kind, attribute), where kind is 'changed',
+        'added' or 'missing'.
+    failed : int
+        Number of files that could not be translated.
+    """
+    summary = Counter()
+    failed = 0
+    for nc_file, discrepancies, error in results:
+        if error is not None:
+            failed += 1
+            continue
+        for kind, attributes in discrepancies.items():
+            summary.update((kind, name) for name in attributes)
+    return summary, failed
@@ -24,6 +24,7 @@ import argparse
 import pathlib
 
 from py_mmd_tools import nc_to_mmd
+from py_mmd_tools.metrics import Metrics
 
 
 def create_parser():
@@ -32,6 +33,16 @@ def create_parser():
         description="Check if a netCDF file contains required elements to create an MMD file."
     )
     parser.add_argument('-i', '--input', type=str, help="Input file, folder or OPeNDAP url.")
+    parser.add_argument(
+        '--metrics-file', default=None,
+        help=("Write run statistics in the OpenMetrics text format to this file. If a "
+              "directory is given (e.g., a node_exporter textfile collector directory), the "
+              "statistics are written to <directory>/check_nc.prom.")
+    )
+    parser.add_argument(
+        '--metrics-interval', type=float, default=60.,
+        help="Minimum number of seconds between updates of the metrics file during the run."
+    )
 
     return parser
 
@@ -52,18 +63,39 @@ def main(args=None):
     else:
         raise ValueError(f'Invalid input: {args.input}')
 
-    for file in inputfiles:
-        md = nc_to_mmd.Nc_to_mmd(str(file), check_only=True)
-        try:
-            ok, msg = md.to_mmd()
-        except AttributeError as e:
-            ok = False
-            msg = e
-        if ok:
-            print(f"OK - file {file} contains all necessary elements.")
-        else:
-            print(f"Not OK - file {file} does not contain all necessary elements.")
-            print(msg)
+    metrics = None
+    if args.metrics_file is not None:
+        metrics = Metrics(job="check_nc")
+
+    vocabularies = nc_to_mmd.load_vocabularies()
+    try:
+        for file in inputfiles:
+            md = None
+            error = None
+            try:
+                md = nc_to_mmd.Nc_to_mmd(str(file), check_only=True, vocabularies=vocabularies)
+                ok, msg = md.to_mmd()
+            except AttributeError as e:
+                ok = False
+                msg = e
+                error = e
+            except Exception as e:
+                if metrics is not None:
+                    metrics.record_file(md, error=e)
+                raise
+            if ok:
+                print(f"OK - file {file} contains all necessary elements.")
+            else:
+                print(f"Not OK - file {file} does not contain all necessary elements.")
+                print(msg)
+                if error is None:
+                    error = "MissingElements"
+            if metrics is not None:
+                metrics.record_file(md, error=error)
+                metrics.write_if_due(args.metrics_file, args.metrics_interval)
+    finally:
+        if metrics is not None:
+            metrics.write(args.metrics_file)
 
 
 def _main():  # pragma: no cover
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Script to check that the global attributes of netCDF-CF files are
+preserved when they are translated to MMD and back to ACDD.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    check_roundtrip [-h] -i INPUT [-j PROCESSES] [--report REPORT]
+
+Example:
+    check_roundtrip -i /archive/2023/01 -j 16 --report roundtrip.json
+"""
+
+import argparse
+import json
+import os
+import pathlib
+
+from py_mmd_tools.roundtrip import check_files
+from py_mmd_tools.roundtrip import summarise
+
+
+def create_parser():
+    """Create argument parser"""
+    parser = argparse.ArgumentParser(
+        description=("Check that the global attributes of netCDF files are preserved when "
+                     "translated to MMD and back to ACDD.")
+    )
+    parser.add_argument("-i", "--input", type=str, required=True, help="Input file or folder.")
+    parser.add_argument(
+        "-j", "--processes", type=int, default=os.cpu_count(),
+        help="Number of worker processes (default is the number of CPUs)."
+    )
+    parser.add_argument(
+        "--report", default=None,
+        help="Write the discrepancies of each file to this file (json)."
+    )
+
+    return parser
+
+
+def main(args=None):
+    """Run tool to check the round trip of netCDF files.
+
+    Returns
+    -------
+    results : list
+        (netCDF file, discrepancies, error) for each file (see
+        py_mmd_tools.roundtrip.check_file).
+    """
+    if pathlib.Path(args.input).is_dir():
+        inputfiles = sorted(pathlib.Path(args.input).glob("*.nc"))
+    elif pathlib.Path(args.input).is_file():
+        inputfiles = [args.input]
+    else:
+        raise ValueError(f"Invalid input: {args.input}")
+
+    results = check_files(inputfiles, processes=args.processes)
+    summary, failed = summarise(results)
+
+    print("Checked %d files, %d could not be translated." % (len(results), failed))
+    for (kind, name), count in sorted(summary.items()):
+        print("%-8s %-30s %d" % (kind, name, count))
+    for nc_file, discrepancies, error in results:
+        if error is not None:
+            print(f"FAILED - {nc_file}: {error}")
+
+    if args.report is not None:
+        report = {
+            nc_file: {"error": error, "discrepancies": discrepancies}
+            for nc_file, discrepancies, error in results
+        }
+        with open(args.report, "w") as fh:
+            json.dump(report, fh, indent=2, default=str)
+
+    return results
+
+
+def _main():  # pragma: no cover
+    try:
+        main(create_parser().parse_args())
+    except ValueError as e:
+        print(e)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    _main()
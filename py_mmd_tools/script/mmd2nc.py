@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Script to update the global attributes of netCDF-CF files from MMD xml
+files.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    mmd2nc [-h] (-m MANIFEST | -i MMD -n NC) [-j PROCESSES] [--dry-run] [--overwrite]
+
+The manifest lists one MMD file and the netCDF file to update per line,
+separated by a tab, or by whitespace if the line has no tab (then the
+paths cannot contain spaces). Empty lines and lines starting with '#'
+are ignored.
+
+Example:
+    mmd2nc -m manifest.txt -j 8
+"""
+
+import argparse
+import os
+
+from py_mmd_tools.mmd_to_nc import update_nc_files
+
+
+def create_parser():
+    """Create argument parser"""
+    parser = argparse.ArgumentParser(
+        description="Update the global attributes of netCDF files from MMD xml files."
+    )
+    parser.add_argument(
+        "-m", "--manifest", default=None,
+        help="File with one pair of MMD and netCDF files per line, separated by a tab."
+    )
+    parser.add_argument("-i", "--mmd", default=None, help="Input MMD file.")
+    parser.add_argument("-n", "--nc", default=None, help="NetCDF file to update.")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Only report the global attributes that would be added or changed."
+    )
+    parser.add_argument(
+        "--overwrite", action="store_true",
+        help=("Replace existing global attributes, and only write the attributes that have "
+              "changed. By default, it is an error if an attribute already exists.")
+    )
+    parser.add_argument(
+        "-j", "--processes", type=int, default=os.cpu_count(),
+        help="Number of worker processes (default is the number of CPUs)."
+    )
+
+    return parser
+
+
+def read_manifest(manifest):
+    """Return the (MMD file, netCDF file) pairs listed in manifest.
+    The paths are separated by a tab, or by whitespace if the line has
+    no tab.
+    """
+    pairs = []
+    with open(manifest) as fh:
+        for number, line in enumerate(fh, start=1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if "\t" in line:
+                fields = line.split("\t")
+            else:
+                fields = line.split()
+            if len(fields) != 2:
+                raise ValueError("Invalid manifest line %d: %s" % (number, line))
+            pairs.append(tuple(fields))
+    return pairs
+
+
+def main(args=None):
+    """Run tool to update netCDF files from MMD files.
+
+    Returns
+    -------
+    results : list
+        (MMD file, netCDF file, error, delta) for each pair, where
+        error is None if the update succeeded (see
+        py_mmd_tools.mmd_to_nc.update_nc_files).
+    """
+    if args.manifest is not None:
+        pairs = read_manifest(args.manifest)
+    elif args.mmd is not None and args.nc is not None:
+        pairs = [(args.mmd, args.nc)]
+    else:
+        raise ValueError("Either a manifest or an MMD file and a netCDF file must be provided")
+
+    results = update_nc_files(pairs, processes=args.processes, overwrite=args.overwrite,
+                              dry_run=args.dry_run)
+    for mmd_product, nc_file, error, delta in results:
+        if error is not None:
+            print(f"FAILED - {nc_file} could not be updated from {mmd_product}: {error}")
+        elif args.dry_run:
+            print(f"DIFF - {nc_file}: {len(delta)} global attributes would be changed.")
+            for key, (old, new) in delta.items():
+                print(f"\t{key}: {old!r} -> {new!r}")
+        elif not delta:
+            print(f"UNCHANGED - {nc_file} is up to date with {mmd_product}.")
+        else:
+            print(f"OK - {nc_file} updated from {mmd_product}.")
+
+    return results
+
+
+def _main():  # pragma: no cover
+    try:
+        main(create_parser().parse_args())
+    except ValueError as e:
+        print(e)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    _main()
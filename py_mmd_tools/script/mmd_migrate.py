@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Script to migrate MMD xml files with an XSLT stylesheet (e.g., from MMD
+version 2 to version 3 with mmdv2-to-mmdv3.xsl).
+
+The documents are read from a directory or an archive (.tar, .tar.gz,
+.tgz or .zip), transformed in a pool of worker processes, optionally
+validated against an XML schema, and written atomically to the output
+directory. The stylesheet and the schema are only compiled once in each
+worker process.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+
+Usage:
+    mmd_migrate [-h] -i INPUT -o OUTPUT_DIR --xsl XSL [--xsd XSD] [-j PROCESSES]
+
+Example:
+    mmd_migrate -i mmd_v2.tar.gz -o mmd_v3 --xsl mmdv2-to-mmdv3.xsl --xsd mmd_strict.xsd
+"""
+
+import argparse
+import os
+import pathlib
+import posixpath
+import tarfile
+import zipfile
+
+import lxml.etree as ET
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
+from py_mmd_tools import mmd_xml
+from py_mmd_tools.mmd_writer import write_atomic
+
+
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".tar", ".zip")
+
+
+def create_parser():
+    """Create argument parser"""
+    parser = argparse.ArgumentParser(
+        description="Migrate MMD xml files with an XSLT stylesheet."
+    )
+    parser.add_argument(
+        "-i", "--input", type=str, required=True,
+        help="Input MMD file, folder or archive (.tar, .tar.gz, .tgz or .zip)."
+    )
+    parser.add_argument(
+        "-o", "--output_dir", type=pathlib.Path, required=True,
+        help="Output directory."
+    )
+    parser.add_argument(
+        "--xsl", required=True,
+        help="XSLT stylesheet, e.g., mmdv2-to-mmdv3.xsl."
+    )
+    parser.add_argument(
+        "--xsd", default=None,
+        help="Validate the migrated documents against this XML schema. Invalid documents are "
+             "reported, and not written."
+    )
+    parser.add_argument(
+        "-j", "--processes", type=int, default=os.cpu_count(),
+        help="Number of worker processes (default is the number of CPUs)."
+    )
+
+    return parser
+
+
+def read_documents(input):
+    """Yield (name, content) of the MMD xml files in input, which can
+    be a file, a directory or an archive. The documents in an archive
+    are read one at a time, and the file names are relative to
+    the archive.
+    """
+    path = pathlib.Path(input)
+    if path.is_dir():
+        for fn in sorted(path.glob("*.xml")):
+            yield fn.name, fn.read_bytes()
+    elif path.is_file() and input.endswith(".zip"):
+        with zipfile.ZipFile(input) as archive:
+            for name in archive.namelist():
+                if name.endswith(".xml"):
+                    yield name, archive.read(name)
+    elif path.is_file() and input.endswith(ARCHIVE_SUFFIXES):
+        with tarfile.open(input) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith(".xml"):
+                    yield member.name, archive.extractfile(member).read()
+    elif path.is_file():
+        yield path.name, path.read_bytes()
+    else:
+        raise ValueError(f"Invalid input: {input}")
+
+
+def output_path(output_dir, name):
+    """Return the path of the migrated document name in output_dir.
+    The path of an archive member relative to the archive is kept, so
+    that members with the same base name do not overwrite each other,
+    but absolute paths and '..' components are removed, so that all
+    documents are written within output_dir.
+    """
+    parts = [
+        part for part in posixpath.normpath(name.replace("\\", "/")).split("/")
+        if part not in ("", ".", "..")
+    ]
+    return os.path.join(output_dir, *parts)
+
+
+def migrate_document(name, content, output_dir, xsl, xsd=None):
+    """Transform one MMD document with xsl, validate it against xsd (if
+    given), and write it to output_dir (see output_path).
+
+    Returns
+    -------
+    name : str
+        Name of the input document.
+    output : str
+        Path to the migrated document, or None if it was not written.
+    errors : list of str
+        Parse, transformation and schema errors.
+    """
+    try:
+        result = mmd_xml.get_transform(xsl)(ET.fromstring(content))
+    except (ET.XMLSyntaxError, ET.XSLTApplyError) as e:
+        return name, None, [str(e)]
+    if result.getroot() is None:
+        return name, None, ["The transformation result is not an XML document"]
+    if xsd is not None:
+        errors = mmd_xml.validate(result.getroot(), xsd)
+        if errors:
+            return name, None, errors
+    output = output_path(output_dir, name)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    output = write_atomic(output, bytes(result))
+    return name, output, []
+
+
+def migrate(documents, output_dir, xsl, xsd=None, processes=None):
+    """Migrate documents, given as (name, content) pairs, and yield
+    the results of migrate_document in the order they complete.
+
+    The documents are distributed to a pool of worker processes, with
+    a bounded number of documents in flight, so that an archive is not
+    read into memory all at once. If processes is 1, the documents are
+    migrated in the current process.
+    """
+    output_dir = str(output_dir)
+    if processes == 1:
+        for name, content in documents:
+            yield migrate_document(name, content, output_dir, xsl, xsd)
+        return
+    processes = processes or os.cpu_count()
+    max_pending = 4*processes
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = set()
+        for name, content in documents:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(migrate_document, name, content, output_dir, xsl, xsd))
+        for future in wait(pending).done:
+            yield future.result()
+
+
+def main(args=None):
+    """Run tool to migrate MMD xml files.
+
+    Returns
+    -------
+    migrated : int
+        Number of migrated documents.
+    failed : int
+        Number of documents that could not be migrated.
+    """
+    if not os.path.isfile(args.xsl):
+        raise ValueError(f"Invalid XSLT stylesheet: {args.xsl}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    migrated = 0
+    failed = 0
+    results = migrate(read_documents(args.input), args.output_dir, args.xsl, xsd=args.xsd,
+                      processes=args.processes)
+    for name, output, errors in results:
+        if output is None:
+            failed += 1
+            print("Could not migrate %s:\n\t%s" % (name, "\n\t".join(errors)))
+        else:
+            migrated += 1
+    print("Migrated %d of %d documents." % (migrated, migrated + failed))
+
+    return migrated, failed
+
+
+def _main():  # pragma: no cover
+    try:
+        main(create_parser().parse_args())
+    except ValueError as e:
+        print(e)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    _main()
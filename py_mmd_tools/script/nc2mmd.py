@@ -27,6 +27,13 @@ import warnings
 from pkg_resources import resource_string
 
 from py_mmd_tools import nc_to_mmd
+from py_mmd_tools.checkpoint import Checkpoint
+from py_mmd_tools.id_registry import IdRegistry
+from py_mmd_tools.metrics import Metrics
+from py_mmd_tools.mmd_writer import ArchiveWriter
+from py_mmd_tools.mmd_writer import FileWriter
+from py_mmd_tools.mmd_writer import remove_stale_files
+from py_mmd_tools.translation_cache import TranslationCache
 
 
 def create_parser():
@@ -53,6 +60,43 @@ def create_parser():
         "-o", "--output_dir", type=pathlib.Path,
         help="Output directory."
     )
+    parser.add_argument(
+        "--renderer", choices=["jinja", "lxml"], default="jinja",
+        help=("Create the MMD xml files from the Jinja template (default), or as lxml element "
+              "trees (compact output).")
+    )
+    parser.add_argument(
+        "--xsd", default=None,
+        help=("Validate the MMD documents against this XML schema (e.g., xsd/mmd_strict.xsd "
+              "in the MMD repository) before they are written. Invalid documents are "
+              "reported, and not written.")
+    )
+    parser.add_argument(
+        "--transform", nargs=2, action="append", metavar=("XSL", "SUFFIX"), default=[],
+        help=("Also write the MMD documents transformed with this XSLT stylesheet, with the "
+              "suffix replacing the .xml extension, e.g., --transform mmd-to-iso.xsl "
+              "_iso.xml. Can be given several times.")
+    )
+    parser.add_argument(
+        "--gzip", action="store_true",
+        help="Gzip compress the MMD xml files."
+    )
+    parser.add_argument(
+        "--bundle", default=None,
+        help=("Bundle the MMD xml files in archives in the output directory, instead of "
+              "writing one file per dataset. The archive format is given by the suffix "
+              "(.tar, .tar.gz, .tgz or .zip), and the archives are numbered, e.g., "
+              "mmd.00001.tar.")
+    )
+    parser.add_argument(
+        "--bundle-size", type=int, default=1000,
+        help="Maximum number of MMD xml files per archive."
+    )
+    parser.add_argument(
+        "--fsync-batch", type=int, default=0,
+        help=("Sync the MMD xml files to disk in batches of this size. By default, the files "
+              "are not explicitly synced.")
+    )
     parser.add_argument(
         "-w", "--add_wms_data_access", action="store_true",
         help="Add wms data access (optional)."
@@ -84,7 +128,27 @@ def create_parser():
     )
     parser.add_argument(
         "--log-ids", default=None,
-        help="Store the metadata IDs in a file"
+        help="Store the metadata IDs in a file (IDs are appended as they are produced)"
+    )
+    parser.add_argument(
+        "--id-registry", default=None,
+        help=("SQLite database of metadata IDs and file paths, used to detect repeated IDs "
+              "across runs. It is created if it does not exist.")
+    )
+    parser.add_argument(
+        "--checkpoint", default=None,
+        help=("Record the progress of the run in this file, so that it can be resumed with "
+              "--resume if it is interrupted.")
+    )
+    parser.add_argument(
+        "--checkpoint-interval", type=int, default=None,
+        help=("Number of processed files between each write of the checkpoint file "
+              "(default 100). Not used with --bundle, where the checkpoint file is written "
+              "each time an archive is completed.")
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Skip the files that are already recorded as processed in the checkpoint file."
     )
     parser.add_argument(
         "--print_warnings",  action="store_true",
@@ -94,6 +158,32 @@ def create_parser():
         "--file_location", default=None,
         help=("Optionally, provide the CF-NetCDF file location (e.g., if the file will be moved "
               "after creation). By default, the existing file location be used."))
+    parser.add_argument(
+        "--metrics-file", default=None,
+        help=("Write run statistics in the OpenMetrics text format to this file. If a "
+              "directory is given (e.g., a node_exporter textfile collector directory), the "
+              "statistics are written to <directory>/nc2mmd.prom.")
+    )
+    parser.add_argument(
+        "--metrics-interval", type=float, default=60.,
+        help="Minimum number of seconds between updates of the metrics file during the run."
+    )
+    parser.add_argument(
+        "--cache-headers", action="store_true",
+        help=("Reuse the MMD elements translated from the stable global attributes (e.g., "
+              "personnel, keywords and platform) for files with the same header, such as the "
+              "files of a time series. Cache statistics are printed at the end of the run.")
+    )
+    parser.add_argument(
+        "--from-coordinates", action="store_true",
+        help=("Derive the geographic and temporal extent from the coordinate variables of "
+              "files that lack the geospatial_lat_*, geospatial_lon_* or time_coverage_start "
+              "attributes, and the footprint polygon of swaths without geospatial_bounds.")
+    )
+    parser.add_argument(
+        "--max-polygon-vertices", type=int, default=100,
+        help="Maximum number of vertices of footprint polygons derived with --from-coordinates."
+    )
 
     return parser
 
@@ -106,6 +196,12 @@ def main(args=None):
         if args.output_dir is None:
             raise ValueError("MMD XML output directory must be provided")
 
+    if args.resume and args.checkpoint is None:
+        raise ValueError("A checkpoint file must be provided to resume a run")
+
+    if args.bundle is not None and args.checkpoint_interval is not None:
+        raise ValueError("The checkpoint interval is given by the bundle size with --bundle")
+
     if not args.print_warnings:
         warnings.filterwarnings("ignore")
 
@@ -122,9 +218,138 @@ def main(args=None):
     else:
         raise ValueError(f"Invalid input: {args.input}")
 
-    url = None  # dry-run option
-    ids = []
-    for file in inputfiles:
+    metrics = None
+    if args.metrics_file is not None:
+        metrics = Metrics(job="nc2mmd")
+
+    writer = None
+    if not args.dry_run:
+        if args.bundle is not None:
+            writer = ArchiveWriter(args.output_dir / args.bundle, batch_size=args.bundle_size)
+        else:
+            writer = FileWriter(compress=args.gzip, batch_size=max(args.fsync_batch, 1),
+                                fsync=args.fsync_batch > 0)
+
+    ids = IdRegistry(args.id_registry)
+    checkpoint = None
+    if args.checkpoint is not None:
+        # Outputs are flushed before the checkpoint records them as
+        # done. An archive part can only be flushed when it is
+        # complete, so with --bundle the checkpoint is saved only then
+        interval = args.checkpoint_interval or 100
+        if isinstance(writer, ArchiveWriter):
+            interval = None
+        checkpoint = Checkpoint(args.checkpoint, interval=interval,
+                                sync=None if writer is None else writer.flush)
+        if args.resume:
+            if writer is not None:
+                remove_stale_files(args.output_dir)
+            for record in checkpoint.load().completed.values():
+                ids.register(record["metadata_id"], record["input"])
+        else:
+            checkpoint.reset()
+
+    # The vocabularies (and their memoised lookups) are shared by all
+    # files of the run
+    vocabularies = nc_to_mmd.load_vocabularies()
+
+    cache = None
+    if args.cache_headers:
+        cache = TranslationCache()
+
+    log_ids = None
+    logged_ids = set()
+    if args.log_ids:
+        if args.resume:
+            # The IDs of the files processed after the last save of the
+            # checkpoint are already logged
+            logged_ids = read_logged_ids(args.log_ids)
+        log_ids = open(args.log_ids, "a")
+
+    try:
+        for file in inputfiles:
+            if checkpoint is not None and checkpoint.is_done(file):
+                continue
+            md, metadata_id = process_file(file, args, ids, assume_same_url_basename,
+                                           writer=writer, cache=cache, metrics=metrics,
+                                           vocabularies=vocabularies)
+            if metadata_id is None:
+                # Repeated ID - the file is skipped, and reported
+                # at the end of the run
+                if metrics is not None:
+                    metrics.record_file(md, error="DuplicateIdError")
+                continue
+            if md.schema_errors:
+                print("Schema errors in %s:\n\t%s" % (file, "\n\t".join(md.schema_errors)))
+                if metrics is not None:
+                    metrics.record_file(md, error="SchemaValidationError")
+                continue
+            if log_ids is not None and metadata_id not in logged_ids:
+                log_ids.write(metadata_id+"\n")
+                log_ids.flush()
+            if checkpoint is not None:
+                checkpoint.add(file, metadata_id, md.output_location)
+                if isinstance(writer, ArchiveWriter) and not writer.is_open:
+                    checkpoint.save()
+            if metrics is not None:
+                metrics.record_file(md)
+                metrics.write_if_due(args.metrics_file, args.metrics_interval)
+    finally:
+        ids.close()
+        if writer is not None:
+            writer.close()
+        if log_ids is not None:
+            log_ids.close()
+        if checkpoint is not None:
+            checkpoint.save()
+        if metrics is not None:
+            metrics.write(args.metrics_file)
+        if cache is not None:
+            print(cache.report())
+
+    # Report all repeated IDs
+    ids.check()
+
+
+def read_logged_ids(path):
+    """Return the set of metadata IDs in the --log-ids file path, if
+    it exists. A truncated last line, from an interrupted run, is
+    completed with a newline, so that the next ID gets its own line.
+    """
+    if not os.path.isfile(path):
+        return set()
+    with open(path, "r+") as fh:
+        data = fh.read()
+        if data and not data.endswith("\n"):
+            fh.write("\n")
+    return set(data.split())
+
+
+def process_file(file, args, ids, assume_same_url_basename=False, writer=None, cache=None,
+                 metrics=None, vocabularies=None):
+    """Create an MMD xml file from one netCDF-CF file, and return the
+    Nc_to_mmd instance used for the translation together with the
+    metadata ID of the dataset.
+
+    The metadata ID is registered in ids (an IdRegistry). If it has
+    already been registered for another file, no MMD file is created,
+    and the returned metadata ID is None. The MMD file is stored with
+    writer (see py_mmd_tools.mmd_writer), if given. If the MMD document
+    is not valid according to args.xsd, it is not written, and the
+    schema errors are found in md.schema_errors. The metadata ID is
+    then unregistered, as it is if the translation fails, so that a
+    corrected file can be processed later. The translation cache
+    (see py_mmd_tools.translation_cache), if given, is shared by all
+    files of the run. If the translation fails, the error is recorded
+    in metrics (a py_mmd_tools.metrics.Metrics), if given, together
+    with the timings of the completed stages. The controlled
+    vocabularies (see nc_to_mmd.load_vocabularies) are loaded for the
+    file, unless they are given.
+    """
+    md = None
+    registered = False
+    try:
+        url = None  # dry-run option
         if not args.dry_run:
             if assume_same_url_basename:
                 url = os.path.join(args.url, file)
@@ -135,9 +360,11 @@ def main(args=None):
                 outfile = infile.with_suffix(infile.suffix+".xml")
             else:
                 outfile = (args.output_dir / pathlib.Path(file).stem).with_suffix(".xml")
-            md = nc_to_mmd.Nc_to_mmd(str(file), opendap_url=url, output_file=outfile)
+            md = nc_to_mmd.Nc_to_mmd(str(file), opendap_url=url, output_file=outfile,
+                                     checksum_calculation=args.checksum_calculation,
+                                     vocabularies=vocabularies)
         else:
-            md = nc_to_mmd.Nc_to_mmd(str(file), check_only=True)
+            md = nc_to_mmd.Nc_to_mmd(str(file), check_only=True, vocabularies=vocabularies)
         overrides = None
         if args.file_location is not None:
             overrides = {"file_location": args.file_location}
@@ -147,10 +374,9 @@ def main(args=None):
         )
         metadata_id = md.get_metadata_identifier(mmd_yaml["metadata_identifier"],
                                                  netCDF4.Dataset(file))
-        if metadata_id in ids:
-            raise ValueError("Unique ID repetition. Please check your ID's.")
-        else:
-            ids.append(metadata_id)
+        if not ids.register(metadata_id, file):
+            return md, None
+        registered = True
         req_ok, msg = md.to_mmd(
             add_wms_data_access=args.add_wms_data_access,
             wms_link=args.wms_link,
@@ -158,12 +384,26 @@ def main(args=None):
             checksum_calculation=args.checksum_calculation,
             collection=args.collection,
             parent=args.parent,
-            overrides=overrides
+            overrides=overrides,
+            writer=writer,
+            renderer=args.renderer,
+            xsd=args.xsd,
+            transforms={suffix: xsl for xsl, suffix in args.transform},
+            cache=cache,
+            from_coordinates=args.from_coordinates,
+            max_polygon_vertices=args.max_polygon_vertices,
         )
-    if args.log_ids:
-        with open(args.log_ids, "a") as f:
-            for mid in ids:
-                f.write(mid+"\n")
+    except Exception as e:
+        if registered:
+            ids.unregister(metadata_id, file)
+        if metrics is not None:
+            metrics.record_file(md, error=e)
+        raise
+    if md.schema_errors:
+        # No MMD file is written, so the ID can be used by a corrected
+        # file in a later run
+        ids.unregister(metadata_id, file)
+    return md, metadata_id
 
 
 def _main():  # pragma: no cover
@@ -0,0 +1,188 @@
+"""
+Tool for reusing the translated MMD elements that are shared by the
+files of a time series (e.g., personnel, keywords and platform), so
+that they are only looked up and validated once per file family.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import copy
+import json
+import hashlib
+
+import numpy as np
+
+from collections import OrderedDict
+
+from py_mmd_tools.nc_to_mmd import variable_attribute_index
+
+
+# Global attributes that usually differ between the files of a time
+# series. None of them are used to translate the cached elements.
+VOLATILE_ATTRIBUTES = frozenset([
+    "id",
+    "date_created",
+    "date_modified",
+    "date_issued",
+    "date_metadata_modified",
+    "time_coverage_start",
+    "time_coverage_end",
+    "time_coverage_duration",
+    "history",
+    "title",
+    "title_no",
+    "summary",
+    "summary_no",
+    "geospatial_lat_min",
+    "geospatial_lat_max",
+    "geospatial_lon_min",
+    "geospatial_lon_max",
+    "geospatial_bounds",
+])
+
+# MMD elements that are translated only from the stable global
+# attributes (and the standard names of the variables)
+CACHED_ELEMENTS = (
+    "data_center",
+    "personnel",
+    "keywords",
+    "project",
+    "platform",
+    "use_constraint",
+    "operational_status",
+    "iso_topic_category",
+    "activity_type",
+    "dataset_production_status",
+    "quality_control",
+)
+
+
+def _attribute_bytes(value):
+    """Return the full value of an attribute (str, number or array) as
+    bytes, including the type and shape of numeric values.
+    """
+    if isinstance(value, str):
+        return b"str:" + value.encode()
+    array = np.asarray(value)
+    if array.dtype.kind in "OSU":
+        return b"json:" + json.dumps(array.tolist()).encode()
+    return ("%s%r:" % (array.dtype.str, array.shape)).encode() + array.tobytes()
+
+
+class TranslationCache(object):
+    """Cache of translated MMD elements, keyed on a digest of the
+    stable global attributes of the netCDF file (see header_signature).
+
+    Together with a translated element, the cache stores the errors
+    and warnings that were added to Nc_to_mmd.missing_attributes by
+    the translation, so that a cached element is reported exactly as
+    if it had been translated again. The same cache must only be used
+    with one mmd_elements.yaml.
+
+    Parameters
+    ----------
+    maxsize : int, default 1024
+        Maximum number of header signatures to keep. The least
+        recently used signatures are discarded first.
+
+    Examples
+    --------
+    >>> cache = TranslationCache()
+    >>> for nc_file in nc_files:
+    ...     Nc_to_mmd(nc_file, check_only=True).to_mmd(cache=cache)
+    >>> print(cache.report())
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def header_signature(ncin, volatile=VOLATILE_ATTRIBUTES, index=None):
+        """Return a digest of the global attributes of ncin, except the
+        volatile ones, and of the standard names of its variables. The
+        standard names are taken from index (see
+        nc_to_mmd.variable_attribute_index), if given.
+        """
+        digest = hashlib.sha1()
+        for name in sorted(set(ncin.ncattrs()) - volatile):
+            digest.update(("%s=" % name).encode())
+            digest.update(_attribute_bytes(ncin.getncattr(name)))
+            digest.update(b"\n")
+        if index is None:
+            index = variable_attribute_index(ncin)
+        for standard_name in sorted(set(map(str, index["standard_name"].values()))):
+            digest.update(("variable:%s\n" % standard_name).encode())
+        return digest.hexdigest()
+
+    def get(self, signature, element):
+        """Return (value, errors, warnings) of element for the given
+        header signature, or None if it is not cached.
+        """
+        entry = self.entries.get(signature)
+        if entry is None or element not in entry:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(signature)
+        value, errors, warnings = entry[element]
+        return copy.deepcopy(value), list(errors), list(warnings)
+
+    def put(self, signature, element, value, errors, warnings):
+        """Store the translated element, and the errors and warnings
+        from its translation, for the given header signature.
+        """
+        if signature not in self.entries:
+            self.entries[signature] = {}
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        self.entries[signature][element] = (copy.deepcopy(value), list(errors), list(warnings))
+
+    def translate(self, signature, element, missing_attributes, func, *args):
+        """Return the translated element for the given header signature,
+        calling func(*args) if it is not cached.
+
+        The errors and warnings of the translation are added to
+        missing_attributes (see Nc_to_mmd.missing_attributes) also
+        when the element is taken from the cache.
+        """
+        cached = self.get(signature, element)
+        if cached is not None:
+            value, errors, warnings = cached
+            missing_attributes["errors"].extend(errors)
+            missing_attributes["warnings"].extend(warnings)
+            return value
+        n_errors = len(missing_attributes["errors"])
+        n_warnings = len(missing_attributes["warnings"])
+        value = func(*args)
+        self.put(signature, element, value, missing_attributes["errors"][n_errors:],
+                 missing_attributes["warnings"][n_warnings:])
+        return value
+
+    @property
+    def signatures(self):
+        """Number of cached header signatures."""
+        return len(self.entries)
+
+    def hit_rate(self):
+        """Return the fraction of the lookups that were found in the
+        cache.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.
+        return self.hits / lookups
+
+    def report(self):
+        """Return the cache statistics as a one-line summary."""
+        return "Translation cache: %d hits, %d misses (%.1f%% hit rate), %d header signatures" % (
+            self.hits, self.misses, 100*self.hit_rate(), self.signatures
+        )
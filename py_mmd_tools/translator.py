@@ -0,0 +1,135 @@
+"""
+Reentrant translator from netCDF-CF headers to MMD. The controlled
+vocabularies, the translation plan (mmd_elements.yaml) and the MMD
+template are loaded once, and each translation keeps its state in its
+own Nc_to_mmd instance, so that one translator can be shared by many
+threads.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import copy
+
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+
+from py_mmd_tools.mmd_to_nc import load_mmd_yaml
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+from py_mmd_tools.nc_to_mmd import load_mmd_template
+from py_mmd_tools.nc_to_mmd import load_vocabularies
+
+
+class Translator(object):
+    """Translator of netCDF-CF headers (or files) to MMD.
+
+    The translator itself is never modified after construction, so the
+    same instance can be used concurrently without locking. Each call
+    to translate creates a new Nc_to_mmd, which shares the vocabularies
+    of the translator, and gets its own copy of the translation plan.
+
+    Parameters
+    ----------
+    mmd_yaml : dict, optional
+        The translations from ACDD to MMD. By default, the ones in
+        mmd_elements.yaml.
+    vocabularies : dict, optional
+        Initialised controlled vocabularies (see
+        nc_to_mmd.load_vocabularies). By default, they are initialised
+        once for this translator.
+
+    Notes
+    -----
+    The netCDF-C library is not thread-safe, so a thread pool should
+    only be used to translate json headers (dicts), and without an
+    OPeNDAP url. The XML schema (xsd) and XSLT stylesheets
+    (transforms) are compiled once in each thread (see
+    mmd_xml.get_schema), so they can be given to translate from any
+    thread. Only a translation_cache.TranslationCache must not be
+    shared between threads.
+
+    Examples
+    --------
+    >>> translator = Translator()
+    >>> with ThreadPoolExecutor(8) as executor:
+    ...     futures = [executor.submit(translator.translate, h) for h in headers]
+    """
+
+    def __init__(self, mmd_yaml=None, vocabularies=None):
+        if mmd_yaml is None:
+            mmd_yaml = load_mmd_yaml()
+        if vocabularies is None:
+            vocabularies = load_vocabularies()
+        # The plan is copied, since Nc_to_mmd.to_mmd consumes it
+        self._mmd_yaml = copy.deepcopy(mmd_yaml)
+        self._vocabularies = MappingProxyType(dict(vocabularies))
+        self._template = load_mmd_template()
+
+    @property
+    def vocabularies(self):
+        """Read-only mapping of the controlled vocabularies."""
+        return self._vocabularies
+
+    def translate(self, header, opendap_url=None, output_file=None, checksum_calculation=False,
+                  **kwargs):
+        """Translate one netCDF-CF header to MMD.
+
+        Parameters
+        ----------
+        header : dict or str
+            A json header (see Nc_to_mmd, json_input), or the name of a
+            netCDF file.
+        opendap_url : str, optional
+            OPeNDAP url to the dataset.
+        output_file : str, optional
+            Output path of the MMD xml file. If None, the header is
+            only translated and checked, and nothing is written.
+        checksum_calculation : bool, default False
+            True if the file checksum should be included.
+        kwargs
+            Keyword arguments of Nc_to_mmd.to_mmd (except mmd_yaml and
+            template).
+
+        Returns
+        -------
+        md : Nc_to_mmd
+            The per-file state of the translation, e.g., md.metadata,
+            md.missing_attributes and md.mmd_tree.
+        req_ok : bool
+            See Nc_to_mmd.to_mmd.
+        msg : str
+            See Nc_to_mmd.to_mmd.
+        """
+        md = Nc_to_mmd(
+            header, opendap_url=opendap_url, output_file=output_file,
+            check_only=output_file is None, json_input=isinstance(header, dict),
+            checksum_calculation=checksum_calculation, vocabularies=self._vocabularies
+        )
+        req_ok, msg = md.to_mmd(
+            mmd_yaml=copy.deepcopy(self._mmd_yaml), template=self._template, **kwargs
+        )
+        return md, req_ok, msg
+
+    def translate_all(self, headers, max_workers=None, **kwargs):
+        """Translate many headers in a pool of threads (see translate).
+
+        Returns
+        -------
+        results : list
+            (result, error) for each header, in the order of headers,
+            where result is the return value of translate, or None if
+            the translation raised the exception error.
+        """
+        def translate(header):
+            try:
+                return self.translate(header, **kwargs), None
+            except Exception as e:
+                return None, e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(translate, headers))
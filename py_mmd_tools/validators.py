@@ -0,0 +1,108 @@
+"""
+Validators for the URLs and UUIDs in netCDF-CF attributes. The
+patterns are compiled once, and the URL results are cached, since the
+same URLs (e.g., the license and vocabulary URLs) are repeated in most
+files. UUIDs are unique per file, so they are not cached.
+
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import re
+import functools
+
+from uuid import UUID
+
+URL_PATTERN = re.compile(
+    r"^(?:http|ftp)s?://"  # http:// or https://
+    r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|"
+    r"localhost|"  # localhost...
+    r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # ...or ip
+    r"(?::\d+)?"  # optional port
+    r"(?:/?|[/?]\S+)$",
+    re.IGNORECASE,
+)
+
+# Canonical (lower case, hyphenated) RFC 4122 UUIDs of each version
+UUID_PATTERNS = {
+    version: re.compile(
+        r"[0-9a-f]{8}-[0-9a-f]{4}-%d[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}" % version
+    )
+    for version in range(1, 6)
+}
+
+CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _valid_url(url):
+    return URL_PATTERN.match(url) is not None
+
+
+def valid_url(url):
+    """Validate a url pattern (not its existence)."""
+    if url is None:
+        return False
+    if isinstance(url, str):
+        return _valid_url(url)
+    return URL_PATTERN.match(url) is not None
+
+
+def is_valid_uuid(uuid_to_test, version=4):
+    """Check if uuid_to_test is a valid UUID of the given version, in
+    its canonical form.
+
+    Parameters
+    ----------
+    uuid_to_test : str
+    version : {1, 2, 3, 4, 5}
+
+    Returns
+    -------
+    `True` if uuid_to_test is a valid UUID, otherwise `False`.
+
+    Examples
+    --------
+    >>> is_valid_uuid('c9bf9e57-1685-4c89-bafb-ff5af830be8a')
+    True
+    >>> is_valid_uuid('c9bf9e58')
+    False
+    """
+    if isinstance(uuid_to_test, str) and version in UUID_PATTERNS:
+        return UUID_PATTERNS[version].fullmatch(uuid_to_test) is not None
+    try:
+        uuid_obj = UUID(uuid_to_test, version=version)
+    except ValueError:
+        return False
+    return str(uuid_obj) == uuid_to_test
+
+
+def valid_urls(urls):
+    """Validate many urls (see valid_url), and return a list of
+    booleans in the same order. Each distinct url is only checked
+    once.
+    """
+    results = {}
+    valid = []
+    for url in urls:
+        if url not in results:
+            results[url] = valid_url(url)
+        valid.append(results[url])
+    return valid
+
+
+def valid_uuids(values, version=4):
+    """Validate many UUIDs (see is_valid_uuid), and return a list of
+    booleans in the same order.
+    """
+    return [is_valid_uuid(value, version) for value in values]
+
+
+def cache_info():
+    """Return the cache statistics of the url validator."""
+    return {"url": _valid_url.cache_info()}
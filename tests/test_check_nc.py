@@ -84,3 +84,69 @@ def test_failing_ncfile(dataDir, capsys):
     main(parsed)
     captured = capsys.readouterr()
     assert captured.out.startswith('Not OK')
+
+
+@pytest.mark.script
+def test_metrics_file(dataDir):
+    """Test that failures are counted in the metrics file"""
+    parser = create_parser()
+    in_dir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(dataDir, 'reference_nc.nc'), in_dir)
+    shutil.copy(os.path.join(dataDir, 'reference_nc_fail.nc'), in_dir)
+    metrics_file = os.path.join(in_dir, 'check_nc.prom')
+    parsed = parser.parse_args([
+        '-i', in_dir,
+        '--metrics-file', metrics_file,
+    ])
+    main(parsed)
+    with open(metrics_file) as fh:
+        text = fh.read()
+    assert 'py_mmd_tools_files_processed_total{job="check_nc",status="ok"} 1' in text
+    assert 'py_mmd_tools_files_processed_total{job="check_nc",status="failed"} 1' in text
+    assert 'py_mmd_tools_failures_total{error_type="AttributeError",job="check_nc"} 1' in text
+    shutil.rmtree(in_dir)
+
+
+@pytest.mark.script
+def test_metrics_file_failure(dataDir, monkeypatch):
+    """Test that an unexpected error is counted, and that the metrics
+    file is still written.
+    """
+    def init(self, *args, **kwargs):
+        raise OSError('cannot read file')
+
+    parser = create_parser()
+    in_dir = tempfile.mkdtemp()
+    metrics_file = os.path.join(in_dir, 'check_nc.prom')
+    parsed = parser.parse_args([
+        '-i', os.path.join(dataDir, 'reference_nc.nc'),
+        '--metrics-file', metrics_file,
+    ])
+    monkeypatch.setattr('py_mmd_tools.nc_to_mmd.Nc_to_mmd.__init__', init)
+    with pytest.raises(OSError):
+        main(parsed)
+    with open(metrics_file) as fh:
+        assert 'py_mmd_tools_failures_total{error_type="OSError",job="check_nc"} 1' in fh.read()
+    shutil.rmtree(in_dir)
+
+
+@pytest.mark.script
+def test_metrics_file_not_ok(dataDir, monkeypatch):
+    """Test that files that are not OK are counted as failed, also
+    when no error is raised.
+    """
+    parser = create_parser()
+    in_dir = tempfile.mkdtemp()
+    metrics_file = os.path.join(in_dir, 'check_nc.prom')
+    parsed = parser.parse_args([
+        '-i', os.path.join(dataDir, 'reference_nc.nc'),
+        '--metrics-file', metrics_file,
+    ])
+    monkeypatch.setattr('py_mmd_tools.nc_to_mmd.Nc_to_mmd.to_mmd',
+                        lambda self, *args, **kwargs: (False, 'Missing elements'))
+    main(parsed)
+    with open(metrics_file) as fh:
+        text = fh.read()
+    assert 'py_mmd_tools_files_processed_total{job="check_nc",status="failed"} 1' in text
+    assert 'py_mmd_tools_failures_total{error_type="MissingElements",job="check_nc"} 1' in text
+    shutil.rmtree(in_dir)
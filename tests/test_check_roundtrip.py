@@ -0,0 +1,46 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from py_mmd_tools.script.check_roundtrip import create_parser
+from py_mmd_tools.script.check_roundtrip import main
+
+
+@pytest.mark.script
+def test_main(dataDir, capsys):
+    """Test checking a folder, with a report file."""
+    in_dir = tempfile.mkdtemp()
+    for fn in ["reference_nc.nc", "reference_nc_fail.nc"]:
+        shutil.copy(os.path.join(dataDir, fn), in_dir)
+    report = os.path.join(in_dir, "report.json")
+    results = main(create_parser().parse_args(["-i", in_dir, "-j", "1", "--report", report]))
+    assert len(results) == 2
+    out = capsys.readouterr().out
+    assert "Checked 2 files, 1 could not be translated." in out
+    assert "FAILED - %s" % os.path.join(in_dir, "reference_nc_fail.nc") in out
+    with open(report) as fh:
+        data = json.load(fh)
+    assert data[os.path.join(in_dir, "reference_nc.nc")]["error"] is None
+    assert "title_no" in data[os.path.join(in_dir, "reference_nc.nc")]["discrepancies"][
+        "missing"]
+    shutil.rmtree(in_dir)
+
+
+@pytest.mark.script
+def test_invalid_input():
+    """Test that invalid input is reported."""
+    with pytest.raises(ValueError):
+        main(create_parser().parse_args(["-i", "missing.nc"]))
@@ -0,0 +1,69 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+
+import pytest
+
+from py_mmd_tools.checkpoint import Checkpoint
+
+
+@pytest.mark.py_mmd_tools
+def test_add_and_load(tmpdir):
+    """Test that completed files are flushed at the given interval,
+    and read back by load.
+    """
+    fn = os.path.join(tmpdir, "run.checkpoint")
+    cp = Checkpoint(fn, interval=2)
+    cp.reset()
+    cp.add("a.nc", "no.met:a", "a.xml")
+    assert cp.is_done("a.nc")
+    assert Checkpoint(fn).load().completed == {}
+    cp.add("b.nc", "no.met:b", None)
+    loaded = Checkpoint(fn).load()
+    assert loaded.is_done("a.nc")
+    assert loaded.is_done(os.path.abspath("b.nc"))
+    assert not loaded.is_done("c.nc")
+    assert [r["metadata_id"] for r in loaded.completed.values()] == ["no.met:a", "no.met:b"]
+    assert loaded.completed[os.path.abspath("a.nc")]["output"] == "a.xml"
+
+
+@pytest.mark.py_mmd_tools
+def test_save_and_reset(tmpdir):
+    """Test explicit save, and that reset discards earlier
+    progress.
+    """
+    fn = os.path.join(tmpdir, "run.checkpoint")
+    cp = Checkpoint(fn)
+    cp.add("a.nc", "no.met:a")
+    cp.save()
+    assert Checkpoint(fn).load().is_done("a.nc")
+    cp.reset()
+    assert os.path.getsize(fn) == 0
+    assert not Checkpoint(fn).load().is_done("a.nc")
+
+
+@pytest.mark.py_mmd_tools
+def test_load_missing_and_truncated(tmpdir):
+    """Test loading a missing checkpoint, and one with a truncated
+    last line, which is removed so that later records are intact.
+    """
+    fn = os.path.join(tmpdir, "run.checkpoint")
+    assert Checkpoint(fn).load().completed == {}
+    cp = Checkpoint(fn, interval=1)
+    cp.add("a.nc", "no.met:a")
+    with open(fn, "a") as fh:
+        fh.write('{"input": "/b.nc", "metad')
+    cp = Checkpoint(fn, interval=1).load()
+    assert list(cp.completed) == [os.path.abspath("a.nc")]
+    cp.add("c.nc", "no.met:c")
+    with open(fn) as fh:
+        assert len(fh.readlines()) == 2
+    assert Checkpoint(fn).load().is_done("c.nc")
@@ -0,0 +1,366 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import json
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pytest
+
+from netCDF4 import Dataset
+from shapely.geometry import Polygon
+
+from py_mmd_tools import extent
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+from py_mmd_tools.nc_to_mmd import nc_wrapper
+
+
+def swath(path, lat, lon):
+    """Write a netCDF file with 2D latitude and longitude variables,
+    and return it opened for reading.
+    """
+    with Dataset(path, "w") as ds:
+        ds.createDimension("y", lat.shape[0])
+        ds.createDimension("x", lat.shape[1])
+        for name, values in [("latitude", lat), ("longitude", lon)]:
+            var = ds.createVariable(name, "f4", ("y", "x"), fill_value=-999.)
+            var.standard_name = name
+            var[:] = values
+    return Dataset(path)
+
+
+@pytest.mark.py_mmd_tools
+def test_iter_chunks(tmpdir):
+    """Test that variables are read in blocks of whole rows, with
+    fill values masked.
+    """
+    lat = np.ma.masked_array(np.arange(20.).reshape(5, 4), mask=False)
+    lat[0, 0] = np.ma.masked
+    with swath(os.path.join(tmpdir, "swath.nc"), lat, lat) as ds:
+        chunks = list(extent.iter_chunks(ds.variables["latitude"], chunk_size=9))
+        assert [chunk.shape for chunk in chunks] == [(2, 4), (2, 4), (1, 4)]
+        assert np.isnan(chunks[0][0, 0])
+        assert extent.min_max(chunks) == (1., 19.)
+        assert len(list(extent.iter_chunks(ds.variables["latitude"], chunk_size=1))) == 5
+    assert extent.min_max([np.full(3, np.nan), np.array([])]) == (None, None)
+
+
+@pytest.mark.py_mmd_tools
+def test_longitude_extent():
+    """Test the longitude limits, with and without crossing the
+    antimeridian.
+    """
+    def limits(*values):
+        return extent.longitude_extent([np.array(values)])
+
+    assert limits(10., 20., np.nan) == (10., 20.)
+    assert limits(170., 179., -175., -170.) == (170., -170.)
+    assert limits(170., 190.) == (170., -170.)
+    assert limits(-10., 350., 5.) == (-10., 5.)
+    assert limits(*np.arange(-180., 180.)) == (-180., 179.)
+    assert limits(np.nan) == (None, None)
+
+
+@pytest.mark.py_mmd_tools
+def test_geographic_extent(tmpdir):
+    """Test the extent of a swath crossing the antimeridian, read in
+    small chunks.
+    """
+    lat, lon = np.meshgrid(np.linspace(60., 70., 50), np.linspace(170., 200., 40),
+                           indexing="ij")
+    lat = np.ma.masked_array(lat, mask=False)
+    lat[-1, -1] = np.ma.masked
+    with swath(os.path.join(tmpdir, "swath.nc"), lat, lon) as ds:
+        assert extent.geographic_extent(ds, chunk_size=100) == {
+            "north": 70., "south": 60., "east": -160., "west": 170.
+        }
+
+
+@pytest.mark.py_mmd_tools
+def test_geographic_extent_missing(tmpdir):
+    """Test that None is returned when there are no (valid)
+    coordinates.
+    """
+    with Dataset(os.path.join(tmpdir, "empty.nc"), "w") as ds:
+        assert extent.geographic_extent(ds) is None
+    lat = np.ma.masked_all((2, 2))
+    with swath(os.path.join(tmpdir, "masked.nc"), lat, lat) as ds:
+        assert extent.geographic_extent(ds) is None
+
+
+@pytest.mark.py_mmd_tools
+def test_projected_extent(tmpdir):
+    """Test the extent of a polar stereographic grid containing the
+    north pole.
+    """
+    pytest.importorskip("pyproj")
+    with Dataset(os.path.join(tmpdir, "polar.nc"), "w") as ds:
+        ds.createDimension("x", 11)
+        ds.createDimension("y", 11)
+        for name in ["x", "y"]:
+            var = ds.createVariable(name, "f8", (name,))
+            var.standard_name = "projection_%s_coordinate" % name
+            var.units = "km"
+            var[:] = np.linspace(-1000., 1000., 11)
+        crs = ds.createVariable("crs", "i4")
+        crs.grid_mapping_name = "polar_stereographic"
+        crs.straight_vertical_longitude_from_pole = 0.
+        crs.latitude_of_projection_origin = 90.
+        crs.standard_parallel = 70.
+        ds.createVariable("ice_conc", "f4", ("y", "x")).grid_mapping = "crs"
+    with Dataset(os.path.join(tmpdir, "polar.nc")) as ds:
+        rectangle = extent.geographic_extent(ds)
+    assert rectangle["north"] == 90.
+    assert (rectangle["west"], rectangle["east"]) == (-180., 180.)
+    assert 70. < rectangle["south"] < 80.
+
+
+@pytest.mark.py_mmd_tools
+def test_rectangle_from_coordinates(dataDir):
+    """Test that the rectangle is derived from the coordinates if the
+    ACDD attributes are missing, and only if requested.
+    """
+    test_in = os.path.join(dataDir, "reference_nc_missing_rectangle.nc")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(test_in, check_only=True)
+        req_ok, msg = md.to_mmd(from_coordinates=True)
+    assert req_ok
+    assert md.metadata["geographic_extent"]["rectangle"] == {
+        "srsName": "EPSG:4326",
+        "north": 38.2741,
+        "south": 38.2445,
+        "east": 6.9445,
+        "west": 6.8684,
+    }
+    assert any("derived from the coordinate variables" in warning
+               for warning in md.missing_attributes["warnings"])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(test_in, check_only=True)
+        with pytest.raises(AttributeError, match="geospatial_lat_max is a required attribute"):
+            md.to_mmd()
+
+
+def json_header(dataDir, *missing):
+    """Return the reference json header without the given global
+    attributes.
+    """
+    with open(os.path.join(dataDir, "reference_nc_header.json"), "r") as fh:
+        header = json.load(fh)
+    for name in missing:
+        header["global_variables"].pop(name)
+    return header
+
+
+@pytest.mark.py_mmd_tools
+def test_rectangle_from_coordinates_json(dataDir):
+    """Test that the rectangle is not derived for json input, which has
+    no data, and that the missing attribute is reported.
+    """
+    header = json_header(dataDir, "geospatial_lat_max")
+    assert extent.find_coordinate(nc_wrapper(header), "latitude") is None
+    assert extent.geographic_extent(nc_wrapper(header)) is None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(header, json_input=True, check_only=True)
+        with pytest.raises(AttributeError, match="geospatial_lat_max is a required attribute"):
+            md.to_mmd(from_coordinates=True)
+    assert not any("derived from the coordinate variables" in warning
+                   for warning in md.missing_attributes["warnings"])
+
+
+def time_file(path, values, dims=("time",), name="time", **attrs):
+    """Write a netCDF file with a time variable, and return it opened
+    for reading.
+    """
+    values = np.ma.asarray(values)
+    with Dataset(path, "w") as ds:
+        for dim, size in zip(dims, values.shape):
+            ds.createDimension(dim, size)
+        var = ds.createVariable(name, "f8", dims, fill_value=-1.)
+        var.units = "hours since 2023-01-01 00:00:00"
+        var.setncatts(attrs)
+        var[:] = values
+    return Dataset(path)
+
+
+@pytest.mark.py_mmd_tools
+def test_time_limits(tmpdir):
+    """Test that only the ends of a time coordinate variable are used,
+    and that other time variables are reduced.
+    """
+    # Coordinate variables are monotonic, so the middle value is not
+    # read
+    with time_file(os.path.join(tmpdir, "t1.nc"), [1., 100., 2.], standard_name="time") as ds:
+        assert extent.time_limits(ds, ds.variables["time"]) == (1., 2.)
+    # Auxiliary time variable, e.g., the scan times of a swath
+    with time_file(os.path.join(tmpdir, "t2.nc"), [[1., 100.], [2., 3.]], dims=("y", "x"),
+                   name="scan_time", axis="T") as ds:
+        assert extent.find_time_coordinate(ds).name == "scan_time"
+        assert extent.time_limits(ds, ds.variables["scan_time"], chunk_size=1) == (1., 100.)
+    # Missing end values
+    values = np.ma.masked_array([3., 1., 5., 0.], mask=[False, False, False, True])
+    with time_file(os.path.join(tmpdir, "t3.nc"), values) as ds:
+        assert extent.time_limits(ds, ds.variables["time"]) == (1., 5.)
+    with time_file(os.path.join(tmpdir, "t4.nc"), np.ma.masked_all((2,))) as ds:
+        assert extent.time_limits(ds, ds.variables["time"]) == (None, None)
+        assert extent.temporal_extent(ds) is None
+
+
+@pytest.mark.py_mmd_tools
+def test_temporal_extent(tmpdir):
+    """Test the temporal extent from time bounds, with a non-standard
+    calendar.
+    """
+    path = os.path.join(tmpdir, "bounds.nc")
+    with Dataset(path, "w") as ds:
+        ds.createDimension("time", 2)
+        ds.createDimension("nv", 2)
+        var = ds.createVariable("time", "f8", ("time",))
+        var.standard_name = "time"
+        var.units = "days since 2023-02-01"
+        var.calendar = "noleap"
+        var.bounds = "time_bnds"
+        var[:] = [27.5, 28.25]
+        ds.createVariable("time_bnds", "f8", ("time", "nv"))[:] = [[27., 28.], [28., 28.5]]
+    with Dataset(path) as ds:
+        assert extent.temporal_extent(ds) == {
+            "start_date": "2023-02-28T00:00:00Z",
+            "end_date": "2023-03-01T12:00:00Z",
+        }
+    with Dataset(os.path.join(tmpdir, "empty.nc"), "w") as ds:
+        assert extent.temporal_extent(ds) is None
+    assert extent.format_time(0.5, "seconds since 2023-01-01") == "2023-01-01T00:00:00.500000Z"
+
+
+@pytest.mark.py_mmd_tools
+def test_temporal_extent_from_coordinates(dataDir, tmpdir):
+    """Test that the temporal extent is derived from the time
+    coordinate if time_coverage_start is missing.
+    """
+    test_in = os.path.join(tmpdir, "no_time_coverage.nc")
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"), test_in)
+    with Dataset(test_in, "a") as ds:
+        ds.delncattr("time_coverage_start")
+        ds.delncattr("time_coverage_end")
+        ds.createDimension("time", 3)
+        var = ds.createVariable("time", "f8", ("time",))
+        var.standard_name = "time"
+        var.units = "seconds since 2023-01-01 00:00:00"
+        var[:] = [0., 3600., 7200.]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(test_in, check_only=True)
+        req_ok, msg = md.to_mmd(from_coordinates=True)
+    assert req_ok
+    assert md.metadata["temporal_extent"] == [
+        {"start_date": "2023-01-01T00:00:00Z", "end_date": "2023-01-01T02:00:00Z"}
+    ]
+    assert any("derived from the time coordinate" in warning
+               for warning in md.missing_attributes["warnings"])
+
+
+@pytest.mark.py_mmd_tools
+def test_temporal_extent_from_coordinates_json(dataDir):
+    """Test that the temporal extent is not derived for json input, and
+    that the missing attribute is reported.
+    """
+    header = json_header(dataDir, "time_coverage_start")
+    header["variables"]["time"] = {"attrs": {"units": "hours since 2023-01-01 00:00:00"}}
+    assert extent.find_time_coordinate(nc_wrapper(header)) is None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(header, json_input=True, check_only=True)
+        with pytest.raises(AttributeError, match="time_coverage_start is a required"):
+            md.to_mmd(from_coordinates=True)
+
+
+@pytest.mark.py_mmd_tools
+def test_footprint(tmpdir):
+    """Test the footprint of a curved swath crossing the antimeridian,
+    simplified to a maximum number of vertices.
+    """
+    yy, xx = np.meshgrid(np.linspace(0., 1., 300), np.linspace(0., 1., 200), indexing="ij")
+    lat = 60. + 10.*yy + 2.*np.sin(np.pi*xx)
+    lon = (170. + 20.*xx + 180.) % 360. - 180.
+    lat = np.ma.masked_array(lat, mask=False)
+    lat[0, 0] = np.ma.masked
+    with swath(os.path.join(tmpdir, "swath.nc"), lat, lon) as ds:
+        polygon = extent.footprint(ds, max_vertices=12, edge_samples=50)
+        assert polygon["srsName"] == "EPSG:4326"
+        assert 4 <= len(polygon["pos"]) <= 13
+        assert polygon["pos"][0] == polygon["pos"][-1]
+        points = np.array([[float(vv) for vv in pos.split()] for pos in polygon["pos"]])
+        assert points[:, 0].min() >= 60. and points[:, 0].max() <= 72.
+        # Longitudes on both sides of the antimeridian, in (-180, 180]
+        assert ((points[:, 1] >= 170.) | (points[:, 1] <= -170.)).all()
+        assert points[:, 1].max() > 170. and points[:, 1].min() < -170.
+        assert len(extent.footprint(ds, max_vertices=1000)["pos"]) > 13
+
+    with swath(os.path.join(tmpdir, "masked.nc"), np.ma.masked_all((2, 2)),
+               np.zeros((2, 2))) as ds:
+        assert extent.footprint(ds) is None
+    with pytest.raises(ValueError):
+        extent.simplify(None, 2)
+
+
+@pytest.mark.py_mmd_tools
+@pytest.mark.parametrize("max_vertices", [3, 4, 5, 6])
+def test_simplify_bound(max_vertices):
+    """Test that the simplified polygon is valid, and has at most
+    max_vertices vertices, also when the fast simplification of a
+    concave polygon collapses it.
+    """
+    polygon = Polygon([(0, 0), (10, 0), (10, 1), (1, 1), (1, 2), (10, 2), (10, 3), (1, 3),
+                       (1, 4), (10, 4), (10, 5), (0, 5)])
+    simplified = extent.simplify(polygon, max_vertices)
+    assert simplified.geom_type == "Polygon"
+    assert simplified.is_valid
+    assert 3 <= len(simplified.exterior.coords) - 1 <= max_vertices
+
+
+@pytest.mark.py_mmd_tools
+def test_polygon_from_coordinates_json(dataDir):
+    """Test that no polygon is derived for json input."""
+    header = json_header(dataDir, "geospatial_bounds")
+    assert extent.footprint(nc_wrapper(header)) is None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(header, json_input=True, check_only=True)
+        req_ok, msg = md.to_mmd(from_coordinates=True)
+    assert req_ok
+    assert "polygon" not in md.metadata["geographic_extent"]
+
+
+@pytest.mark.py_mmd_tools
+def test_polygon_from_coordinates(dataDir, tmpdir):
+    """Test that the polygon is derived from the coordinates if
+    geospatial_bounds is missing.
+    """
+    test_in = os.path.join(tmpdir, "no_bounds.nc")
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"), test_in)
+    with Dataset(test_in, "a") as ds:
+        ds.delncattr("geospatial_bounds")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(test_in, check_only=True)
+        req_ok, msg = md.to_mmd(from_coordinates=True, max_polygon_vertices=4)
+    assert req_ok
+    assert md.metadata["geographic_extent"]["polygon"] == {
+        "srsName": "EPSG:4326",
+        "pos": ["38.2446 6.9443", "38.2446 6.8684", "38.2739 6.8686", "38.2741 6.9444",
+                "38.2446 6.9443"],
+    }
+    assert any("the polygon is derived from the coordinate variables" in warning
+               for warning in md.missing_attributes["warnings"])
@@ -0,0 +1,81 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+
+import pytest
+
+from py_mmd_tools.id_registry import DuplicateIdError
+from py_mmd_tools.id_registry import IdRegistry
+
+
+@pytest.mark.py_mmd_tools
+def test_register_in_memory():
+    """Test that all collisions are recorded, and that registering
+    the same file again is not a collision.
+    """
+    registry = IdRegistry()
+    assert registry.register("no.met:a", "/data/a.nc") is True
+    assert registry.register("no.met:a", "/data/a.nc") is True
+    assert registry.register("no.met:a", "/data/b.nc") is False
+    assert registry.register("no.met:a", "/data/c.nc") is False
+    assert registry.register("no.met:b", "/data/d.nc") is True
+    assert "no.met:a" in registry
+    assert "no.met:c" not in registry
+    assert len(registry) == 2
+    assert registry.collisions == [
+        ("no.met:a", "/data/b.nc", "/data/a.nc"),
+        ("no.met:a", "/data/c.nc", "/data/a.nc"),
+    ]
+    with pytest.raises(DuplicateIdError) as ve:
+        registry.check()
+    assert str(ve.value).startswith("Unique ID repetition")
+    assert "no.met:a in /data/c.nc (already found in /data/a.nc)" in str(ve.value)
+
+
+@pytest.mark.py_mmd_tools
+def test_check_without_collisions():
+    registry = IdRegistry()
+    registry.register("no.met:a", "/data/a.nc")
+    assert registry.check() is None
+
+
+@pytest.mark.py_mmd_tools
+def test_register_persistent(tmpdir):
+    """Test that IDs are detected across registries sharing a
+    database.
+    """
+    db = os.path.join(tmpdir, "ids.sqlite")
+    first = IdRegistry(db)
+    assert first.register("no.met:a", "/data/a.nc") is True
+    second = IdRegistry(db)
+    assert "no.met:a" in second
+    assert second.register("no.met:a", "/data/a.nc") is True
+    assert second.register("no.met:a", "/data/b.nc") is False
+    assert second.collisions == [("no.met:a", "/data/b.nc", "/data/a.nc")]
+    first.close()
+    second.close()
+    assert second.db is None
+
+
+@pytest.mark.py_mmd_tools
+def test_unregister(tmpdir):
+    """Test that an unregistered ID can be used by another file, also
+    in later runs, and that IDs of other files are kept.
+    """
+    db = os.path.join(tmpdir, "ids.sqlite")
+    registry = IdRegistry(db)
+    registry.register("no.met:a", "/data/a.nc")
+    registry.unregister("no.met:a", "/data/b.nc")
+    assert "no.met:a" in IdRegistry(db)
+    registry.unregister("no.met:a", "/data/a.nc")
+    assert "no.met:a" not in registry
+    assert IdRegistry(db).register("no.met:a", "/data/b.nc") is True
+    registry.close()
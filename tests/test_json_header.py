@@ -0,0 +1,143 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import copy
+import io
+import json
+import math
+import os
+import warnings
+
+import pytest
+
+from py_mmd_tools.json_header import load_header
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+
+
+@pytest.fixture
+def raw_header(dataDir):
+    with open(os.path.join(dataDir, "reference_nc_header.json"), "rb") as fh:
+        return fh.read()
+
+
+def expected(header, attributes=("standard_name",)):
+    """Return header with only the given variable attributes."""
+    header = copy.deepcopy(header)
+    for name, var in header["variables"].items():
+        header["variables"][name] = {
+            "attrs": {key: value for key, value in var["attrs"].items() if key in attributes}
+        }
+    return header
+
+
+@pytest.mark.py_mmd_tools
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+def test_load_header(raw_header, chunk_size):
+    """Test that the header is parsed correctly when it is read in
+    chunks that split the values, both in binary and text mode.
+    """
+    full = json.loads(raw_header)
+    for fp in [io.BytesIO(raw_header), io.StringIO(raw_header.decode())]:
+        header = load_header(fp, chunk_size=chunk_size)
+        assert header == expected(full)
+        assert header["file_size"] == full["file_size"]
+        assert set(header["variables"]) == set(full["variables"])
+        assert "dtype" not in header["variables"]["M01"]
+
+
+@pytest.mark.py_mmd_tools
+def test_load_header_values():
+    """Test numbers, NaN, escapes and multibyte characters split
+    between chunks, and the selection of the variable attributes.
+    """
+    header = {
+        "global_variables": {"title": "Snø og is – \"test\"", "a": 1.5e-3, "b": -12},
+        "variables": {
+            "tæmp": {
+                "attrs": {"standard_name": "air_temperature", "_FillValue": math.nan,
+                          "units": "K"},
+                "shape": [1, 2],
+            },
+            "empty": {"attrs": {}},
+        },
+        "file_size": 1234.5,
+    }
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    for chunk_size in range(1, 8):
+        result = load_header(io.BytesIO(raw), chunk_size=chunk_size,
+                             attributes=("standard_name", "units"))
+        assert result["global_variables"] == header["global_variables"]
+        assert result["file_size"] == 1234.5
+        assert result["variables"] == {
+            "tæmp": {"attrs": {"standard_name": "air_temperature", "units": "K"}},
+            "empty": {"attrs": {}},
+        }
+
+
+@pytest.mark.py_mmd_tools
+@pytest.mark.parametrize("raw", [b"", b"[1]", b'{"a" 1}', b'{"a": 1,}', b'{"a": 1} x',
+                                 b'{"variables": {"x": {"attrs": {}}'])
+def test_load_header_invalid(raw):
+    with pytest.raises(ValueError):
+        load_header(io.BytesIO(raw), chunk_size=2)
+
+
+@pytest.mark.py_mmd_tools
+def test_load_header_ijson(raw_header):
+    """Test that ijson gives the same header, for headers without NaN
+    values.
+    """
+    pytest.importorskip("ijson")
+    full = json.loads(raw_header)
+    for var in full["variables"].values():
+        var["attrs"].pop("_FillValue", None)
+    raw = json.dumps(full).encode()
+    assert load_header(io.BytesIO(raw), chunk_size=5, use_ijson=True) == expected(full)
+    assert load_header(io.BytesIO(raw), use_ijson=True) == load_header(io.BytesIO(raw))
+    with pytest.raises(ValueError):
+        load_header(io.BytesIO(b"[1]"), use_ijson=True)
+    with pytest.raises(ValueError):
+        load_header(io.BytesIO(raw[:-10]), use_ijson=True)
+    with pytest.raises(ValueError, match="variables must be an object"):
+        load_header(io.BytesIO(b'{"variables": [1, 2]}'), use_ijson=True)
+
+
+@pytest.mark.py_mmd_tools
+def test_load_header_large_value():
+    """Test that the reads grow geometrically while a large value is
+    incomplete, so that it is not decoded once per chunk.
+    """
+    title = "x" * 100000
+    raw = json.dumps({"global_variables": {"title": title}, "variables": {}}).encode()
+
+    class Counter(io.BytesIO):
+        reads = 0
+
+        def read(self, size=-1):
+            self.reads += 1
+            return super().read(size)
+
+    fp = Counter(raw)
+    header = load_header(fp, chunk_size=16)
+    assert header["global_variables"]["title"] == title
+    assert fp.reads < 20
+
+
+@pytest.mark.py_mmd_tools
+def test_translate_loaded_header(raw_header):
+    """Test that a streamed header is translated as the full header."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md_full = Nc_to_mmd(json.loads(raw_header), json_input=True, check_only=True)
+        md_full.to_mmd()
+        md = Nc_to_mmd(load_header(io.BytesIO(raw_header)), json_input=True, check_only=True)
+        md.to_mmd()
+    assert md.metadata == md_full.metadata
+    assert md.missing_attributes == md_full.missing_attributes
@@ -0,0 +1,100 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import time
+
+import pytest
+
+from py_mmd_tools.metrics import Histogram
+from py_mmd_tools.metrics import Metrics
+
+
+class FakeNcToMmd:
+    timings = {"translate": 0.2, "render": 0.02, "opendap_probe": 1.5}
+    bytes_hashed = 1024
+
+
+@pytest.mark.py_mmd_tools
+def test_histogram():
+    """Test that the histogram counts are cumulative."""
+    hist = Histogram((0.1, 1.))
+    hist.observe(0.05)
+    hist.observe(0.1)
+    hist.observe(0.5)
+    hist.observe(5.)
+    assert hist.cumulative_counts() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(5.65)
+
+
+@pytest.mark.py_mmd_tools
+def test_record_file():
+    """Test that file results are added to the statistics."""
+    metrics = Metrics(job="test")
+    metrics.record_file(FakeNcToMmd())
+    metrics.record_file(FakeNcToMmd(), error=AttributeError("missing attributes"))
+    metrics.record_file(None, error=ValueError("invalid input"))
+    assert metrics.files_processed == {"ok": 1, "failed": 2}
+    assert metrics.failures == {"AttributeError": 1, "ValueError": 1}
+    assert metrics.bytes_hashed == 2048
+    assert metrics.stage_durations["translate"].count == 2
+    assert "opendap_probe" not in metrics.stage_durations
+    assert metrics.opendap_probe_durations.count == 2
+
+
+@pytest.mark.py_mmd_tools
+def test_render():
+    """Test the OpenMetrics text output."""
+    metrics = Metrics(job="test")
+    metrics.record_file(FakeNcToMmd())
+    metrics.record_file(None, error=AttributeError("missing attributes"))
+    text = metrics.render()
+    lines = text.splitlines()
+    assert lines[-1] == "# EOF"
+    assert "# TYPE py_mmd_tools_files_processed counter" in lines
+    assert 'py_mmd_tools_files_processed_total{job="test",status="ok"} 1' in lines
+    assert 'py_mmd_tools_files_processed_total{job="test",status="failed"} 1' in lines
+    assert ('py_mmd_tools_failures_total{error_type="AttributeError",job="test"} 1'
+            in lines)
+    assert 'py_mmd_tools_hashed_bytes_total{job="test"} 1024' in lines
+    assert ('py_mmd_tools_stage_duration_seconds_bucket{job="test",le="0.25",'
+            'stage="translate"} 1' in lines)
+    assert ('py_mmd_tools_opendap_probe_duration_seconds_bucket{job="test",le="1.0"} 0'
+            in lines)
+    assert 'py_mmd_tools_opendap_probe_duration_seconds_count{job="test"} 1' in lines
+
+
+@pytest.mark.py_mmd_tools
+def test_write(tmpdir):
+    """Test writing to a file and to a textfile collector
+    directory.
+    """
+    metrics = Metrics(job="test")
+    fn = os.path.join(tmpdir, "metrics.prom")
+    assert metrics.write(fn) == fn
+    with open(fn) as fh:
+        assert fh.read() == metrics.render()
+    assert metrics.write(str(tmpdir)) == os.path.join(tmpdir, "test.prom")
+    # No temporary files should be left behind
+    assert sorted(os.listdir(tmpdir)) == ["metrics.prom", "test.prom"]
+
+
+@pytest.mark.py_mmd_tools
+def test_write_if_due(tmpdir):
+    """Test that periodic writes respect the interval."""
+    metrics = Metrics(job="test")
+    fn = os.path.join(tmpdir, "metrics.prom")
+    assert metrics.write_if_due(fn, 60) is False
+    assert not os.path.isfile(fn)
+    metrics.start_time = time.time() - 61
+    assert metrics.write_if_due(fn, 60) is True
+    assert os.path.isfile(fn)
+    assert metrics.write_if_due(fn, 60) is False
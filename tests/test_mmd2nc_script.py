@@ -0,0 +1,107 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import shutil
+import tempfile
+
+import netCDF4 as nc
+import pytest
+
+from py_mmd_tools.script.mmd2nc import create_parser
+from py_mmd_tools.script.mmd2nc import main
+from py_mmd_tools.script.mmd2nc import read_manifest
+
+
+@pytest.mark.script
+def test_read_manifest():
+    """Test reading a manifest, and that invalid lines are reported."""
+    tmp_dir = tempfile.mkdtemp()
+    manifest = os.path.join(tmp_dir, "manifest.txt")
+    with open(manifest, "w") as fh:
+        fh.write("# MMD file, netCDF file\n\na.xml a.nc\nb.xml\tb.nc\n"
+                 "my data/c.xml\tmy data/c.nc\n")
+    assert read_manifest(manifest) == [("a.xml", "a.nc"), ("b.xml", "b.nc"),
+                                       ("my data/c.xml", "my data/c.nc")]
+    with open(manifest, "a") as fh:
+        fh.write("c.xml\n")
+    with pytest.raises(ValueError) as ve:
+        read_manifest(manifest)
+    assert str(ve.value) == "Invalid manifest line 6: c.xml"
+    shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.script
+def test_main(dataDir, capsys):
+    """Test updating netCDF files listed in a manifest."""
+    tmp_dir = tempfile.mkdtemp()
+    mmd = os.path.join(dataDir, "reference_nc.xml")
+    manifest = os.path.join(tmp_dir, "manifest.txt")
+    with open(manifest, "w") as fh:
+        for fn in ["a.nc", "b.nc"]:
+            shutil.copy(os.path.join(dataDir, "nc_to_update.nc"), os.path.join(tmp_dir, fn))
+            fh.write("%s %s\n" % (mmd, os.path.join(tmp_dir, fn)))
+        fh.write("%s %s\n" % (mmd, os.path.join(tmp_dir, "missing.nc")))
+    results = main(create_parser().parse_args(["-m", manifest, "-j", "2"]))
+    assert [error is None for _, _, error, _ in results] == [True, True, False]
+    out = capsys.readouterr().out
+    assert "OK - %s updated" % os.path.join(tmp_dir, "a.nc") in out
+    assert "FAILED - %s could not be updated" % os.path.join(tmp_dir, "missing.nc") in out
+    assert not os.path.exists(os.path.join(tmp_dir, "missing.nc"))
+    with nc.Dataset(os.path.join(tmp_dir, "b.nc")) as f:
+        assert f.getncattr("id") == "b7cb7934-77ca-4439-812e-f560df3fe7eb"
+    shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.script
+def test_single_pair(dataDir):
+    """Test updating a single netCDF file, and that input is
+    required.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    tested = os.path.join(tmp_dir, "a.nc")
+    shutil.copy(os.path.join(dataDir, "nc_to_update.nc"), tested)
+    results = main(create_parser().parse_args([
+        "-i", os.path.join(dataDir, "reference_nc.xml"), "-n", tested, "-j", "1"]))
+    assert results[0][:3] == (os.path.join(dataDir, "reference_nc.xml"), tested, None)
+    assert results[0][3]["id"] == "b7cb7934-77ca-4439-812e-f560df3fe7eb"
+    with pytest.raises(ValueError):
+        main(create_parser().parse_args(["-i", os.path.join(dataDir, "reference_nc.xml")]))
+    shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.script
+def test_dry_run_and_overwrite(dataDir, capsys):
+    """Test reporting and applying the difference between the MMD file
+    and the netCDF file.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    tested = os.path.join(tmp_dir, "a.nc")
+    shutil.copy(os.path.join(dataDir, "nc_to_update.nc"), tested)
+    with nc.Dataset(tested, "a") as f:
+        f.id = "my other id"
+    mtime = os.stat(tested).st_mtime_ns
+    args = ["-i", os.path.join(dataDir, "reference_nc.xml"), "-n", tested, "-j", "1"]
+    results = main(create_parser().parse_args(args + ["--dry-run"]))
+    assert results[0][3]["id"] == ("my other id", "b7cb7934-77ca-4439-812e-f560df3fe7eb")
+    assert os.stat(tested).st_mtime_ns == mtime
+    assert "\tid: 'my other id' -> 'b7cb7934-77ca-4439-812e-f560df3fe7eb'" in (
+        capsys.readouterr().out)
+    results = main(create_parser().parse_args(args + ["--overwrite"]))
+    assert results[0][2] is None
+    with nc.Dataset(tested) as f:
+        assert f.getncattr("id") == "b7cb7934-77ca-4439-812e-f560df3fe7eb"
+    capsys.readouterr()
+    mtime = os.stat(tested).st_mtime_ns
+    results = main(create_parser().parse_args(args + ["--overwrite"]))
+    assert results[0][3] == {}
+    assert os.stat(tested).st_mtime_ns == mtime
+    assert "UNCHANGED - %s is up to date" % tested in capsys.readouterr().out
+    shutil.rmtree(tmp_dir)
@@ -0,0 +1,176 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import functools
+import multiprocessing
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+import lxml.etree as ET
+import pytest
+
+from concurrent.futures import ProcessPoolExecutor
+
+from py_mmd_tools.script.mmd_migrate import create_parser
+from py_mmd_tools.script.mmd_migrate import main
+from py_mmd_tools.script.mmd_migrate import read_documents
+
+
+@pytest.fixture
+def migrationArgs(dataDir):
+    def args(input, output_dir, *extra):
+        return create_parser().parse_args([
+            "-i", input, "-o", output_dir,
+            "--xsl", os.path.join(dataDir, "mmdv2-to-mmdv3.xsl"),
+        ] + list(extra))
+    return args
+
+
+def without_datetimes(output):
+    """Remove the datetimes, since the stylesheet adds the time of the
+    migration.
+    """
+    return re.sub(rb"<mmd:datetime>[^<]*</mmd:datetime>", b"", output)
+
+
+def expected_output(dataDir):
+    xslt = ET.XSLT(ET.parse(os.path.join(dataDir, "mmdv2-to-mmdv3.xsl")))
+    return without_datetimes(bytes(xslt(ET.parse(os.path.join(dataDir, "reference_mmd.xml")))))
+
+
+@pytest.mark.script
+def test_read_documents(dataDir):
+    """Test reading documents from folders and archives."""
+    tmp_dir = tempfile.mkdtemp()
+    ref = os.path.join(dataDir, "reference_mmd.xml")
+    with open(ref, "rb") as fh:
+        content = fh.read()
+    assert list(read_documents(ref)) == [("reference_mmd.xml", content)]
+    with tarfile.open(os.path.join(tmp_dir, "mmd.tar.gz"), "w:gz") as tar:
+        tar.add(ref, arcname="mmd/a.xml")
+        tar.add(os.path.join(dataDir, "reference_iso.xml"), arcname="mmd/b.xml")
+    with zipfile.ZipFile(os.path.join(tmp_dir, "mmd.zip"), "w") as zf:
+        zf.write(ref, arcname="a.xml")
+        zf.writestr("README", "not an MMD file")
+    assert [name for name, _ in read_documents(os.path.join(tmp_dir, "mmd.tar.gz"))] == [
+        "mmd/a.xml", "mmd/b.xml"]
+    assert list(read_documents(os.path.join(tmp_dir, "mmd.zip"))) == [("a.xml", content)]
+    with pytest.raises(ValueError):
+        list(read_documents(os.path.join(tmp_dir, "missing")))
+    shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.script
+def test_migrate_folder(dataDir, migrationArgs, capsys, monkeypatch):
+    """Test migrating a folder in a process pool, and that invalid
+    documents are reported.
+    """
+    in_dir = tempfile.mkdtemp()
+    out_dir = tempfile.mkdtemp()
+    for fn in ["reference_mmd.xml", "not_a_valid_xml.xml"]:
+        shutil.copy(os.path.join(dataDir, fn), in_dir)
+    for i in range(3):
+        shutil.copy(os.path.join(dataDir, "reference_mmd.xml"),
+                    os.path.join(in_dir, "copy%d.xml" % i))
+    # Spawned workers do not inherit the state of the test process
+    spawn = multiprocessing.get_context("spawn")
+    monkeypatch.setattr("py_mmd_tools.script.mmd_migrate.ProcessPoolExecutor",
+                        functools.partial(ProcessPoolExecutor, mp_context=spawn))
+    migrated, failed = main(migrationArgs(in_dir, out_dir, "-j", "2"))
+    assert (migrated, failed) == (4, 1)
+    assert "Could not migrate not_a_valid_xml.xml" in capsys.readouterr().out
+    assert sorted(os.listdir(out_dir)) == ["copy0.xml", "copy1.xml", "copy2.xml",
+                                           "reference_mmd.xml"]
+    with open(os.path.join(out_dir, "copy1.xml"), "rb") as fh:
+        assert without_datetimes(fh.read()) == expected_output(dataDir)
+    shutil.rmtree(in_dir)
+    shutil.rmtree(out_dir)
+
+
+@pytest.mark.script
+def test_migrate_archive_with_xsd(dataDir, migrationArgs, capsys):
+    """Test migrating an archive in the current process, with
+    validation of the migrated documents.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    archive = os.path.join(tmp_dir, "mmd.tar")
+    with tarfile.open(archive, "w") as tar:
+        tar.add(os.path.join(dataDir, "reference_mmd.xml"), arcname="mmd/a.xml")
+    xsd = os.path.join(tmp_dir, "mmd_title.xsd")
+    with open(xsd, "w") as fh:
+        fh.write(
+            '<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" '
+            'targetNamespace="http://www.met.no/schema/mmd" elementFormDefault="qualified">'
+            '<xs:element name="title" type="xs:string"/></xs:schema>'
+        )
+    out_dir = os.path.join(tmp_dir, "out")
+    assert main(migrationArgs(archive, out_dir, "-j", "1", "--xsd", xsd)) == (0, 1)
+    assert "Could not migrate mmd/a.xml" in capsys.readouterr().out
+    assert os.listdir(out_dir) == []
+    assert main(migrationArgs(archive, out_dir, "-j", "1")) == (1, 0)
+    assert os.listdir(out_dir) == ["mmd"]
+    assert os.listdir(os.path.join(out_dir, "mmd")) == ["a.xml"]
+    shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.script
+def test_migrate_archive_paths(dataDir, migrationArgs):
+    """Test that archive members with the same base name are kept
+    apart, and that members are not written outside the output
+    directory.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    archive = os.path.join(tmp_dir, "mmd.zip")
+    ref = os.path.join(dataDir, "reference_mmd.xml")
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name in ["a/mmd.xml", "b/mmd.xml", "../mmd.xml", "/abs/mmd.xml"]:
+            zf.write(ref, arcname=name)
+    out_dir = os.path.join(tmp_dir, "out")
+    assert main(migrationArgs(archive, out_dir, "-j", "1")) == (4, 0)
+    found = sorted(
+        os.path.relpath(os.path.join(root, fn), out_dir)
+        for root, dirs, files in os.walk(out_dir) for fn in files
+    )
+    assert found == ["a/mmd.xml", "abs/mmd.xml", "b/mmd.xml", "mmd.xml"]
+    assert not os.path.isfile(os.path.join(tmp_dir, "mmd.xml"))
+    shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.script
+def test_migrate_text_output(dataDir, migrationArgs, tmpdir, capsys):
+    """Test that a transformation result without a root element is
+    reported.
+    """
+    xsl = os.path.join(tmpdir, "text.xsl")
+    with open(xsl, "w") as fh:
+        fh.write(
+            '<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">'
+            '<xsl:output method="text"/><xsl:template match="/">text</xsl:template>'
+            '</xsl:stylesheet>'
+        )
+    out_dir = os.path.join(tmpdir, "out")
+    args = migrationArgs(os.path.join(dataDir, "reference_mmd.xml"), out_dir, "-j", "1")
+    args.xsl = xsl
+    assert main(args) == (0, 1)
+    assert "not an XML document" in capsys.readouterr().out
+
+
+@pytest.mark.script
+def test_invalid_stylesheet(migrationArgs, dataDir, tmpdir):
+    """Test that a missing stylesheet is reported."""
+    args = migrationArgs(dataDir, str(tmpdir))
+    args.xsl = "missing.xsl"
+    with pytest.raises(ValueError) as ve:
+        main(args)
+    assert str(ve.value) == "Invalid XSLT stylesheet: missing.xsl"
@@ -8,15 +8,22 @@ py-mmd-tools is licensed under the Apache License 2.0
 <https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
 """
 
+import io
 import tempfile
+import contextlib
 import warnings
 import unittest
 import shutil
 import pathlib
 
 import netCDF4 as nc
+import numpy as np
 import lxml.etree as ET
 from py_mmd_tools.mmd_to_nc import Mmd_to_nc
+from py_mmd_tools.mmd_to_nc import iter_acdd
+from py_mmd_tools.mmd_to_nc import mmd_to_acdd
+from py_mmd_tools.mmd_to_nc import load_mmd_yaml
+from py_mmd_tools.mmd_to_nc import update_nc_files
 
 warnings.simplefilter("ignore", ResourceWarning)
 
@@ -322,6 +329,24 @@ class TestMMD2NC(unittest.TestCase):
         # Add new dictionary with key already in acdd_metadata - but no separator given
         self.assertRaises(TypeError, lambda: md.update_acdd(dict2))
 
+    def test_update_acdd_many(self):
+        """
+        Test updating of acdd dictionary - many values for the same key, and that a
+        separator must be given for repeated keys
+        """
+        md = Mmd_to_nc(self.reference_xml, self.orig_nc)
+        for i in range(1000):
+            md.update_acdd({'keywords': 'GCMDSK:keyword %d' % i}, {'keywords': ','})
+        self.assertEqual(md.acdd_metadata['keywords'],
+                         ','.join('GCMDSK:keyword %d' % i for i in range(1000)))
+        self.assertRaises(TypeError, lambda: md.update_acdd({'keywords': 'x'},
+                                                            {'keywords': [',']}))
+        md.acdd_metadata = {'id': '12345'}
+        md.update_acdd({'id': '54321'}, {'id': ';'})
+        self.assertEqual(md.acdd_metadata, {'id': '12345;54321'})
+        md.acdd_metadata = None
+        self.assertIsNone(md.acdd_metadata)
+
     def test_get_acdd(self):
         """
         Test function get_acdd, ie get an acdd translation.
@@ -434,3 +459,175 @@ class TestMMD2NC(unittest.TestCase):
             'mmd:metadata_identifier', md.namespaces)
         self.assertRaises(ValueError, lambda: md.process_element(element_to_translate,
                                                                  md.mmd_yaml))
+
+    def test_shared_mmd_yaml(self):
+        """ Test that mmd_elements.yaml is only parsed once, and that a
+        custom translation can be provided.
+        """
+        md1 = Mmd_to_nc(self.reference_xml, self.orig_nc)
+        md2 = Mmd_to_nc(self.reference_xml, self.orig_nc)
+        self.assertIs(md1.mmd_yaml, md2.mmd_yaml)
+        self.assertIs(md1.mmd_yaml, load_mmd_yaml())
+        mmd_yaml = {'metadata_identifier': md1.mmd_yaml['metadata_identifier']}
+        md3 = Mmd_to_nc(self.reference_xml, self.orig_nc, mmd_yaml=mmd_yaml)
+        self.assertIs(md3.mmd_yaml, mmd_yaml)
+
+    def test_update_nc_files(self):
+        """ Test updating several NC files, in a process pool and in the
+        current process, with per-file results.
+        """
+        for processes in [2, 1]:
+            tmp_dir = tempfile.mkdtemp()
+            tested = []
+            for i in range(3):
+                tested.append(str(pathlib.Path(tmp_dir) / ('nc_%d.nc' % i)))
+                shutil.copy(self.orig_nc, tested[-1])
+            # The id attribute is already defined in the last file
+            with nc.Dataset(tested[-1], 'a') as f:
+                f.id = 'my other id'
+            results = update_nc_files([(self.reference_xml, fn) for fn in tested],
+                                      processes=processes)
+            self.assertEqual([result[1] for result in results], tested)
+            self.assertEqual([result[2] for result in results[:2]], [None, None])
+            self.assertEqual(results[2][2], 'Exception: id is already a global attribute')
+            with nc.Dataset(tested[0], 'r') as f:
+                self.assertEqual(f.getncattr('naming_authority'), 'no.met')
+            shutil.rmtree(tmp_dir)
+        self.assertEqual(update_nc_files([]), [])
+
+    def test_to_acdd(self):
+        """ Test that the ACDD translation does not depend on the order
+        of different MMD elements, and that comments and elements from
+        other namespaces are ignored.
+        """
+        acdd = Mmd_to_nc(self.reference_xml, self.orig_nc).to_acdd()
+        self.assertEqual(acdd['institution'], 'Norwegian Meteorological Institute (MET Norway)')
+        tree = ET.parse(self.reference_xml)
+        root = tree.getroot()
+        # Sort the elements by name, keeping the order of repeated elements
+        root[:] = sorted(root, key=lambda element: ET.QName(element).localname, reverse=True)
+        root.insert(0, ET.Comment('reversed'))
+        ET.SubElement(root, '{http://www.example.com/schema}keywords').text = 'ignored'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            modified_xml = str(pathlib.Path(tmp_dir) / 'reversed.xml')
+            tree.write(modified_xml)
+            self.assertEqual(Mmd_to_nc(modified_xml, self.orig_nc).to_acdd(), acdd)
+
+    def test_diff_nc(self):
+        """ Test that the difference between the MMD file and the NC
+        file is computed without modifying the NC file, and that only
+        changed attributes are written with overwrite.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tested = str(pathlib.Path(tmp_dir) / 'tested.nc')
+            shutil.copy(self.orig_nc, tested)
+            with nc.Dataset(tested, 'a') as f:
+                f.id = 'my other id'
+                conventions = f.Conventions
+            md = Mmd_to_nc(self.reference_xml, tested)
+            delta = md.diff_nc()
+            self.assertEqual(delta['id'], ('my other id', 'b7cb7934-77ca-4439-812e-f560df3fe7eb'))
+            self.assertEqual(delta['naming_authority'], (None, 'no.met'))
+            self.assertEqual(delta['Conventions'], (conventions, conventions + ', ACDD-1.3'))
+            with nc.Dataset(tested, 'r') as f:
+                self.assertNotIn('naming_authority', f.ncattrs())
+            # Calling diff_nc again gives the same result
+            self.assertEqual(md.diff_nc(), delta)
+            written = md.update_nc(overwrite=True)
+            self.assertEqual(written, {key: new for key, (old, new) in delta.items()})
+            self.assertEqual(md.diff_nc(), {})
+            self.assertEqual(md.update_nc(overwrite=True), {})
+            with nc.Dataset(tested, 'r') as f:
+                self.assertEqual(f.getncattr('id'), 'b7cb7934-77ca-4439-812e-f560df3fe7eb')
+                self.assertEqual(f.Conventions, conventions + ', ACDD-1.3')
+
+    def test_diff_nc_numeric(self):
+        """ Test that numeric attributes are compared numerically, and
+        keep their type when they are overwritten.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tested = str(pathlib.Path(tmp_dir) / 'reference_nc.nc')
+            shutil.copy(str(pathlib.Path.cwd() / 'tests' / 'data' / 'reference_nc.nc'), tested)
+            md = Mmd_to_nc(self.reference_xml, tested, verbose=False)
+            delta = md.diff_nc()
+            for key in ['geospatial_lat_min', 'geospatial_lat_max', 'geospatial_lon_min',
+                        'geospatial_lon_max', 'Conventions']:
+                self.assertNotIn(key, delta)
+            with nc.Dataset(tested, 'a') as f:
+                lat_max = f.geospatial_lat_max
+                f.geospatial_lat_max = np.float64(80.)
+            delta = md.diff_nc()
+            self.assertEqual(delta['geospatial_lat_max'][0], 80.)
+            self.assertIsInstance(delta['geospatial_lat_max'][1], np.float64)
+            md.update_nc(overwrite=True)
+            self.assertEqual(md.diff_nc(), {})
+            with nc.Dataset(tested, 'r') as f:
+                self.assertIsInstance(f.geospatial_lat_max, np.float64)
+                self.assertEqual(f.geospatial_lat_max, lat_max)
+                self.assertIsInstance(f.geospatial_lon_min, np.float64)
+
+    def test_update_nc_conventions(self):
+        """ Test that update_nc adds the ACDD version to Conventions
+        only once, and also if the NC file has no Conventions.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for conventions in [None, 'CF-1.8, ACDD-1.3']:
+                tested = str(pathlib.Path(tmp_dir) / 'nc_to_update.nc')
+                shutil.copy(self.orig_nc, tested)
+                with nc.Dataset(tested, 'a') as f:
+                    if conventions is None:
+                        f.delncattr('Conventions')
+                    else:
+                        f.Conventions = conventions
+                Mmd_to_nc(self.reference_xml, tested).update_nc()
+                with nc.Dataset(tested, 'r') as f:
+                    self.assertEqual(f.Conventions, conventions or 'ACDD-1.3')
+
+    def test_conventions(self):
+        """ Test that the ACDD version is only added once to the
+        Conventions attribute.
+        """
+        md = Mmd_to_nc(self.reference_xml, self.orig_nc)
+        self.assertEqual(md.conventions(None), 'ACDD-1.3')
+        self.assertEqual(md.conventions('CF-1.8'), 'CF-1.8, ACDD-1.3')
+        self.assertEqual(md.conventions('CF-1.8, ACDD-1.3'), 'CF-1.8, ACDD-1.3')
+
+    def test_iter_acdd(self):
+        """ Test translating the records of a collection file, and that
+        Mmd_to_nc accepts element trees and elements.
+        """
+        acdd = Mmd_to_nc(self.reference_xml, self.orig_nc).to_acdd()
+        self.assertEqual(Mmd_to_nc(ET.parse(self.reference_xml), None).to_acdd(), acdd)
+        self.assertEqual(Mmd_to_nc(ET.parse(self.reference_xml).getroot(), None).to_acdd(), acdd)
+        collection = ET.Element('collection')
+        for i in range(3):
+            collection.append(ET.parse(self.reference_xml).getroot())
+        fn = tempfile.mkstemp()[1]
+        ET.ElementTree(collection).write(fn)
+        self.assertEqual(list(iter_acdd(fn)), [acdd]*3)
+
+    def test_mmd_to_acdd(self):
+        """ Test the translation of MMD records to ACDD without files,
+        and without printing.
+        """
+        acdd = Mmd_to_nc(self.reference_xml, self.orig_nc).to_acdd()
+        with open(self.reference_xml, 'rb') as fh:
+            content = fh.read()
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(mmd_to_acdd(content), acdd)
+            self.assertEqual(mmd_to_acdd(ET.fromstring(content)), acdd)
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertEqual(mmd_to_acdd(b'<mmd:mmd xmlns:mmd="http://www.met.no/schema/mmd"/>'), {})
+
+    def test_process_element_repeated(self):
+        """ Test that repeated MMD elements are joined with the
+        separator from mmd_elements.yaml.
+        """
+        md = Mmd_to_nc(self.reference_xml, self.orig_nc)
+        MMD = "{%s}" % self.namespaces['mmd']
+        for resource in ['https://a.met.no', 'https://b.met.no']:
+            element = ET.Element(MMD + 'related_information', nsmap=self.namespaces)
+            ET.SubElement(element, MMD + 'resource').text = resource
+            md.process_children(element)
+        self.assertEqual(md.acdd_metadata['references'], 'https://a.met.no,https://b.met.no')
@@ -0,0 +1,137 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import gzip
+import stat
+import tarfile
+import zipfile
+
+import pytest
+
+from unittest.mock import patch
+
+from py_mmd_tools.mmd_writer import ArchiveWriter
+from py_mmd_tools.mmd_writer import FileWriter
+from py_mmd_tools.mmd_writer import remove_stale_files
+from py_mmd_tools.mmd_writer import write_atomic
+
+
+@pytest.mark.py_mmd_tools
+def test_write_atomic(tmpdir):
+    """Test that the file is written, with normal permissions, and no
+    temporary files left behind.
+    """
+    fn = os.path.join(tmpdir, "test.xml")
+    for fsync in [False, True]:
+        assert write_atomic(fn, "<mmd:mmd/>", fsync=fsync) == fn
+        with open(fn) as fh:
+            assert fh.read() == "<mmd:mmd/>"
+    mode = stat.S_IMODE(os.stat(fn).st_mode)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert mode == 0o666 & ~umask
+    assert os.listdir(tmpdir) == ["test.xml"]
+
+
+@pytest.mark.py_mmd_tools
+def test_write_atomic_keeps_umask(tmpdir):
+    """Test that the process umask is never changed, since that would
+    affect files created by other threads.
+    """
+    with patch("os.umask") as umask:
+        write_atomic(os.path.join(tmpdir, "test.xml"), "<mmd:mmd/>")
+        FileWriter().write(os.path.join(tmpdir, "a.xml"), "a")
+    umask.assert_not_called()
+
+
+@pytest.mark.py_mmd_tools
+def test_remove_stale_files(tmpdir):
+    """Test that only the temporary files of an interrupted run are
+    removed.
+    """
+    writer = FileWriter(batch_size=10)
+    writer.write(os.path.join(tmpdir, "a.xml"), "a")
+    with open(os.path.join(tmpdir, "b.xml"), "w") as fh:
+        fh.write("b")
+    with open(os.path.join(tmpdir, ".hidden"), "w") as fh:
+        fh.write("c")
+    (tmp, path), = writer.pending
+    assert remove_stale_files(tmpdir) == [tmp]
+    assert sorted(os.listdir(tmpdir)) == [".hidden", "b.xml"]
+
+
+@pytest.mark.py_mmd_tools
+def test_file_writer_batches(tmpdir):
+    """Test that files get their final names in batches."""
+    writer = FileWriter(batch_size=2)
+    fn1 = os.path.join(tmpdir, "a.xml")
+    fn2 = os.path.join(tmpdir, "b.xml")
+    assert writer.write(fn1, "a") == fn1
+    assert not os.path.isfile(fn1)
+    writer.write(fn2, b"b")
+    assert os.path.isfile(fn1)
+    with open(fn2) as fh:
+        assert fh.read() == "b"
+    with writer:
+        writer.write(os.path.join(tmpdir, "c.xml"), "c")
+    assert sorted(os.listdir(tmpdir)) == ["a.xml", "b.xml", "c.xml"]
+
+
+@pytest.mark.py_mmd_tools
+def test_file_writer_compress_no_fsync(tmpdir):
+    """Test gzip compression, and immediate renames without fsync."""
+    writer = FileWriter(compress=True, fsync=False)
+    fn = writer.write(os.path.join(tmpdir, "a.xml"), "<mmd:mmd/>")
+    assert fn == os.path.join(tmpdir, "a.xml.gz")
+    with gzip.open(fn, "rt") as fh:
+        assert fh.read() == "<mmd:mmd/>"
+    assert writer.pending == []
+
+
+@pytest.mark.py_mmd_tools
+def test_archive_writer_tar(tmpdir):
+    """Test that documents are bundled in numbered tar archives."""
+    base = os.path.join(tmpdir, "mmd.tar.gz")
+    with ArchiveWriter(base, batch_size=2) as writer:
+        for name in ["a", "b", "c"]:
+            loc = writer.write(os.path.join("/some/dir", name + ".xml"), name)
+    assert loc == os.path.join(tmpdir, "mmd.00002.tar.gz") + ":c.xml"
+    with tarfile.open(os.path.join(tmpdir, "mmd.00001.tar.gz")) as tar:
+        assert tar.getnames() == ["a.xml", "b.xml"]
+        assert tar.extractfile("b.xml").read() == b"b"
+    with tarfile.open(os.path.join(tmpdir, "mmd.00002.tar.gz")) as tar:
+        assert tar.getnames() == ["c.xml"]
+
+    # A new writer continues the numbering
+    with ArchiveWriter(base) as writer:
+        loc = writer.write("d.xml", "d")
+    assert loc == os.path.join(tmpdir, "mmd.00003.tar.gz") + ":d.xml"
+    assert len(os.listdir(tmpdir)) == 3
+
+
+@pytest.mark.py_mmd_tools
+def test_archive_writer_zip(tmpdir):
+    base = os.path.join(tmpdir, "mmd.zip")
+    writer = ArchiveWriter(base)
+    writer.write("a.xml", "<mmd:mmd/>")
+    assert not os.path.isfile(os.path.join(tmpdir, "mmd.00001.zip"))
+    writer.close()
+    with zipfile.ZipFile(os.path.join(tmpdir, "mmd.00001.zip")) as zf:
+        assert zf.read("a.xml") == b"<mmd:mmd/>"
+    # Closing again does nothing
+    writer.close()
+
+
+@pytest.mark.py_mmd_tools
+def test_archive_writer_invalid_suffix(tmpdir):
+    with pytest.raises(ValueError) as ve:
+        ArchiveWriter(os.path.join(tmpdir, "mmd.rar"))
+    assert "Archive name must end with" in str(ve.value)
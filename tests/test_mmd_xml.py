@@ -0,0 +1,370 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import copy
+
+from concurrent.futures import ThreadPoolExecutor
+
+import jinja2
+import pytest
+
+import lxml.etree as ET
+
+from py_mmd_tools import mmd_xml
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+
+from tests.test_nc2mmd_script import patchedDataset
+
+FULL_METADATA = {
+    "metadata_identifier": "no.met:b7cb7934-77ca-4439-812e-f560df3fe7eb",
+    "alternate_identifier": [{"alternate_identifier": "https://doi.org/10.21343/xyz",
+                              "alternate_identifier_type": "doi"}],
+    "title": [{"title": "Test & title", "lang": "en"}],
+    "abstract": [{"abstract": "Abstract <with> markup", "lang": "en"}],
+    "metadata_status": "Active",
+    "dataset_production_status": "Complete",
+    "collection": ["METNCS", "ADC"],
+    "last_metadata_update": {"update": [{"datetime": "2021-05-06T08:00:00Z",
+                                         "type": "Created", "note": "First version"}]},
+    "temporal_extent": [{"start_date": "2021-01-01T00:00:00Z"},
+                        {"start_date": "2021-02-01T00:00:00Z",
+                         "end_date": "2021-03-01T00:00:00Z"}],
+    "iso_topic_category": ["climatologyMeteorologyAtmosphere"],
+    "keywords": [{"vocabulary": "GCMDSK", "keyword": ["Earth Science > Atmosphere"],
+                  "resource": "https://gcmd.earthdata.nasa.gov/kms/concepts/concept_scheme/"
+                              "sciencekeywords"}],
+    "geographic_extent": {
+        "rectangle": {"srsName": "EPSG:4326", "north": 90., "south": 70, "east": "180",
+                      "west": "-180"},
+        "polygon": {"srsName": "EPSG:4326", "pos": ["70.0000 -180.0000", "90.0000 180.0000"]},
+    },
+    "dataset_language": "en",
+    "operational_status": "Operational",
+    "access_constraint": "Open",
+    "use_constraint": {"identifier": "CC-BY-4.0",
+                       "resource": "http://spdx.org/licenses/CC-BY-4.0"},
+    "personnel": [{"role": "Investigator", "name": "Jane Doe", "email": "jane@met.no",
+                   "phone": "+47 22963000", "organisation": "MET Norway",
+                   "contact_address": {"address": "Henrik Mohns plass 1", "city": "Oslo",
+                                       "province_or_state": "Oslo", "postal_code": "0371",
+                                       "country": "Norway"}}],
+    "data_center": [{"data_center_name": {"long_name": "Norwegian Meteorological Institute",
+                                          "short_name": "MET Norway"},
+                     "data_center_url": "https://met.no"}],
+    "quality_control": "Basic quality control",
+    "data_access": [{"type": "OGC WMS", "description": "WMS",
+                     "resource": "https://thredds.met.no/thredds/wms/x.nc",
+                     "wms_layers": ["air_temperature"]}],
+    "related_dataset": [{"id": "no.met:parent", "relation_type": "parent"}],
+    "storage_information": {"file_name": "x.nc", "file_location": "/data",
+                            "file_format": "NetCDF-CF", "file_size": "1.00",
+                            "file_size_unit": "MB", "checksum": "abc",
+                            "checksum_type": "md5sum"},
+    "related_information": [{"type": "Dataset landing page", "description": "",
+                             "resource": "https://data.met.no/dataset/x"}],
+    "project": [{"long_name": "Nansen Legacy"}, {"long_name": "ABC", "short_name": "A"}],
+    "platform": [{"short_name": "Sentinel-1A", "resource": "https://vocab.met.no/x",
+                  "orbit_direction": "ascending",
+                  "instrument": {"short_name": "SAR-C", "long_name": "Synthetic Aperture Radar",
+                                 "mode": "EW"},
+                  "ancillary": {"timeliness": "NRT"}}],
+    "spatial_representation": "grid",
+    "activity_type": ["Space Borne Instrument"],
+    "dataset_citation": [{"author": "Jane Doe", "publication_date": "2021-05-06T08:00:00Z",
+                          "title": "Test", "url": "https://data.met.no/dataset/x"}],
+}
+
+
+def render_template(data):
+    """Render the MMD Jinja template in the same way as
+    Nc_to_mmd.to_mmd.
+    """
+    env = jinja2.Environment(
+        loader=jinja2.PackageLoader("py_mmd_tools", "templates"),
+        autoescape=jinja2.select_autoescape(["html", "xml"]),
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    return env.get_template("mmd_template.xml").render(data=data)
+
+
+def canonical(root):
+    """Return the canonical form of an element tree, ignoring
+    whitespace between elements.
+    """
+    parser = ET.XMLParser(remove_blank_text=True)
+    return ET.tostring(ET.fromstring(ET.tostring(root), parser), method="c14n")
+
+
+@pytest.mark.py_mmd_tools
+def test_metadata_to_tree_same_as_template():
+    """Test that the tree has the same content as the rendered
+    template, with all optional elements present.
+    """
+    root = mmd_xml.metadata_to_tree(copy.deepcopy(FULL_METADATA))
+    expected = ET.fromstring(render_template(FULL_METADATA))
+    assert canonical(root) == canonical(expected)
+
+
+@pytest.mark.py_mmd_tools
+def test_metadata_to_tree_minimal():
+    """Test that missing optional elements are left out in the same
+    way as in the template.
+    """
+    keys = ["metadata_identifier", "title", "abstract", "last_metadata_update",
+            "geographic_extent", "project"]
+    data = {key: FULL_METADATA[key] for key in keys}
+    data["geographic_extent"] = {"rectangle": data["geographic_extent"]["rectangle"]}
+    data["metadata_status"] = None
+    root = mmd_xml.metadata_to_tree(data)
+    assert canonical(root) == canonical(ET.fromstring(render_template(data)))
+    assert root.find("mmd:metadata_status", mmd_xml.NAMESPACES).text == "None"
+    assert root.find("mmd:storage_information", mmd_xml.NAMESPACES) is None
+    assert root.find("mmd:project/mmd:short_name", mmd_xml.NAMESPACES).text == ""
+
+
+@pytest.mark.py_mmd_tools
+def test_tostring():
+    """Test compact and indented serialisation."""
+    root = mmd_xml.metadata_to_tree(FULL_METADATA)
+    compact = mmd_xml.tostring(root)
+    assert "\n" not in compact.strip()
+    assert compact.startswith('<mmd:mmd xmlns:mmd="http://www.met.no/schema/mmd"')
+    assert "<mmd:title xml:lang=\"en\">Test &amp; title</mmd:title>" in compact
+    assert mmd_xml.tostring(root, pretty_print=True).count("\n") > 50
+
+
+@pytest.mark.py_mmd_tools
+def test_to_mmd_lxml_renderer(dataDir):
+    """Test that to_mmd creates the same MMD document with the lxml
+    renderer as with the Jinja template.
+    """
+    md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), check_only=True)
+    md.to_mmd(renderer="lxml")
+    assert md.mmd_tree is not None
+    assert md.timings["render"] > 0
+    assert canonical(md.mmd_tree) == canonical(ET.fromstring(render_template(md.metadata)))
+
+    with pytest.raises(ValueError) as ve:
+        Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), check_only=True).to_mmd(
+            renderer="xslt")
+    assert str(ve.value) == "renderer must be either 'jinja' or 'lxml'"
+
+
+@pytest.mark.py_mmd_tools
+def test_to_mmd_lxml_renderer_write(dataDir, tmpdir, monkeypatch):
+    """Test that the tree is serialised when the MMD file is
+    written.
+    """
+    output_file = os.path.join(tmpdir, "reference_nc.xml")
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), opendap_url=url,
+                   output_file=output_file)
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        md.to_mmd(renderer="lxml")
+    assert md.output_location == output_file
+    with open(output_file) as fh:
+        assert fh.read() == mmd_xml.tostring(md.mmd_tree)
+
+
+MINIMAL_XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           xmlns:mmd="http://www.met.no/schema/mmd"
+           targetNamespace="http://www.met.no/schema/mmd"
+           elementFormDefault="qualified">
+  <xs:element name="mmd">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="metadata_identifier">
+          <xs:simpleType>
+            <xs:restriction base="xs:string">
+              <xs:pattern value="no\\.met:.+"/>
+            </xs:restriction>
+          </xs:simpleType>
+        </xs:element>
+        <xs:any processContents="skip" minOccurs="0" maxOccurs="unbounded"/>
+      </xs:sequence>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+
+@pytest.fixture
+def minimalXsd(tmpdir):
+    fn = os.path.join(tmpdir, "mmd_minimal.xsd")
+    with open(fn, "w") as fh:
+        fh.write(MINIMAL_XSD)
+    return fn
+
+
+@pytest.mark.py_mmd_tools
+def test_get_schema_cached(minimalXsd):
+    """Test that the schema is only compiled once in each thread."""
+    schema = mmd_xml.get_schema(minimalXsd)
+    assert isinstance(schema, ET.XMLSchema)
+    assert mmd_xml.get_schema(minimalXsd) is schema
+    assert mmd_xml.get_schema(os.path.relpath(minimalXsd)) is schema
+    with ThreadPoolExecutor(1) as executor:
+        assert executor.submit(mmd_xml.get_schema, minimalXsd).result() is not schema
+
+
+@pytest.mark.py_mmd_tools
+def test_validate_threads(minimalXsd):
+    """Test that documents validated in several threads at once get
+    their own errors.
+    """
+    data = copy.deepcopy(FULL_METADATA)
+    data["metadata_identifier"] = "b7cb7934-77ca-4439-812e-f560df3fe7eb"
+    trees = [mmd_xml.metadata_to_tree(FULL_METADATA), mmd_xml.metadata_to_tree(data)]*50
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda tree: mmd_xml.validate(tree, minimalXsd), trees))
+    assert [len(errors) for errors in results] == [0, 1]*50
+
+
+@pytest.mark.py_mmd_tools
+def test_validate(minimalXsd):
+    """Test that schema errors are returned."""
+    assert mmd_xml.validate(mmd_xml.metadata_to_tree(FULL_METADATA), minimalXsd) == []
+    data = copy.deepcopy(FULL_METADATA)
+    data["metadata_identifier"] = "b7cb7934-77ca-4439-812e-f560df3fe7eb"
+    errors = mmd_xml.validate(mmd_xml.metadata_to_tree(data), minimalXsd)
+    assert len(errors) == 1
+    assert "metadata_identifier" in errors[0]
+
+
+@pytest.mark.py_mmd_tools
+def test_to_mmd_xsd(dataDir, tmpdir, minimalXsd, monkeypatch):
+    """Test that to_mmd validates the document, and does not write
+    invalid documents.
+    """
+    # Schema that does not accept the no.met naming authority
+    strictXsd = os.path.join(tmpdir, "mmd_invalid.xsd")
+    with open(strictXsd, "w") as fh:
+        fh.write(MINIMAL_XSD.replace("no\\.met:", "no\\.npolar:"))
+    md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), check_only=True)
+    req_ok, msg = md.to_mmd(xsd=minimalXsd)
+    assert req_ok is True
+    assert md.schema_errors == []
+    assert md.mmd_tree is not None
+    assert "validate" in md.timings
+
+    output_file = os.path.join(tmpdir, "reference_nc.xml")
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), opendap_url=url,
+                   output_file=output_file)
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        req_ok, msg = md.to_mmd(renderer="lxml", xsd=strictXsd)
+    assert req_ok is False
+    assert msg.startswith("Schema errors in")
+    assert len(md.schema_errors) == 1
+    assert not os.path.isfile(output_file)
+
+
+@pytest.mark.py_mmd_tools
+def test_to_mmd_mmd_strict_xsd(dataDir):
+    """Test that the MMD document is valid according to the MMD
+    schema.
+    """
+    md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), check_only=True)
+    req_ok, msg = md.to_mmd(renderer="lxml",
+                            xsd=os.path.join(os.environ["MMD_PATH"], "xsd", "mmd_strict.xsd"))
+    assert md.schema_errors == []
+    assert req_ok is True
+
+
+@pytest.mark.py_mmd_tools
+def test_get_transform_cached(dataDir):
+    """Test that the stylesheet is only compiled once in each
+    thread.
+    """
+    xsl = os.path.join(dataDir, "mmd-to-iso.xsl")
+    transform = mmd_xml.get_transform(xsl)
+    assert isinstance(transform, ET.XSLT)
+    assert mmd_xml.get_transform(xsl) is transform
+
+
+@pytest.mark.py_mmd_tools
+def test_transform(dataDir):
+    """Test that the transformation of an in-memory tree is the same
+    as the transformation of the parsed MMD file.
+    """
+    xsl = os.path.join(dataDir, "mmd-to-iso.xsl")
+    mmd = ET.parse(os.path.join(dataDir, "reference_mmd.xml"))
+    doc = mmd_xml.transform(mmd.getroot(), xsl)
+    assert doc.startswith(b'<?xml version="1.0" encoding="UTF-8"?>')
+    assert doc == bytes(ET.XSLT(ET.parse(xsl))(mmd))
+    iso = ET.fromstring(doc)
+    assert iso.tag == "{http://www.isotc211.org/2005/gmd}MD_Metadata"
+
+
+@pytest.mark.py_mmd_tools
+def test_to_mmd_transforms(dataDir, tmpdir, monkeypatch):
+    """Test that ISO and CSW documents are written next to the MMD
+    file.
+    """
+    output_file = os.path.join(tmpdir, "reference_nc.xml")
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), opendap_url=url,
+                   output_file=output_file)
+    transforms = {"_iso.xml": os.path.join(dataDir, "mmd-to-iso.xsl"),
+                  "_csw.xml": os.path.join(dataDir, "mmd-to-csw.xsl")}
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        md.to_mmd(transforms=transforms)
+    assert md.transform_locations == {"_iso.xml": os.path.join(tmpdir, "reference_nc_iso.xml"),
+                                      "_csw.xml": os.path.join(tmpdir, "reference_nc_csw.xml")}
+    assert "transform" in md.timings
+    with open(output_file, "rb") as fh:
+        mmd = ET.parse(fh)
+    for suffix, xsl in transforms.items():
+        with open(md.transform_locations[suffix], "rb") as fh:
+            assert fh.read() == bytes(ET.XSLT(ET.parse(xsl))(mmd))
+
+
+def write_collection(fn, records):
+    """Write an MMD collection file with the given number of copies of
+    reference_nc.xml, with different metadata identifiers.
+    """
+    reference = ET.parse(os.path.join(os.path.dirname(__file__), "data", "reference_nc.xml"))
+    collection = ET.Element("collection")
+    for i in range(records):
+        record = copy.deepcopy(reference.getroot())
+        record.find("mmd:metadata_identifier", mmd_xml.NAMESPACES).text = (
+            "no.met:00000000-0000-0000-0000-%012d" % i)
+        collection.append(record)
+    ET.ElementTree(collection).write(fn)
+
+
+@pytest.mark.py_mmd_tools
+def test_iter_records(dataDir, tmpdir):
+    """Test reading the records of a collection one at a time, and
+    that processed records are removed from the tree.
+    """
+    fn = os.path.join(tmpdir, "collection.xml")
+    write_collection(fn, 50)
+    ids = []
+    for record in mmd_xml.iter_records(fn):
+        # Only the previous record is left, and it is empty
+        previous = record.getprevious()
+        assert previous is None or (len(previous) == 0 and previous.getprevious() is None)
+        ids.append(record.find("mmd:metadata_identifier", mmd_xml.NAMESPACES).text)
+    assert ids == ["no.met:00000000-0000-0000-0000-%012d" % i for i in range(50)]
+    # Single MMD document
+    records = [len(record) for record in mmd_xml.iter_records(
+        os.path.join(dataDir, "reference_nc.xml"))]
+    assert len(records) == 1
+    assert records[0] > 0
@@ -9,6 +9,7 @@ py-mmd-tools is licensed under the Apache License 2.0
 """
 import os
 import shutil
+import tarfile
 import tempfile
 
 import pytest
@@ -245,3 +246,307 @@ def test_override_file_location(dataDir):
     with open(os.path.join(out_dir, "reference_nc.xml")) as fn:
         lines = fn.readlines()
     assert "<mmd:file_location>" + alt_loc + "</mmd:file_location>" in "".join(lines)
+
+
+@pytest.mark.script
+def test_metrics_file(dataDir, monkeypatch):
+    """Test that run statistics are written with the --metrics-file
+    option.
+    """
+    parser = create_parser()
+    test_in = os.path.join(dataDir, "reference_nc.nc")
+    out_dir = tempfile.mkdtemp()
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    parsed = parser.parse_args([
+        "-i", test_in,
+        "-u", url,
+        "-o", out_dir,
+        "--metrics-file", out_dir,
+    ])
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parsed)
+    with open(os.path.join(out_dir, "nc2mmd.prom")) as fh:
+        text = fh.read()
+    assert 'py_mmd_tools_files_processed_total{job="nc2mmd",status="ok"} 1' in text
+    assert 'stage="translate"' in text
+    assert 'py_mmd_tools_opendap_probe_duration_seconds_count{job="nc2mmd"} 1' in text
+    shutil.rmtree(out_dir)
+
+
+@pytest.mark.script
+def test_metrics_file_failure(dataDir, monkeypatch):
+    """Test that a failing translation is recorded with the timings of
+    the completed stages, and that the metrics file is still written.
+    """
+    def to_mmd(self, *args, **kwargs):
+        self.timings = {"translate": 0.5}
+        raise OSError("disk full")
+
+    parser = create_parser()
+    test_in = os.path.join(dataDir, "reference_nc.nc")
+    out_dir = tempfile.mkdtemp()
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    parsed = parser.parse_args(["-i", test_in, "-u", url, "-o", out_dir,
+                                "--metrics-file", out_dir])
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Nc_to_mmd.to_mmd", to_mmd)
+        with pytest.raises(OSError):
+            main(parsed)
+    with open(os.path.join(out_dir, "nc2mmd.prom")) as fh:
+        text = fh.read()
+    assert 'py_mmd_tools_failures_total{error_type="OSError",job="nc2mmd"} 1' in text
+    assert 'stage="translate"' in text
+    shutil.rmtree(out_dir)
+
+
+@pytest.mark.script
+def test_checkpoint_and_resume(dataDir, monkeypatch):
+    """Test that a resumed run skips the files recorded in the
+    checkpoint, and that metadata IDs are logged once, as they are
+    produced.
+    """
+    parser = create_parser()
+    in_dir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"), in_dir)
+    out_dir = tempfile.mkdtemp()
+    url = "https://thredds.met.no/thredds/dodsC"
+    checkpoint = os.path.join(out_dir, "nc2mmd.checkpoint")
+    log_ids = os.path.join(out_dir, "dataset_ids.txt")
+    args = [
+        "-i", in_dir,
+        "-u", url,
+        "-o", out_dir,
+        "--log-ids", log_ids,
+        "--checkpoint", checkpoint,
+    ]
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parser.parse_args(args))
+    assert os.path.isfile(checkpoint)
+    with open(log_ids) as fh:
+        assert fh.read() == "no.met:b7cb7934-77ca-4439-812e-f560df3fe7eb\n"
+
+    # A file that is processed again, since the run was interrupted
+    # before the checkpoint was saved, is not logged twice
+    with open(checkpoint, "w"):
+        pass
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parser.parse_args(args + ["--resume"]))
+    with open(log_ids) as fh:
+        assert fh.read() == "no.met:b7cb7934-77ca-4439-812e-f560df3fe7eb\n"
+
+    # Resuming does not process the file again, and still detects
+    # repeated IDs
+    os.unlink(os.path.join(out_dir, "reference_nc.xml"))
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"),
+                os.path.join(in_dir, "reference_nc_copy.nc"))
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        with pytest.raises(ValueError) as ve:
+            main(parser.parse_args(args + ["--resume"]))
+    assert "Unique ID repetition" in str(ve.value)
+    assert not os.path.isfile(os.path.join(out_dir, "reference_nc.xml"))
+
+    shutil.rmtree(out_dir)
+    shutil.rmtree(in_dir)
+
+
+@pytest.mark.script
+def test_resume_requires_checkpoint(dataDir):
+    parser = create_parser()
+    parsed = parser.parse_args([
+        "-i", os.path.join(dataDir, "reference_nc.nc"),
+        "--dry-run",
+        "--resume",
+    ])
+    with pytest.raises(ValueError) as ve:
+        main(parsed)
+    assert str(ve.value) == "A checkpoint file must be provided to resume a run"
+
+
+@pytest.mark.script
+def test_id_registry_across_runs(dataDir, monkeypatch):
+    """Test that repeated IDs are detected against earlier runs with
+    --id-registry, and that the repeated file is not written.
+    """
+    parser = create_parser()
+    out_dir = tempfile.mkdtemp()
+    in_dir = tempfile.mkdtemp()
+    copy = os.path.join(in_dir, "reference_nc_copy.nc")
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"), copy)
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    registry = os.path.join(out_dir, "ids.sqlite")
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parser.parse_args([
+            "-i", os.path.join(dataDir, "reference_nc.nc"),
+            "-u", url,
+            "-o", out_dir,
+            "--id-registry", registry,
+        ]))
+        with pytest.raises(ValueError) as ve:
+            main(parser.parse_args([
+                "-i", copy,
+                "-u", url,
+                "-o", out_dir,
+                "--id-registry", registry,
+            ]))
+    assert "Unique ID repetition" in str(ve.value)
+    assert copy in str(ve.value)
+    assert not os.path.isfile(os.path.join(out_dir, "reference_nc_copy.xml"))
+    shutil.rmtree(out_dir)
+    shutil.rmtree(in_dir)
+
+
+@pytest.mark.script
+def test_bundle_and_gzip(dataDir, monkeypatch):
+    """Test writing the MMD files to archives, or gzip compressed."""
+    parser = create_parser()
+    test_in = os.path.join(dataDir, "reference_nc.nc")
+    out_dir = tempfile.mkdtemp()
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    checkpoint = os.path.join(out_dir, "nc2mmd.checkpoint")
+    args = ["-i", test_in, "-u", url, "-o", out_dir]
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parser.parse_args(args + ["--bundle", "mmd.zip", "--checkpoint", checkpoint]))
+        main(parser.parse_args(args + ["--gzip", "--fsync-batch", "10"]))
+    assert os.path.isfile(os.path.join(out_dir, "mmd.00001.zip"))
+    assert os.path.isfile(os.path.join(out_dir, "reference_nc.xml.gz"))
+    assert not os.path.isfile(os.path.join(out_dir, "reference_nc.xml"))
+    with open(checkpoint) as fh:
+        assert "mmd.00001.zip:reference_nc.xml" in fh.read()
+    shutil.rmtree(out_dir)
+
+
+@pytest.mark.script
+def test_bundle_with_checkpoint(dataDir, monkeypatch):
+    """Test that saving the checkpoint does not complete the archive
+    parts before they hold --bundle-size documents, and that a resumed
+    run removes the temporary files of the interrupted run.
+    """
+    parser = create_parser()
+    in_dir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"), in_dir)
+    copy = os.path.join(in_dir, "reference_nc_copy.nc")
+    shutil.copy(os.path.join(dataDir, "reference_nc.nc"), copy)
+    with Dataset(copy, "a") as ds:
+        ds.id = "0e6fb0c4-6a2a-4f5e-9e0c-2d1e6a1a6c0f"
+    out_dir = tempfile.mkdtemp()
+    url = "https://thredds.met.no/thredds/dodsC"
+    checkpoint = os.path.join(out_dir, "nc2mmd.checkpoint")
+    args = ["-i", in_dir, "-u", url, "-o", out_dir, "--checkpoint", checkpoint,
+            "--bundle", "mmd.tar", "--bundle-size", "2"]
+    with pytest.raises(ValueError) as ve:
+        main(parser.parse_args(args + ["--checkpoint-interval", "1"]))
+    assert str(ve.value) == "The checkpoint interval is given by the bundle size with --bundle"
+
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parser.parse_args(args))
+    with tarfile.open(os.path.join(out_dir, "mmd.00001.tar")) as tar:
+        assert sorted(tar.getnames()) == ["reference_nc.xml", "reference_nc_copy.xml"]
+    with open(checkpoint) as fh:
+        assert len(fh.readlines()) == 2
+
+    stale = os.path.join(out_dir, ".mmd.00002.tar.0123abcd.tmp")
+    with open(stale, "w"):
+        pass
+    main(parser.parse_args(args + ["--resume"]))
+    assert not os.path.isfile(stale)
+    assert not os.path.isfile(os.path.join(out_dir, "mmd.00002.tar"))
+    shutil.rmtree(out_dir)
+    shutil.rmtree(in_dir)
+
+
+@pytest.mark.script
+def test_xsd_validation(dataDir, monkeypatch, capsys):
+    """Test that MMD documents that are invalid according to the
+    schema given with --xsd are reported, and not written.
+    """
+    parser = create_parser()
+    test_in = os.path.join(dataDir, "reference_nc.nc")
+    out_dir = tempfile.mkdtemp()
+    xsd = os.path.join(out_dir, "mmd_invalid.xsd")
+    with open(xsd, "w") as fh:
+        fh.write(
+            '<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" '
+            'targetNamespace="http://www.met.no/schema/mmd" elementFormDefault="qualified">'
+            '<xs:element name="mmd" type="xs:string"/></xs:schema>'
+        )
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    registry = os.path.join(out_dir, "ids.sqlite")
+    parsed = parser.parse_args([
+        "-i", test_in,
+        "-u", url,
+        "-o", out_dir,
+        "--xsd", xsd,
+        "--metrics-file", out_dir,
+        "--id-registry", registry,
+    ])
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parsed)
+    assert "Schema errors in %s" % test_in in capsys.readouterr().out
+    assert not os.path.isfile(os.path.join(out_dir, "reference_nc.xml"))
+    with open(os.path.join(out_dir, "nc2mmd.prom")) as fh:
+        assert 'error_type="SchemaValidationError"' in fh.read()
+
+    # The ID of the invalid document is not kept in the registry, so a
+    # corrected file with the same ID is accepted
+    copy = os.path.join(out_dir, "reference_nc_copy.nc")
+    shutil.copy(test_in, copy)
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parser.parse_args(["-i", copy, "-u", url, "-o", out_dir,
+                                "--id-registry", registry]))
+    assert os.path.isfile(os.path.join(out_dir, "reference_nc_copy.xml"))
+    shutil.rmtree(out_dir)
+
+
+@pytest.mark.script
+def test_transform_in_bundle(dataDir, monkeypatch):
+    """Test that transformed documents are bundled with the MMD
+    documents.
+    """
+    parser = create_parser()
+    test_in = os.path.join(dataDir, "reference_nc.nc")
+    out_dir = tempfile.mkdtemp()
+    url = "https://thredds.met.no/thredds/dodsC/reference_nc.nc"
+    parsed = parser.parse_args([
+        "-i", test_in,
+        "-u", url,
+        "-o", out_dir,
+        "--bundle", "mmd.tar",
+        "--transform", os.path.join(dataDir, "mmd-to-iso.xsl"), "_iso.xml",
+    ])
+    with monkeypatch.context() as mp:
+        mp.setattr("py_mmd_tools.nc_to_mmd.Dataset",
+                   lambda *args, **kwargs: patchedDataset(url, *args, **kwargs))
+        main(parsed)
+    with tarfile.open(os.path.join(out_dir, "mmd.00001.tar")) as tar:
+        assert tar.getnames() == ["reference_nc.xml", "reference_nc_iso.xml"]
+    shutil.rmtree(out_dir)
+
+
+@pytest.mark.script
+def test_cache_headers(dataDir, capsys):
+    """Test that the cache statistics are printed at the end of the
+    run with --cache-headers.
+    """
+    parser = create_parser()
+    test_in = os.path.join(dataDir, "reference_nc.nc")
+    parsed = parser.parse_args(["-i", test_in, "--dry-run", "--cache-headers"])
+    main(parsed)
+    assert "Translation cache: 0 hits, 11 misses" in capsys.readouterr().out
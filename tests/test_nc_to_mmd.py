@@ -8,6 +8,8 @@ py-mmd-tools is licensed under the Apache License 2.0
 <https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
 """
 
+import copy
+import gc
 import os
 import pathlib
 import tempfile
@@ -16,6 +18,7 @@ import warnings
 import unittest
 import pytest
 import json
+import weakref
 
 import numpy as np
 
@@ -27,9 +30,14 @@ from pkg_resources import resource_string
 from unittest.mock import patch
 
 from py_mmd_tools.nc_to_mmd import Nc_to_mmd, normalize_iso8601, normalize_iso8601_0
+from py_mmd_tools.nc_to_mmd import _normalize_iso8601
+from py_mmd_tools.nc_to_mmd import normalize_iso8601_list
 from py_mmd_tools.nc_to_mmd import valid_url
 from py_mmd_tools.nc_to_mmd import get_short_and_long_names
 from py_mmd_tools.nc_to_mmd import nc_wrapper
+from py_mmd_tools.nc_to_mmd import check_cf_standard_names
+from py_mmd_tools.nc_to_mmd import load_vocabularies
+from py_mmd_tools.nc_to_mmd import variable_attribute_index
 from py_mmd_tools.yaml_to_adoc import nc_attrs_from_yaml
 from py_mmd_tools.yaml_to_adoc import required
 from py_mmd_tools.yaml_to_adoc import repetition_allowed
@@ -514,6 +522,20 @@ def test_nc_wrapper_global_attrs(dataDir):
              f" nc: {test_ncin.getncattr(attr)}, json: {test_json_header[attr]}")
 
 
+@pytest.mark.py_mmd_tools
+def test_nc_wrapper_no_global_attrs():
+    """Test that a header without global attributes behaves like a
+    netCDF file without global attributes.
+    """
+    test_json_header = nc_wrapper({"variables": {}})
+    assert test_json_header.ncattrs() == []
+    assert not hasattr(test_json_header, "title")
+    with pytest.raises(KeyError):
+        test_json_header.getncattr("title")
+    with pytest.raises(KeyError):
+        test_json_header["title"]
+
+
 @pytest.mark.py_mmd_tools
 def test_nc_wrapper_variable_attrs(dataDir):
 
@@ -624,6 +646,39 @@ def test_nc_wrapper_ncatters(dataDir):
             f"Mismatch in variable attributes, for variable {var}"
 
 
+@pytest.mark.py_mmd_tools
+def test_nc_wrapper_does_not_modify_header(dataDir):
+    """Test that nc_wrapper is a read-only view of the json header,
+    which can be wrapped and translated several times.
+    """
+    with open(os.path.join(dataDir, "reference_nc_header.json"), "r") as file:
+        header = json.load(file)
+    original = copy.deepcopy(header)
+
+    wrapped = nc_wrapper(header)
+    assert wrapped.netcdf_header is header
+    assert wrapped.title == header["global_variables"]["title"]
+    assert wrapped.variables["M01"].standard_name == "toa_bidirectional_reflectance"
+    assert "M01" in wrapped.variables
+    assert len(wrapped.variables) == len(header["variables"])
+    assert not hasattr(wrapped, "not_an_attribute")
+    assert not hasattr(wrapped.variables["M01"], "not_an_attribute")
+    with pytest.raises(AttributeError):
+        wrapped.title = "changed"
+    with pytest.raises(AttributeError):
+        wrapped.variables["M01"].standard_name = "changed"
+    with pytest.raises(TypeError):
+        wrapped.variables["M01"] = None
+    assert header == original
+
+    md1 = Nc_to_mmd(header, json_input=True, check_only=True)
+    md1.to_mmd()
+    md2 = Nc_to_mmd(header, json_input=True, check_only=True)
+    md2.to_mmd()
+    assert header == original
+    assert md1.metadata == md2.metadata
+
+
 @pytest.mark.py_mmd_tools
 def test_attribute_error_title_json(dataDir):
     test_json_header = os.path.join(dataDir, "reference_nc_header_missing_title.json")
@@ -647,6 +702,84 @@ def test_get_CFSTDN_keywords(dataDir):
     assert vars[0] == "toa_bidirectional_reflectance"
 
 
+@pytest.mark.py_mmd_tools
+def test_get_CFSTDN_keywords_many_variables(tmpdir):
+    """ Test that repeated standard names are only returned once, in
+    the order of the variables, and that coordinates are omitted.
+    """
+    fn = os.path.join(tmpdir, "many_variables.nc")
+    with Dataset(fn, "w") as ds:
+        ds.createDimension("x", 1)
+        for i in range(2000):
+            var = ds.createVariable("var%d" % i, "f4", ("x",))
+            if i % 4 != 3:
+                var.standard_name = ["air_temperature", "latitude", "wind_speed"][i % 4]
+    with Dataset(fn) as ncin:
+        md = Nc_to_mmd.__new__(Nc_to_mmd)
+        md._variable_index = None
+        assert md.get_CFSTDN_keywords(ncin) == ["air_temperature", "wind_speed"]
+        index = md.get_variable_attribute_index(ncin)
+        assert len(index["standard_name"]) == 1500
+        assert index["standard_name"]["var2"] == "wind_speed"
+        assert md.get_variable_attribute_index(ncin) is index
+        assert variable_attribute_index(ncin, attributes=("units",)) == {"units": {}}
+
+
+@pytest.mark.py_mmd_tools
+def test_check_cf_standard_names():
+    """ Test that each standard name is only looked up once for each
+    vocabulary.
+    """
+    class Vocabulary:
+        def __init__(self):
+            self.calls = []
+
+        def check_standard_name(self, name, exact):
+            self.calls.append(name)
+            return name != "not_a_cf_standard_name_for_testing"
+
+    vocabulary = Vocabulary()
+    names = ["sea_ice_thickness_for_testing", "not_a_cf_standard_name_for_testing"]
+    assert check_cf_standard_names(names, vocabulary) == {
+        "sea_ice_thickness_for_testing": True,
+        "not_a_cf_standard_name_for_testing": False,
+    }
+    assert check_cf_standard_names(names[::-1], vocabulary) == {
+        "sea_ice_thickness_for_testing": True,
+        "not_a_cf_standard_name_for_testing": False,
+    }
+    assert vocabulary.calls == names
+    other = Vocabulary()
+    assert check_cf_standard_names(names[:1], other) == {"sea_ice_thickness_for_testing": True}
+    assert other.calls == names[:1]
+    # The memoised results do not keep the vocabulary alive
+    ref = weakref.ref(other)
+    del other
+    gc.collect()
+    assert ref() is None
+
+
+@pytest.mark.py_mmd_tools
+def test_check_cf_standard_names_shared(dataDir):
+    """ Test that translations with the same vocabularies reuse the
+    results of the CF standard name checks.
+    """
+    vocabularies = load_vocabularies()
+    cfstdn = vocabularies["cfstdn_keyword"]
+    with patch.object(cfstdn, "check_standard_name",
+                      wraps=cfstdn.check_standard_name) as check:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for i in range(2):
+                md = Nc_to_mmd(os.path.join(dataDir, "reference_nc.nc"), check_only=True,
+                               vocabularies=vocabularies)
+                md.to_mmd()
+                if i == 0:
+                    calls = check.call_count
+    assert calls > 0
+    assert check.call_count == calls
+
+
 class TestNCAttrsFromYaml(unittest.TestCase):
 
     def setUp(self):
@@ -1523,6 +1656,30 @@ class TestNC2MMD(unittest.TestCase):
         self.assertTrue(valid("2020-12-27 13:40:02.019817"))
         self.assertTrue(valid("2020-11-27T13:40:02.019817Z"))
 
+    def test__normalize_iso8601_fast_path(self):
+        """Test that normalized datetimes are returned unchanged
+        without being parsed, and that other strings give the same
+        result as the parser.
+        """
+        with patch("py_mmd_tools.nc_to_mmd.isoparse") as mock_isoparse:
+            for s in ["2021-01-01T00:00:00Z", "2016-12-13T21:20:37.593194Z",
+                      "2020-02-29T23:59:59+05:30"]:
+                self.assertEqual(normalize_iso8601(s), (s, None))
+            mock_isoparse.assert_not_called()
+
+        for s in ["2021-01-01T00:00:00.000000Z", "2021-01-01T00:00:00+00:00",
+                  "2019-02-29T12:00:00Z", "0999-01-01T00:00:00Z", "2021-01-01T24:00:00Z",
+                  "2021-01-01 12:00:00", "2021-01-01T00:00:00-01:00", "foo", None]:
+            self.assertEqual(normalize_iso8601(s), _normalize_iso8601(s))
+
+    def test__normalize_iso8601_list(self):
+        values = np.array(["2021-01-01", "foo", "2021-01-01", "2021-01-02T00:00:00Z"])
+        self.assertEqual(normalize_iso8601_list(values)[0], ("2021-01-01T00:00:00Z", None))
+        self.assertEqual(normalize_iso8601_list(values)[1][0], None)
+        self.assertEqual([ndt for ndt, _ in normalize_iso8601_list(values)[2:]],
+                         ["2021-01-01T00:00:00Z", "2021-01-02T00:00:00Z"])
+        self.assertEqual(normalize_iso8601_list([]), [])
+
     def test__normalize_iso8601_0(self):
 
         dt = '2021-01-01T00:00:00Z'
@@ -0,0 +1,95 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from unittest.mock import patch
+
+from py_mmd_tools import roundtrip
+from py_mmd_tools.mmd_to_nc import load_mmd_yaml
+from py_mmd_tools.roundtrip import acdd_attribute_names
+from py_mmd_tools.roundtrip import check_file
+from py_mmd_tools.roundtrip import check_files
+from py_mmd_tools.roundtrip import compare_attributes
+from py_mmd_tools.roundtrip import same_value
+from py_mmd_tools.roundtrip import summarise
+
+
+@pytest.mark.py_mmd_tools
+def test_acdd_attribute_names():
+    """Test that ACDD and ACDD extension attributes are found."""
+    names = acdd_attribute_names(load_mmd_yaml())
+    assert {"id", "naming_authority", "keywords", "creator_name", "geospatial_lat_max",
+            "platform_vocabulary"} <= names
+    assert "metadata_identifier" not in names
+
+
+@pytest.mark.py_mmd_tools
+def test_same_value():
+    """Test the comparison of original and translated values."""
+    assert same_value("GCMDSK:a, GEMET:b", "GCMDSK:a,GEMET:b")
+    assert not same_value("GCMDSK:a, GEMET:b", "GEMET:b,GCMDSK:a")
+    assert same_value(np.float64(77.96752166748047), "77.96752166748047")
+    assert not same_value(np.float64(77.9), "77.8")
+    assert not same_value(np.array([1., 2.]), "1.0")
+    assert same_value(np.array([1., 2.]), "1.0, 2.0")
+    assert not same_value(np.array([1., 2.]), "1.0, 3.0")
+    assert not same_value(np.array([1., 2.]), "1.0, a")
+
+
+@pytest.mark.py_mmd_tools
+def test_compare_attributes():
+    """Test that changed, added and missing attributes are found."""
+    original = {"id": "abc", "keywords": "a, b", "title_no": "Tittel", "history": "created"}
+    acdd = {"id": "abd", "keywords": "a,b", "source": "Not available"}
+    assert compare_attributes(original, acdd, {"id", "keywords", "title_no", "source"}) == {
+        "changed": {"id": ("abc", "abd")},
+        "added": {"source": "Not available"},
+        "missing": {"title_no": "Tittel"},
+    }
+
+
+@pytest.mark.py_mmd_tools
+def test_check_file(dataDir):
+    """Test the round trip of the reference file."""
+    fn = os.path.join(dataDir, "reference_nc.nc")
+    nc_file, discrepancies, error = check_file(fn)
+    assert nc_file == fn
+    assert error is None
+    assert "id" not in discrepancies["changed"]
+    assert "geospatial_lat_max" not in discrepancies["changed"]
+    assert "keywords_vocabulary" in discrepancies["changed"]
+    assert "title_no" in discrepancies["missing"]
+
+    nc_file, discrepancies, error = check_file(os.path.join(dataDir, "reference_nc_fail.nc"))
+    assert discrepancies is None
+    assert error.startswith("AttributeError")
+
+
+@pytest.mark.py_mmd_tools
+def test_check_files_and_summarise(dataDir):
+    """Test checking several files in a process pool, and the summary
+    of the results.
+    """
+    files = [os.path.join(dataDir, fn) for fn in ["reference_nc.nc", "reference_nc_fail.nc",
+                                                  "reference_nc.nc"]]
+    results = check_files(files, processes=2)
+    assert [result[0] for result in results] == files
+    assert results[0] == results[2]
+    summary, failed = summarise(results)
+    assert failed == 1
+    assert summary[("missing", "title_no")] == 2
+    with patch("py_mmd_tools.roundtrip.load_vocabularies",
+               wraps=roundtrip.load_vocabularies) as load:
+        assert check_files(files, processes=1) == results
+    assert load.call_count == 1
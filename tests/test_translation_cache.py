@@ -0,0 +1,139 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pytest
+
+from netCDF4 import Dataset
+
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+from py_mmd_tools.nc_to_mmd import variable_attribute_index
+from py_mmd_tools.translation_cache import CACHED_ELEMENTS
+from py_mmd_tools.translation_cache import TranslationCache
+from py_mmd_tools.translation_cache import VOLATILE_ATTRIBUTES
+
+
+def header(path, **attrs):
+    """Return a netCDF dataset with the given global attributes, and
+    an air_temperature variable.
+    """
+    ds = Dataset(path, "w")
+    ds.setncatts(attrs)
+    ds.createDimension("time", 1)
+    ds.createVariable("air_temperature", "f4", ("time",)).standard_name = "air_temperature"
+    return ds
+
+
+@pytest.mark.py_mmd_tools
+def test_header_signature(tmpdir):
+    """Test that the header signature ignores the volatile global
+    attributes, but not the stable attributes or the standard names
+    of the variables.
+    """
+    ds1 = header(os.path.join(tmpdir, "1.nc"), id="a", date_created="2023-01-01",
+                 institution="MET Norway")
+    ds2 = header(os.path.join(tmpdir, "2.nc"), id="b", date_created="2023-01-02",
+                 institution="MET Norway")
+    ds3 = header(os.path.join(tmpdir, "3.nc"), id="a", date_created="2023-01-01",
+                 institution="Other")
+    sig = TranslationCache.header_signature(ds1)
+    assert TranslationCache.header_signature(ds2) == sig
+    assert TranslationCache.header_signature(ds3) != sig
+    ds2.variables["air_temperature"].standard_name = "sea_water_temperature"
+    assert TranslationCache.header_signature(ds2) != sig
+    # Arrays are hashed in full, also when their repr is abbreviated
+    values = np.arange(2000, dtype="f8")
+    ds1.long_array = values
+    long_sig = TranslationCache.header_signature(ds1)
+    values[1000] = -1
+    ds1.long_array = values
+    assert TranslationCache.header_signature(ds1) != long_sig
+    assert TranslationCache.header_signature(ds1, index=variable_attribute_index(ds1)) == \
+        TranslationCache.header_signature(ds1)
+    ds1.delncattr("long_array")
+    assert TranslationCache.header_signature(ds1) == sig
+    volatile = VOLATILE_ATTRIBUTES | {"institution"}
+    assert TranslationCache.header_signature(ds1, volatile=volatile) == \
+        TranslationCache.header_signature(ds3, volatile=volatile)
+    for ds in [ds1, ds2, ds3]:
+        ds.close()
+
+
+@pytest.mark.py_mmd_tools
+def test_translate():
+    """Test that cached elements are returned as copies, and that
+    their errors and warnings are replayed.
+    """
+    cache = TranslationCache()
+    calls = []
+
+    def func(value):
+        calls.append(value)
+        missing["errors"].append("error %d" % len(calls))
+        missing["warnings"].append("warning")
+        return {"value": [value]}
+
+    missing = {"errors": ["earlier"], "warnings": []}
+    first = cache.translate("sig", "personnel", missing, func, 1)
+    first["value"].append(2)
+    missing = {"errors": [], "warnings": []}
+    assert cache.translate("sig", "personnel", missing, func, 1) == {"value": [1]}
+    assert calls == [1]
+    assert missing == {"errors": ["error 1"], "warnings": ["warning"]}
+    cache.translate("sig", "keywords", missing, func, 3)
+    assert calls == [1, 3]
+    assert (cache.hits, cache.misses, cache.signatures) == (1, 2, 1)
+    assert cache.report() == (
+        "Translation cache: 1 hits, 2 misses (33.3% hit rate), 1 header signatures"
+    )
+
+
+@pytest.mark.py_mmd_tools
+def test_maxsize():
+    """Test that the least recently used signatures are discarded."""
+    cache = TranslationCache(maxsize=2)
+    cache.put("a", "personnel", [], [], [])
+    cache.put("b", "personnel", [], [], [])
+    assert cache.get("a", "personnel") is not None
+    cache.put("c", "personnel", [], [], [])
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.get("b", "personnel") is None
+    assert TranslationCache().hit_rate() == 0.
+
+
+@pytest.mark.py_mmd_tools
+def test_to_mmd_with_cache(dataDir, tmpdir):
+    """Test that a file family translated with a cache gives the same
+    metadata, errors and warnings as without it.
+    """
+    files = []
+    for i in range(2):
+        fn = os.path.join(tmpdir, "family_%d.nc" % i)
+        shutil.copy(os.path.join(dataDir, "reference_nc.nc"), fn)
+        with Dataset(fn, "a") as ds:
+            ds.date_created = "2023-01-0%dT00:00:00Z" % (i + 1)
+        files.append(fn)
+
+    cache = TranslationCache()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for fn in files:
+            cached = Nc_to_mmd(fn, check_only=True)
+            cached.to_mmd(cache=cache)
+            md = Nc_to_mmd(fn, check_only=True)
+            md.to_mmd()
+            assert cached.metadata == md.metadata
+            assert cached.missing_attributes == md.missing_attributes
+    assert cache.hits == len(CACHED_ELEMENTS)
+    assert cache.misses == len(CACHED_ELEMENTS)
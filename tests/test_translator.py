@@ -0,0 +1,110 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import copy
+import json
+import os
+import uuid
+import warnings
+
+import pytest
+
+from unittest.mock import patch
+
+from py_mmd_tools import nc_to_mmd
+from py_mmd_tools import translator as translator_module
+from py_mmd_tools.nc_to_mmd import Nc_to_mmd
+from py_mmd_tools.translator import Translator
+
+
+@pytest.fixture
+def header(dataDir):
+    with open(os.path.join(dataDir, "reference_nc_header.json"), "r") as fh:
+        return json.load(fh)
+
+
+@pytest.mark.py_mmd_tools
+def test_translate_json_header(header):
+    """Test that the translator gives the same metadata as Nc_to_mmd."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md = Nc_to_mmd(copy.deepcopy(header), json_input=True, check_only=True)
+        md.to_mmd()
+        result, req_ok, msg = Translator().translate(copy.deepcopy(header))
+    assert req_ok is True
+    assert msg == ""
+    assert result.metadata == md.metadata
+    assert result.missing_attributes == md.missing_attributes
+
+
+@pytest.mark.py_mmd_tools
+def test_translate_netcdf_file(dataDir):
+    """Test that a netCDF file can be translated and written."""
+    translator = Translator()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        md, req_ok, msg = translator.translate(os.path.join(dataDir, "reference_nc.nc"))
+    assert req_ok is True
+    assert md.check_only is True
+    assert md.metadata["metadata_identifier"] == "no.met:b7cb7934-77ca-4439-812e-f560df3fe7eb"
+
+
+@pytest.mark.py_mmd_tools
+def test_vocabularies_are_initialised_once(header):
+    """Test that the vocabularies are initialised by the translator,
+    and shared by all translations.
+    """
+    with patch.object(translator_module, "load_vocabularies",
+                      wraps=nc_to_mmd.load_vocabularies) as load:
+        translator = Translator()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            md1, _, _ = translator.translate(copy.deepcopy(header))
+            md2, _, _ = translator.translate(copy.deepcopy(header))
+    assert load.call_count == 1
+    assert md1.platform_group is translator.vocabularies["platform_group"]
+    assert md2.platform_group is md1.platform_group
+    assert md1.metadata is not md2.metadata
+    with pytest.raises(TypeError):
+        translator.vocabularies["platform_group"] = None
+
+
+@pytest.mark.py_mmd_tools
+def test_translate_concurrently(header):
+    """Test that one translator can be shared by a pool of threads,
+    and that the per-file state of the translations is kept apart.
+    """
+    translator = Translator()
+    plan = copy.deepcopy(translator._mmd_yaml)
+    headers = []
+    for i in range(32):
+        h = copy.deepcopy(header)
+        h["global_variables"]["id"] = str(uuid.uuid4())
+        if i % 4 == 0:
+            # Missing license (an error)
+            h["global_variables"].pop("license")
+        headers.append(h)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        results = translator.translate_all(headers, max_workers=8)
+    assert len(results) == len(headers)
+    for i, (h, (result, error)) in enumerate(zip(headers, results)):
+        if i % 4 == 0:
+            assert result is None
+            assert isinstance(error, AttributeError)
+            assert 'ACDD attribute "license" is required' in str(error)
+            continue
+        assert error is None
+        md, req_ok, msg = result
+        assert req_ok is True
+        assert md.metadata["metadata_identifier"].endswith(h["global_variables"]["id"])
+        assert md.missing_attributes["errors"] == []
+    assert translator._mmd_yaml == plan
@@ -0,0 +1,63 @@
+"""
+License:
+
+This file is part of the py-mmd-tools repository
+<https://github.com/metno/py-mmd-tools>.
+
+py-mmd-tools is licensed under the Apache License 2.0
+<https://github.com/metno/py-mmd-tools/blob/master/LICENSE>
+"""
+
+import uuid
+
+import pytest
+
+from py_mmd_tools import validators
+
+
+@pytest.mark.py_mmd_tools
+def test_valid_url():
+    """Test url validation, and that repeated urls are cached."""
+    assert validators.valid_url("https://spdx.org/licenses/CC-BY-4.0")
+    assert validators.valid_url("ftp://localhost:8080/data")
+    assert validators.valid_url("http://157.249.1.1/")
+    assert not validators.valid_url("www.met.no")
+    assert not validators.valid_url("https://met.no/ a")
+    assert not validators.valid_url(None)
+    assert not validators.valid_url("")
+    with pytest.raises(TypeError):
+        validators.valid_url(1)
+
+    hits = validators.cache_info()["url"].hits
+    validators.valid_url("https://spdx.org/licenses/CC-BY-4.0")
+    assert validators.cache_info()["url"].hits == hits + 1
+
+
+@pytest.mark.py_mmd_tools
+def test_is_valid_uuid():
+    """Test that only canonical UUIDs of the given version are valid,
+    as with the uuid module.
+    """
+    uuid4 = "c9bf9e57-1685-4c89-bafb-ff5af830be8a"
+    assert validators.is_valid_uuid(uuid4)
+    assert not validators.is_valid_uuid(uuid4.upper())
+    assert not validators.is_valid_uuid(uuid4.replace("-", ""))
+    assert not validators.is_valid_uuid("c9bf9e58")
+    assert not validators.is_valid_uuid(uuid4, version=1)
+    assert not validators.is_valid_uuid("c9bf9e57-1685-4c89-7afb-ff5af830be8a")
+    uuid1 = str(uuid.uuid1())
+    assert validators.is_valid_uuid(uuid1, version=1)
+    assert not validators.is_valid_uuid(uuid1)
+    # UUIDs are unique per file, so they are not cached
+    assert set(validators.cache_info()) == {"url"}
+    assert not validators.is_valid_uuid(uuid4, version=0)
+
+
+@pytest.mark.py_mmd_tools
+def test_batch_validation():
+    """Test validation of lists of urls and UUIDs."""
+    urls = ["https://met.no", "invalid", None, "https://met.no"]
+    assert validators.valid_urls(urls) == [True, False, False, True]
+    assert validators.valid_urls([]) == []
+    uuids = ["c9bf9e57-1685-4c89-bafb-ff5af830be8a", "no.met:c9bf9e57"]
+    assert validators.valid_uuids(uuids) == [True, False]